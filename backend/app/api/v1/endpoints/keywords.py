@@ -5,7 +5,7 @@ from bson import ObjectId
 from pydantic import ValidationError
 
 from app.core.logging import get_logger
-from app.core.db import get_collection
+from app.core.db import get_collection, ANALYTICS_PROFILE
 from app.models.keyword import KeywordCreate, KeywordUpdate, KeywordInDB
 
 logger = get_logger("app.api.keywords")
@@ -268,8 +268,8 @@ async def get_keyword_stats():
     دریافت آمار کلمات کلیدی
     """
     try:
-        keywords_collection = get_collection("keywords")
-        tweets_collection = get_collection("tweets")
+        keywords_collection = get_collection("keywords", ANALYTICS_PROFILE)
+        tweets_collection = get_collection("tweets", ANALYTICS_PROFILE)
         
         # تعداد کل کلمات کلیدی
         total_keywords = await keywords_collection.count_documents({})
@@ -1,11 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Path, Body, status
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.core.db import get_database_stats, get_collection
-from app.core.logging import get_logger
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.execution import get_execution_stats
+from app.core.index_advisor import run_index_advisor
+from app.core.logging import get_logger, logging_status
 from app.core.migrations import migration_manager
+from app.core.query_monitor import query_monitor
+from app.services.compaction import compaction_planner, plan_compaction
+from app.services.enrichment import enrichment_runner
+from app.services.retention import retention_engine
+from app.services.scoring import scoring_engine
+from app.services.stats_series import STATS_METRICS, stats_series
+from app.services.system_sampler import system_sampler
 from app.tasks.scheduler import scheduler_manager
 
 logger = get_logger("app.api.system")
@@ -35,10 +45,16 @@ class ExecutionLogResponse(BaseModel):
     """مدل لاگ اجرا"""
     id: str
     task_name: str
+    trigger: Optional[str] = None
     status: str
     start_time: datetime
     end_time: Optional[datetime]
     duration_seconds: float
+    keyword_timings: List[Dict[str, Any]] = []
+    api_calls: int = 0
+    tweets_inserted: int = 0
+    tweets_updated: int = 0
+    errors: List[str] = []
     result: Optional[Dict[str, Any]]
 
 class ExecutionLogsResponse(BaseModel):
@@ -46,6 +62,29 @@ class ExecutionLogsResponse(BaseModel):
     total: int
     logs: List[ExecutionLogResponse]
 
+class ExecutionStatsResponse(BaseModel):
+    """مدل آمار مدت اجرای کارها"""
+    days: int
+    tasks: Dict[str, Dict[str, Any]]
+    timestamp: datetime
+
+class QueryShapesResponse(BaseModel):
+    """مدل آمار شکل‌های کوئری MongoDB"""
+    slow_threshold_ms: float
+    shapes: List[Dict[str, Any]]
+    timestamp: datetime
+
+class IndexAdviceResponse(BaseModel):
+    """مدل گزارش مشاور ایندکس"""
+    shapes: List[Dict[str, Any]]
+    recommendations: int
+    timestamp: datetime
+
+class ScoringRescoreRequest(BaseModel):
+    """مدل درخواست محاسبه مجدد امتیاز اهمیت"""
+    max_batches: Optional[int] = Field(None, ge=1)
+    restart: bool = False
+
 class MigrationStatusResponse(BaseModel):
     """مدل وضعیت میگریشن‌ها"""
     total: int
@@ -93,59 +132,93 @@ async def get_system_status():
 @router.get("/stats", response_model=SystemStatsResponse, summary="Get system statistics")
 async def get_system_stats():
     """
-    دریافت آمار کلی سیستم:
+    دریافت آمار کلی سیستم از آخرین نمونه پس‌زمینه:
     - آمار دیتابیس
     - آمار توییت‌ها
     - آمار کلمات کلیدی
     - آمار سیستم
     """
     try:
-        # دریافت آمار دیتابیس
-        db_stats = await get_database_stats()
-        
-        # دریافت آمار توییت‌ها
-        tweets_collection = get_collection("tweets")
-        total_tweets = await tweets_collection.count_documents({})
+        # آخرین نمونه نمونه‌بردار پس‌زمینه (بدون کوئری یا انتظار در مسیر درخواست)
+        sample = await system_sampler.snapshot()
         
-        # آمار توییت‌های امروز
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        tweets_today = await tweets_collection.count_documents({"created_at": {"$gte": today_start}})
+        return {
+            "database": {key: value for key, value in sample["database"].items() if key != "collections_stats"},
+            "tweets": {"total": sample["tweets"]["total"], "today": sample["tweets"]["today"]},
+            "keywords": sample["keywords"],
+            "system": sample["system"],
+            "timestamp": sample["timestamp"]
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting system stats: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting system stats: {str(e)}"
+        )
+
+@router.get("/stats/recent", summary="Get recent system stats samples")
+async def get_recent_system_stats(
+    limit: int = Query(20, ge=1, le=settings.SYSTEM_SAMPLER_HISTORY, description="Number of samples")
+):
+    """
+    دریافت نمونه‌های اخیر آمار سیستم از بافر حافظه (از جدید به قدیم)
+    """
+    try:
+        return {
+            "interval_seconds": system_sampler.interval,
+            "samples": system_sampler.recent(limit)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting recent system stats: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting recent system stats: {str(e)}"
+        )
+
+@router.get("/stats/history", summary="Get system stats time series")
+async def get_system_stats_history(
+    resolution: str = Query("1h", regex="^(raw|1h|1d)$", description="Series resolution (raw, 1h or 1d)"),
+    start_date: Optional[datetime] = Query(None, description="Start date (default depends on resolution)"),
+    end_date: Optional[datetime] = Query(None, description="End date (default now)"),
+    metrics: Optional[List[str]] = Query(None, description="Metric names (default all)")
+):
+    """
+    دریافت سری زمانی آمار سیستم برای نمودارها:
+    - raw: نمونه‌های دقیقه‌ای (پیش‌فرض 6 ساعت اخیر)
+    - 1h: min/max/avg هر ساعت (پیش‌فرض 7 روز اخیر)
+    - 1d: min/max/avg هر روز (پیش‌فرض 90 روز اخیر)
+    """
+    try:
+        unknown = set(metrics or []) - set(STATS_METRICS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown metrics: {', '.join(sorted(unknown))}"
+            )
         
-        # دریافت آمار کلمات کلیدی
-        keywords_collection = get_collection("keywords")
-        total_keywords = await keywords_collection.count_documents({})
-        active_keywords = await keywords_collection.count_documents({"is_active": True})
+        end_date = end_date or datetime.utcnow()
+        default_span = {"raw": timedelta(hours=6), "1h": timedelta(days=7), "1d": timedelta(days=90)}[resolution]
+        start_date = start_date or end_date - default_span
         
-        # دریافت آمار سیستم
-        from app.tasks.maintenance_tasks import get_memory_usage, get_cpu_usage
+        points = await stats_series.history(resolution, start_date, end_date, metrics)
         
         return {
-            "database": {
-                "size_mb": round(db_stats["database_size"] / (1024 * 1024), 2),
-                "storage_mb": round(db_stats["storage_size"] / (1024 * 1024), 2),
-                "collections": db_stats["collections"],
-                "objects": db_stats["objects"]
-            },
-            "tweets": {
-                "total": total_tweets,
-                "today": tweets_today
-            },
-            "keywords": {
-                "total": total_keywords,
-                "active": active_keywords
-            },
-            "system": {
-                "memory_mb": get_memory_usage(),
-                "cpu_percent": get_cpu_usage()
-            },
-            "timestamp": datetime.utcnow()
+            "resolution": resolution,
+            "start_date": start_date,
+            "end_date": end_date,
+            "metrics": metrics or list(STATS_METRICS),
+            "points": points
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting system stats: {e}")
+        logger.error(f"Error getting system stats history: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error getting system stats: {str(e)}"
+            detail=f"Error getting system stats history: {str(e)}"
         )
 
 @router.get("/executions", response_model=ExecutionLogsResponse, summary="Get execution logs")
@@ -193,6 +266,206 @@ async def get_execution_logs(
             detail=f"Error getting execution logs: {str(e)}"
         )
 
+@router.get("/executions/stats", response_model=ExecutionStatsResponse, summary="Get execution duration percentiles")
+async def get_execution_log_stats(
+    task_name: Optional[str] = Query(None, description="Filter by task name"),
+    days: int = Query(7, ge=1, le=90, description="Time window in days")
+):
+    """
+    دریافت آمار اجرای کارها به تفکیک نام کار:
+    - تعداد اجرا و خطا
+    - صدک‌های مدت اجرا (p50, p90, p95, p99)
+    - مجموع فراخوانی‌های API و توییت‌های افزوده/به‌روزرسانی شده
+    """
+    try:
+        tasks = await get_execution_stats(task_name=task_name, days=days)
+        
+        return {
+            "days": days,
+            "tasks": tasks,
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting execution stats: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting execution stats: {str(e)}"
+        )
+
+@router.get("/queries", response_model=QueryShapesResponse, summary="Get top MongoDB query shapes")
+async def get_query_shapes(
+    limit: int = Query(20, ge=1, le=200, description="Number of shapes to return"),
+    sort_by: str = Query("total_ms", regex="^(total_ms|count|p95|slow_count)$", description="Sort criterion")
+):
+    """
+    دریافت پرهزینه‌ترین شکل‌های کوئری (کالکشن + کلیدهای فیلتر + مرتب‌سازی):
+    - صدک‌های تاخیر غلتان
+    - میانگین اسناد بازگشتی و تعداد اسناد بررسی شده (از explain شکل‌های کند)
+    - تعداد کوئری‌های کندتر از آستانه
+    """
+    from app.core.config import settings
+    
+    return {
+        "slow_threshold_ms": settings.MONGO_SLOW_QUERY_MS,
+        "shapes": query_monitor.top_shapes(limit=limit, sort_by=sort_by),
+        "timestamp": datetime.utcnow()
+    }
+
+@router.post("/queries/reset", summary="Reset MongoDB query shape statistics")
+async def reset_query_shapes():
+    """
+    پاک کردن آمار شکل‌های کوئری
+    """
+    query_monitor.reset()
+    return {"status": "success", "message": "Query statistics reset"}
+
+@router.get("/indexes/advice", response_model=IndexAdviceResponse, summary="Explain API query shapes and suggest indexes")
+async def get_index_advice():
+    """
+    اجرای explain("executionStats") برای شکل‌های کوئری واقعی API:
+    - تشخیص COLLSCAN، مرتب‌سازی در حافظه و نسبت بالای اسناد بررسی شده
+    - پیشنهاد ایندکس ترکیبی (ESR) یا جزئی برای شکل‌های بدون ایندکس مناسب
+    """
+    try:
+        shapes = await run_index_advisor()
+        
+        return {
+            "shapes": shapes,
+            "recommendations": sum(1 for shape in shapes if shape["recommendation"]),
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error running index advisor: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running index advisor: {str(e)}"
+        )
+
+@router.get("/scoring", summary="Get importance scoring formula and rescoring progress")
+async def get_scoring_status():
+    """
+    دریافت فرمول فعلی امتیاز اهمیت:
+    - تعریف و نسخه فرمول
+    - وضعیت دور جاری محاسبه مجدد
+    - تعداد توییت‌هایی که با نسخه دیگری امتیاز گرفته‌اند
+    """
+    try:
+        return await scoring_engine.status()
+    
+    except Exception as e:
+        logger.error(f"Error getting scoring status: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting scoring status: {str(e)}"
+        )
+
+@router.post("/scoring/rescore", summary="Rescore tweets with the current importance formula")
+async def rescore_tweets(
+    request: ScoringRescoreRequest = Body(...)
+):
+    """
+    محاسبه مجدد امتیاز اهمیت از آخرین نقطه ذخیره شده:
+    - max_batches: حداکثر دسته‌ها در این درخواست (پیش‌فرض: تا پایان)
+    - restart: شروع دور از ابتدای کالکشن
+    """
+    try:
+        result = await scoring_engine.rescore(max_batches=request.max_batches, restart=request.restart)
+        
+        return {
+            "status": "success",
+            **result,
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error rescoring tweets: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error rescoring tweets: {str(e)}"
+        )
+
+@router.get("/enrichment", summary="Get enrichment stages queue and throughput")
+async def get_enrichment_status():
+    """
+    دریافت وضعیت مراحل غنی‌سازی:
+    - تعداد توییت‌های در صف هر مرحله
+    - عمر قدیمی‌ترین توییت صف (lag_seconds)
+    - توان عملیاتی و تعداد خطاهای این پروسه
+    """
+    try:
+        return {
+            "stages": await enrichment_runner.status(),
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting enrichment status: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting enrichment status: {str(e)}"
+        )
+
+@router.get("/logging", summary="Get log queue status")
+async def get_logging_status():
+    """
+    دریافت وضعیت صف لاگ
+    - تعداد رکوردهای در انتظار نوشتن
+    - تعداد رکوردهای حذف شده به دلیل پر بودن صف
+    """
+    return {
+        **logging_status(),
+        "timestamp": datetime.utcnow()
+    }
+
+@router.get("/retention", summary="Get retention policies and progress")
+async def get_retention_status():
+    """
+    دریافت وضعیت حذف توییت‌های منقضی:
+    - نقطه ذخیره شده دور جاری و آمار آن
+    - سیاست پیش‌فرض و سیاست‌های اختصاصی کلمات کلیدی
+    - اندازه دسته و تاخیر مشاهده شده
+    """
+    try:
+        return {
+            **await retention_engine.status(),
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting retention status: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting retention status: {str(e)}"
+        )
+
+@router.get("/compaction", summary="Get compaction plan and history")
+async def get_compaction_status(
+    limit: int = Query(20, ge=1, le=200, description="Number of history entries")
+):
+    """
+    دریافت وضعیت فشرده‌سازی کالکشن‌ها:
+    - فضای قابل بازپس‌گیری هر کالکشن و ایندکس‌های آن
+    - کالکشن‌های نامزد compact در پنجره نگهداری بعدی
+    - فضای بازپس‌گرفته شده در اجراهای اخیر
+    """
+    try:
+        spaces = await compaction_planner.measure()
+        return {
+            "collections": sorted(spaces, key=lambda space: space["reclaimable_bytes"], reverse=True),
+            "candidates": [space["collection"] for space in plan_compaction(spaces)],
+            "history": await compaction_planner.history(limit),
+            "timestamp": datetime.utcnow()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting compaction status: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting compaction status: {str(e)}"
+        )
+
 @router.get("/migrations", response_model=MigrationStatusResponse, summary="Get migrations status")
 async def get_migrations_status():
     """
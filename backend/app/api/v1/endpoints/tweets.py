@@ -1,15 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from pydantic import BaseModel, Field, validator
+from pymongo.errors import ExecutionTimeout
 
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.execution import TaskExecution
+from app.services.archive import cold_archive
+from app.services.engagement import engagement_history
+from app.services.entities import entity_counter, entity_key
 from app.services.factory import twitter_service_factory
-from app.core.db import get_collection
+from app.services.search import FACETS, build_tweet_query, facet_stages, parse_facets
+from app.services.topics import topic_extractor
+from app.services.trending import trending_engine
+from app.services.unique_authors import unique_author_counter
+from app.services.users import user_store
+from app.core.db import get_collection, ANALYTICS_PROFILE
+from app.tasks.twitter_tasks import extract_keyword_timed
 
 logger = get_logger("app.api.tweets")
 
 router = APIRouter()
 
+# فیلدهای داخلی که در پاسخ API برگردانده نمی‌شوند (امضای باینری MinHash)
+TWEET_PROJECTION = {"minhash": 0}
+
+# ترتیب‌های قابل انتخاب در جستجوی توییت‌ها
+SORT_FIELDS = {
+    "created_at": [("created_at", -1)],
+    "importance": [("importance_score", -1), ("created_at", -1)],
+    "velocity": [("velocity_score", -1), ("created_at", -1)],
+}
+
+class TweetSearchRequest(BaseModel):
+    """فیلترهای GET /tweets به همراه برش‌های درخواستی"""
+    keyword: Optional[str] = None
+    user_screen_name: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    importance_min: Optional[float] = None
+    is_verified: Optional[bool] = None
+    sentiment: Optional[str] = Field(None, regex="^(positive|negative|neutral)$")
+    topic: Optional[str] = None
+    search_text: Optional[str] = None
+    cluster_id: Optional[str] = None
+    exclude_duplicates: bool = False
+    sort_by: str = Field("created_at", regex="^(created_at|importance|velocity)$")
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+    facets: List[str] = Field(default_factory=lambda: list(FACETS), description="lang, keywords, verified, sentiment, date")
+    facet_limit: int = Field(10, ge=1, le=100)
+    histogram_interval: str = Field("day", regex="^(hour|day)$")
+    approximate: bool = Field(False, description="Compute facets over a random sample when the match set is huge")
+    
+    @validator("facets")
+    def validate_facets(cls, value):
+        unknown = set(value) - set(FACETS)
+        if unknown:
+            raise ValueError(f"Unknown facets: {', '.join(sorted(unknown))}")
+        return list(dict.fromkeys(value))
+
+# فیلدهای فیلتر درخواست جستجو (ورودی build_tweet_query)
+SEARCH_FILTER_FIELDS = {
+    "keyword", "user_screen_name", "start_date", "end_date", "importance_min", "is_verified",
+    "sentiment", "topic", "search_text", "cluster_id", "exclude_duplicates"
+}
+
 @router.get("/", summary="Get tweets with filters")
 async def get_tweets(
     keyword: Optional[str] = Query(None, description="Filter by keyword"),
@@ -18,7 +76,12 @@ async def get_tweets(
     end_date: Optional[datetime] = Query(None, description="Filter by end date"),
     importance_min: Optional[float] = Query(None, description="Minimum importance score"),
     is_verified: Optional[bool] = Query(None, description="Filter by user verification status"),
-    search_text: Optional[str] = Query(None, description="Full-text search in tweet content"),
+    sentiment: Optional[str] = Query(None, regex="^(positive|negative|neutral)$", description="Filter by sentiment label"),
+    topic: Optional[str] = Query(None, description="Filter by topic ID"),
+    search_text: Optional[str] = Query(None, description="Search in normalized tweet tokens (all terms must match)"),
+    cluster_id: Optional[str] = Query(None, description="Filter by near-duplicate cluster (canonical tweet ID)"),
+    exclude_duplicates: bool = Query(False, description="Hide near-duplicate copies"),
+    sort_by: str = Query("created_at", regex="^(created_at|importance|velocity)$", description="Sort order: created_at, importance or velocity"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page")
 ):
@@ -29,38 +92,26 @@ async def get_tweets(
         tweets_collection = get_collection("tweets")
         
         # ساخت کوئری
-        query = {}
-        
-        # اعمال فیلترها
-        if keyword:
-            query["keywords"] = keyword
-        
-        if user_screen_name:
-            query["user_screen_name"] = user_screen_name
-        
-        if start_date:
-            query["created_at"] = query.get("created_at", {})
-            query["created_at"]["$gte"] = start_date
-        
-        if end_date:
-            query["created_at"] = query.get("created_at", {})
-            query["created_at"]["$lte"] = end_date
-        
-        if importance_min is not None:
-            query["importance_score"] = {"$gte": importance_min}
-        
-        if is_verified is not None:
-            query["user_verified"] = is_verified
-        
-        # جستجوی متنی
-        if search_text:
-            query["$text"] = {"$search": search_text}
+        query = build_tweet_query(
+            keyword=keyword,
+            user_screen_name=user_screen_name,
+            start_date=start_date,
+            end_date=end_date,
+            importance_min=importance_min,
+            is_verified=is_verified,
+            sentiment=sentiment,
+            topic=topic,
+            search_text=search_text,
+            cluster_id=cluster_id,
+            exclude_duplicates=exclude_duplicates
+        )
         
         # اجرای کوئری با صفحه‌بندی
         total_count = await tweets_collection.count_documents(query)
         
         skip = (page - 1) * page_size
-        cursor = tweets_collection.find(query).sort("created_at", -1).skip(skip).limit(page_size)
+        sort = SORT_FIELDS[sort_by]
+        cursor = tweets_collection.find(query, TWEET_PROJECTION).sort(sort).skip(skip).limit(page_size)
         
         tweets = []
         async for tweet in cursor:
@@ -68,6 +119,9 @@ async def get_tweets(
             tweet["id"] = str(tweet.pop("_id"))
             tweets.append(tweet)
         
+        # پروفایل نویسندگان از کالکشن users
+        await user_store.attach(tweets)
+        
         return {
             "total": total_count,
             "page": page,
@@ -82,85 +136,213 @@ async def get_tweets(
             detail=f"Error retrieving tweets: {str(e)}"
         )
 
-@router.get("/{tweet_id}", summary="Get tweet by ID")
-async def get_tweet(
-    tweet_id: str = Path(..., description="Tweet ID")
+@router.post("/search", summary="Search tweets with facets in a single aggregation")
+async def search_tweets(
+    request: TweetSearchRequest = Body(...)
 ):
     """
-    دریافت یک توییت با شناسه
+    جستجوی توییت‌ها با فیلترهای GET /tweets و برش‌های زبان، کلمه کلیدی، تایید حساب، احساسات و هیستوگرام زمانی
+    
+    - صفحه نتایج، تعداد کل و برش‌ها با یک aggregation و مرحله $facet محاسبه می‌شوند
+    - approximate: اگر تعداد نتایج از SEARCH_SAMPLE_THRESHOLD بیشتر باشد، برش‌ها روی نمونه تصادفی
+      SEARCH_SAMPLE_SIZE سندی ($sample) محاسبه و به کل نتایج تعمیم داده می‌شوند
+    - هر کوئری حداکثر SEARCH_MAX_TIME_MS میلی‌ثانیه اجرا می‌شود
     """
     try:
-        tweets_collection = get_collection("tweets")
+        tweets_collection = get_collection("tweets", ANALYTICS_PROFILE)
+        
+        query = build_tweet_query(**request.dict(include=SEARCH_FILTER_FIELDS))
+        skip = (request.page - 1) * request.page_size
+        sort = dict(SORT_FIELDS[request.sort_by])
+        stages = facet_stages(request.facets, request.facet_limit, request.histogram_interval)
+        max_time_ms = settings.SEARCH_MAX_TIME_MS
+        
+        hits_stages = [{"$sort": sort}, {"$skip": skip}, {"$limit": request.page_size}, {"$project": TWEET_PROJECTION}]
+        
+        sampled = False
+        if request.approximate:
+            total_count = await tweets_collection.count_documents(query, maxTimeMS=max_time_ms)
+            sampled = total_count > settings.SEARCH_SAMPLE_THRESHOLD
+        
+        if sampled:
+            # صفحه نتایج با ایندکس و برش‌ها روی نمونه تصادفی، به صورت هم‌زمان
+            sample_size = settings.SEARCH_SAMPLE_SIZE
+            hits_cursor = tweets_collection.aggregate(
+                [{"$match": query}, *hits_stages], maxTimeMS=max_time_ms
+            )
+            if stages:
+                facets_cursor = tweets_collection.aggregate(
+                    [{"$match": query}, {"$sample": {"size": sample_size}}, {"$facet": stages}],
+                    maxTimeMS=max_time_ms,
+                    allowDiskUse=True
+                )
+                tweets, facet_results = await asyncio.gather(
+                    hits_cursor.to_list(length=request.page_size),
+                    facets_cursor.to_list(length=1)
+                )
+                facets = parse_facets(facet_results[0] if facet_results else {}, total_count / sample_size)
+            else:
+                # بدون برش درخواستی؛ $facet خالی توسط MongoDB پذیرفته نمی‌شود
+                tweets = await hits_cursor.to_list(length=request.page_size)
+                facets = {}
+        else:
+            pipeline = [
+                {"$match": query},
+                {"$facet": {
+                    "hits": hits_stages,
+                    "total": [{"$count": "count"}],
+                    **stages
+                }}
+            ]
+            results = await tweets_collection.aggregate(
+                pipeline, maxTimeMS=max_time_ms, allowDiskUse=True
+            ).to_list(length=1)
+            result = results[0] if results else {}
+            
+            tweets = result.pop("hits", [])
+            total = result.pop("total", [])
+            total_count = total[0]["count"] if total else 0
+            facets = parse_facets(result)
+        
+        for tweet in tweets:
+            tweet["id"] = str(tweet.pop("_id"))
+        await user_store.attach(tweets)
         
-        # جستجوی توییت
-        tweet = await tweets_collection.find_one({"tweet_id": tweet_id})
+        return {
+            "total": total_count,
+            "page": request.page,
+            "page_size": request.page_size,
+            "tweets": tweets,
+            "facets": facets,
+            "facets_approximate": sampled
+        }
         
-        if not tweet:
+    except ExecutionTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Search exceeded {settings.SEARCH_MAX_TIME_MS} ms; narrow the filters or use approximate facets"
+        )
+    except Exception as e:
+        logger.error(f"Error searching tweets: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching tweets: {str(e)}"
+        )
+
+@router.get("/trending", summary="Get trending terms or hashtags")
+async def get_trending(
+    keyword: Optional[str] = Query(None, description="Keyword (all keywords if omitted)"),
+    kind: str = Query("terms", regex="^(terms|hashtags)$", description="terms or hashtags"),
+    window_minutes: int = Query(60, ge=1, description="Sliding window in minutes"),
+    sort_by: str = Query("count", regex="^(count|growth)$", description="Sort by window count or growth vs previous window"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of items")
+):
+    """
+    دریافت کلمات یا هشتگ‌های داغ پنجره اخیر از موتور جریانی (بدون کوئری به دیتابیس)
+    
+    تکرارها تخمین Count-Min Sketch هستند و ممکن است کمی بیشتر از مقدار واقعی باشند.
+    """
+    try:
+        max_window = settings.TRENDING_RETENTION_MINUTES // 2
+        if window_minutes > max_window:
             raise HTTPException(
-                status_code=404,
-                detail=f"Tweet with ID {tweet_id} not found"
+                status_code=400,
+                detail=f"window_minutes must be at most {max_window}"
             )
         
-        # تبدیل ObjectId به رشته
-        tweet["id"] = str(tweet.pop("_id"))
+        items = trending_engine.top(keyword, kind, window_minutes, limit, sort_by)
         
-        return tweet
+        return {
+            "keyword": keyword,
+            "kind": kind,
+            "window_minutes": window_minutes,
+            "items": items,
+            "generated_at": datetime.utcnow()
+        }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting tweet {tweet_id}: {e}")
+        logger.error(f"Error getting trending items: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error retrieving tweet: {str(e)}"
+            detail=f"Error retrieving trending items: {str(e)}"
         )
 
-@router.post("/extract", status_code=202, summary="Extract tweets for keywords")
-async def extract_tweets(
-    request: dict
+@router.get("/topics", summary="Get extracted topics")
+async def get_topics(
+    keyword: Optional[str] = Query(None, description="Filter by keyword"),
+    hours: int = Query(24, ge=1, le=24 * 30, description="Time window in hours"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of topics")
 ):
     """
-    استخراج توییت‌ها برای کلمات کلیدی
+    دریافت موضوعات استخراج شده بازه‌های اخیر
+    
+    هر موضوع کلمات برتر (وزن در مرکز خوشه)، برچسب و تعداد توییت‌ها را دارد؛
+    شناسه موضوع در فیلد topics توییت‌ها و فیلتر topic جستجو قابل استفاده است.
     """
     try:
-        keywords = request.get("keywords")
-        limit = request.get("limit", 100)
-        lang = request.get("lang", "fa")
+        topics = await topic_extractor.get_topics(keyword, datetime.utcnow() - timedelta(hours=hours), limit)
         
-        # اگر کلمات کلیدی ارائه نشده باشد، استفاده از همه کلمات کلیدی فعال
-        if not keywords:
-            keywords_collection = get_collection("keywords")
-            active_keywords_cursor = keywords_collection.find({"is_active": True})
-            active_keywords = await active_keywords_cursor.to_list(length=100)
-            keywords = [k["keyword"] for k in active_keywords]
+        return {
+            "keyword": keyword,
+            "hours": hours,
+            "topics": topics
+        }
         
-        if not keywords:
-            return {
-                "status": "warning",
-                "message": "No keywords provided or found",
-                "results": {}
-            }
+    except Exception as e:
+        logger.error(f"Error getting topics: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving topics: {str(e)}"
+        )
+
+@router.get("/clusters", summary="Get largest near-duplicate clusters")
+async def get_duplicate_clusters(
+    keyword: Optional[str] = Query(None, description="Filter by keyword"),
+    hours: int = Query(24, ge=1, le=720, description="Time window in hours"),
+    min_size: int = Query(2, ge=2, description="Minimum cluster size (canonical tweet included)"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of clusters")
+):
+    """
+    دریافت بزرگ‌ترین خوشه‌های توییت‌های تقریباً تکراری (کپی‌پیست‌ها)
+    
+    اندازه خوشه از شمارنده duplicate_count توییت اصلی خوانده می‌شود و نیازی به گروه‌بندی ندارد.
+    """
+    try:
+        tweets_collection = get_collection("tweets")
         
-        # دریافت سرویس توییتر
-        twitter_service = twitter_service_factory.get_service()
+        query = {
+            "duplicate_count": {"$gte": min_size - 1},
+            "created_at": {"$gte": datetime.utcnow() - timedelta(hours=hours)}
+        }
+        if keyword:
+            query["keywords"] = keyword
         
-        # استخراج توییت‌ها
-        results = {}
-        for keyword in keywords:
-            result = await twitter_service.extract_tweets_for_keyword(keyword, limit, lang)
-            results[keyword] = result
+        projection = {
+            "_id": 0, "tweet_id": 1, "text": 1, "user_screen_name": 1,
+            "created_at": 1, "duplicate_count": 1, "keywords": 1
+        }
+        cursor = tweets_collection.find(query, projection).sort("duplicate_count", -1).limit(limit)
+        
+        clusters = []
+        async for tweet in cursor:
+            clusters.append({
+                "cluster_id": tweet["tweet_id"],
+                "size": tweet["duplicate_count"] + 1,
+                "canonical_tweet": tweet
+            })
         
         return {
-            "status": "success",
-            "message": f"Extraction started for {len(keywords)} keywords",
-            "results": results
+            "hours": hours,
+            "clusters": clusters
         }
         
     except Exception as e:
-        logger.error(f"Error extracting tweets: {e}")
+        logger.error(f"Error getting duplicate clusters: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error extracting tweets: {str(e)}"
+            detail=f"Error retrieving duplicate clusters: {str(e)}"
         )
 
 @router.get("/stats", summary="Get tweet statistics")
@@ -169,7 +351,7 @@ async def get_tweet_stats():
     دریافت آمار توییت‌ها
     """
     try:
-        tweets_collection = get_collection("tweets")
+        tweets_collection = get_collection("tweets", ANALYTICS_PROFILE)
         
         # تعداد کل توییت‌ها
         total_tweets = await tweets_collection.count_documents({})
@@ -202,18 +384,26 @@ async def get_tweet_stats():
         tweets_by_language = await tweets_by_language_cursor.to_list(length=10)
         
         # محدوده زمانی داده‌ها
-        oldest_tweet = await tweets_collection.find_one({}, sort=[("created_at", 1)])
-        newest_tweet = await tweets_collection.find_one({}, sort=[("created_at", -1)])
+        oldest_tweet = await tweets_collection.find_one({}, {"created_at": 1}, sort=[("created_at", 1)])
+        newest_tweet = await tweets_collection.find_one({}, {"created_at": 1}, sort=[("created_at", -1)])
         
         oldest_date = oldest_tweet.get("created_at") if oldest_tweet else None
         newest_date = newest_tweet.get("created_at") if newest_tweet else None
         
+        # نویسندگان یکتا (تخمین HyperLogLog از اسناد author_rollups)
+        unique_authors_today = await unique_author_counter.estimate(None, today_start)
+        unique_authors_24h = await unique_author_counter.estimate(None, last_24h)
+        
         return {
             "total_tweets": total_tweets,
             "tweets_today": tweets_today,
             "tweets_last_24h": tweets_last_24h,
             "tweets_by_keyword": tweets_by_keyword,
             "tweets_by_language": tweets_by_language,
+            "unique_authors": {
+                "today": unique_authors_today,
+                "last_24h": unique_authors_24h
+            },
             "date_range": {
                 "oldest": oldest_date.isoformat() if oldest_date else None,
                 "newest": newest_date.isoformat() if newest_date else None
@@ -225,4 +415,246 @@ async def get_tweet_stats():
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving tweet statistics: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/authors/unique", summary="Get approximate distinct author counts")
+async def get_unique_authors(
+    keyword: Optional[List[str]] = Query(None, description="Keywords (all keywords if omitted)"),
+    hours: int = Query(24, ge=1, le=24 * 90, description="Time window in hours"),
+):
+    """
+    تخمین تعداد حساب‌های یکتایی که درباره کلمات کلیدی توییت کرده‌اند
+    
+    مقدار از ادغام HyperLogLog های ساعتی محاسبه می‌شود؛ relative_error خطای استاندارد نسبی است.
+    """
+    try:
+        start = datetime.utcnow() - timedelta(hours=hours)
+        result = await unique_author_counter.estimate(keyword, start)
+        result["hours"] = hours
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error estimating unique authors: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error estimating unique authors: {str(e)}"
+        )
+
+@router.get("/entities/top", summary="Get most frequent hashtags, mentions or URLs")
+async def get_top_entities(
+    entity_type: str = Query("hashtag", alias="type", regex="^(hashtag|mention|url)$", description="hashtag, mention or url"),
+    keyword: Optional[str] = Query(None, description="Keyword (all keywords if omitted)"),
+    days: int = Query(1, ge=1, description="Number of recent days including today"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of items")
+):
+    """
+    دریافت پرتکرارترین هشتگ‌ها، منشن‌ها یا لینک‌ها از شمارنده‌های روزانه entity_counts
+    
+    شمارش فقط روی توییت‌های درج شده در روزهای انتشار آنها انجام می‌شود (بدون unwind کالکشن tweets).
+    """
+    try:
+        if days > settings.ENTITY_TOP_MAX_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"days must be at most {settings.ENTITY_TOP_MAX_DAYS}"
+            )
+        
+        items = await entity_counter.top(entity_type, keyword, days, limit)
+        
+        return {
+            "type": entity_type,
+            "keyword": keyword,
+            "days": days,
+            "items": items,
+            "generated_at": datetime.utcnow()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting top entities: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving top entities: {str(e)}"
+        )
+
+@router.get("/entities/{entity_type}/tweets", summary="Get tweets containing a hashtag, mention or URL")
+async def get_entity_tweets(
+    entity_type: str = Path(..., regex="^(hashtag|mention|url)$", description="hashtag, mention or url"),
+    value: str = Query(..., min_length=1, description="Hashtag (with or without #), screen name or URL"),
+    keyword: Optional[str] = Query(None, description="Filter by keyword"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(20, ge=1, le=100, description="Items per page")
+):
+    """
+    دریافت جدیدترین توییت‌های یک موجودیت با ایندکس entity_keys
+    """
+    try:
+        tweets_collection = get_collection("tweets")
+        
+        key = entity_key(entity_type, value)
+        query: Dict[str, Any] = {"entity_keys": key}
+        if keyword:
+            query["keywords"] = keyword
+        
+        total_count = await tweets_collection.count_documents(query)
+        
+        skip = (page - 1) * page_size
+        cursor = tweets_collection.find(query, TWEET_PROJECTION).sort("created_at", -1).skip(skip).limit(page_size)
+        
+        tweets = []
+        async for tweet in cursor:
+            tweet["id"] = str(tweet.pop("_id"))
+            tweets.append(tweet)
+        
+        await user_store.attach(tweets)
+        
+        return {
+            "entity": key,
+            "total": total_count,
+            "page": page,
+            "page_size": page_size,
+            "tweets": tweets
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting tweets for {entity_type} {value}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving entity tweets: {str(e)}"
+        )
+
+@router.get("/{tweet_id}", summary="Get tweet by ID")
+async def get_tweet(
+    tweet_id: str = Path(..., description="Tweet ID")
+):
+    """
+    دریافت یک توییت با شناسه
+    """
+    try:
+        tweets_collection = get_collection("tweets")
+        
+        # جستجوی توییت
+        tweet = await tweets_collection.find_one({"tweet_id": tweet_id}, TWEET_PROJECTION)
+        
+        # توییت‌های حذف شده توسط سیاست نگهداری از آرشیو سرد خوانده می‌شوند
+        if not tweet and settings.ARCHIVE_ENABLED:
+            tweet = await cold_archive.find(tweet_id)
+            if tweet:
+                tweet["archived"] = True
+        
+        if not tweet:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Tweet with ID {tweet_id} not found"
+            )
+        
+        # تبدیل ObjectId به رشته
+        tweet["id"] = str(tweet.pop("_id"))
+        
+        # پروفایل نویسنده از کالکشن users
+        await user_store.attach([tweet])
+        
+        return tweet
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting tweet {tweet_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving tweet: {str(e)}"
+        )
+
+@router.get("/{tweet_id}/velocity", summary="Get engagement history and velocity of a tweet")
+async def get_tweet_velocity(
+    tweet_id: str = Path(..., description="Tweet ID"),
+    hours: int = Query(72, ge=1, le=24 * 30, description="History window in hours")
+):
+    """
+    دریافت تاریخچه شمارنده‌های تعامل و سرعت تعامل یک توییت
+    
+    - samples: نمونه‌های ثبت شده در هر به‌روزرسانی با سرعت هر بازه (تعامل در ساعت)
+    - velocity و velocity_score: سرعت هموار شده فعلی
+    """
+    try:
+        tweet = await get_collection("tweets").find_one(
+            {"tweet_id": tweet_id},
+            {"_id": 0, "tweet_id": 1, "velocity": 1, "velocity_score": 1, "engagement_observed_at": 1}
+        )
+        
+        if not tweet:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Tweet with ID {tweet_id} not found"
+            )
+        
+        samples = await engagement_history.get_series(tweet_id, datetime.utcnow() - timedelta(hours=hours))
+        
+        return {
+            "tweet_id": tweet_id,
+            "velocity": tweet.get("velocity", 0.0),
+            "velocity_score": tweet.get("velocity_score", 0.0),
+            "engagement_observed_at": tweet.get("engagement_observed_at"),
+            "samples": samples
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting velocity for tweet {tweet_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving tweet velocity: {str(e)}"
+        )
+
+@router.post("/extract", status_code=202, summary="Extract tweets for keywords")
+async def extract_tweets(
+    request: dict
+):
+    """
+    استخراج توییت‌ها برای کلمات کلیدی
+    """
+    try:
+        keywords = request.get("keywords")
+        limit = request.get("limit", 100)
+        lang = request.get("lang", "fa")
+        
+        # اگر کلمات کلیدی ارائه نشده باشد، استفاده از همه کلمات کلیدی فعال
+        if not keywords:
+            keywords_collection = get_collection("keywords")
+            active_keywords_cursor = keywords_collection.find({"is_active": True})
+            active_keywords = await active_keywords_cursor.to_list(length=100)
+            keywords = [k["keyword"] for k in active_keywords]
+        
+        if not keywords:
+            return {
+                "status": "warning",
+                "message": "No keywords provided or found",
+                "results": {}
+            }
+        
+        # دریافت سرویس توییتر
+        twitter_service = twitter_service_factory.get_service()
+        
+        # استخراج توییت‌ها (با ثبت در لاگ اجرا)
+        results = {}
+        async with TaskExecution("extract_tweets", trigger="manual") as execution:
+            for keyword in keywords:
+                result = await extract_keyword_timed(twitter_service, keyword, limit, lang)
+                results[keyword] = result
+            execution.set_result({"status": "success", "keywords": len(keywords)})
+        
+        return {
+            "status": "success",
+            "message": f"Extraction started for {len(keywords)} keywords",
+            "results": results
+        }
+        
+    except Exception as e:
+        logger.error(f"Error extracting tweets: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error extracting tweets: {str(e)}"
+        )
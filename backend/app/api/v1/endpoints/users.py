@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Path
+
+from app.core.logging import get_logger
+from app.core.db import get_collection
+from app.services.users import user_store
+
+logger = get_logger("app.api.users")
+
+router = APIRouter()
+
+@router.get("/{screen_name}", summary="Get user profile by screen name")
+async def get_user(
+    screen_name: str = Path(..., description="User screen name (with or without @)")
+):
+    """
+    دریافت پروفایل یک نویسنده از کالکشن users به همراه تعداد توییت‌های ذخیره شده او
+    """
+    try:
+        profile = await user_store.get(screen_name)
+        
+        if not profile:
+            raise HTTPException(
+                status_code=404,
+                detail=f"User {screen_name} not found"
+            )
+        
+        profile["tweet_count"] = await get_collection("tweets").count_documents({"user_id": profile["user_id"]})
+        
+        return profile
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting user {screen_name}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving user: {str(e)}"
+        )
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import tweets, keywords
+from app.api.v1.endpoints import tweets, keywords, users
 
 # روتر اصلی API
 api_router = APIRouter()
@@ -7,8 +7,8 @@ api_router = APIRouter()
 # اضافه کردن روترهای نقاط انتهایی مختلف
 api_router.include_router(tweets.router, prefix="/tweets", tags=["tweets"])
 api_router.include_router(keywords.router, prefix="/keywords", tags=["keywords"])
+api_router.include_router(users.router, prefix="/users", tags=["users"])
 
 # روترهای اضافی در آینده می‌توانند به اینجا اضافه شوند
 # مثال:
 # api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
-# api_router.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
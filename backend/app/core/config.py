@@ -16,6 +16,26 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URI: str
     MONGODB_DB: str = "hooshyar"
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"  # فشرده‌سازی پروتکل به ترتیب ترجیح (کتابخانه‌های نصب نشده نادیده گرفته می‌شوند)
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # پروفایل‌های کلاینت به تفکیک بار کاری؛ هر پروفایل پول اتصال جدای خود را دارد.
+    # default: نوشتن‌های ذخیره توییت و کوئری‌های عادی (primary)
+    # analytics: aggregation های آمار و تحلیل (secondaryPreferred با سقف تاخیر تکثیر، حداقل 90 ثانیه)
+    MONGODB_CLIENT_PROFILES: Dict[str, Dict[str, Any]] = {
+        "default": {
+            "min_pool_size": 5,
+            "max_pool_size": 100,
+            "max_idle_time_ms": 300000,
+            "read_preference": "primary"
+        },
+        "analytics": {
+            "min_pool_size": 0,
+            "max_pool_size": 20,
+            "max_idle_time_ms": 60000,
+            "read_preference": "secondaryPreferred",
+            "max_staleness_seconds": 120
+        }
+    }
     
     # تنظیم نوع سرویس توییتر
     TWITTER_SERVICE_TYPE: str = "twitter_api_io"  # گزینه‌ها: "official" یا "twitter_api_io"
@@ -34,6 +54,8 @@ class Settings(BaseSettings):
     DEFAULT_TWEET_LANG: str = "fa"
     EXTRACTION_BATCH_SIZE: int = 20
     API_RATE_LIMIT_WAIT: int = 5  # seconds
+    PROVIDER_MAX_RETRIES: int = 2  # تلاش مجدد برای خطاهای 429/5xx و خطای اتصال
+    PROVIDER_RETRY_BACKOFF: float = 1.0  # seconds (نمایی)
     
     # تنظیمات زمان‌بند
     SCHEDULER_JOBS: Dict[str, Any] = {
@@ -41,6 +63,167 @@ class Settings(BaseSettings):
         "update_stats": {"minutes": 60}
     }
     
+    # لاگ اجرای کارها
+    EXECUTION_LOG_TTL_DAYS: int = 30  # حذف خودکار لاگ‌ها با ایندکس TTL
+    EXECUTION_LOG_MAX_ERRORS: int = 50  # حداکثر خطاهای ذخیره شده در هر اجرا
+    
+    # متریک‌ها (Prometheus)
+    METRICS_ENABLED: bool = True
+    EVENT_LOOP_LAG_INTERVAL: float = 1.0  # seconds
+    
+    # نمونه‌بردار پس‌زمینه آمار سیستم (endpointهای آمار آخرین نمونه را می‌خوانند)
+    SYSTEM_SAMPLER_ENABLED: bool = True
+    SYSTEM_SAMPLER_INTERVAL_SECONDS: int = 30
+    SYSTEM_SAMPLER_HISTORY: int = 120  # تعداد نمونه‌های نگهداری شده در حافظه
+    
+    # سری زمانی آمار سیستم (نمونه‌های خام و تجمیع ساعتی و روزانه با TTL جداگانه)
+    SYSTEM_STATS_RECORD_SECONDS: int = 60
+    SYSTEM_STATS_ROLLUP_MINUTES: int = 15
+    SYSTEM_STATS_RAW_TTL_DAYS: int = 3
+    SYSTEM_STATS_HOURLY_TTL_DAYS: int = 90
+    SYSTEM_STATS_DAILY_TTL_DAYS: int = 730
+    
+    # پایش کوئری‌های MongoDB
+    QUERY_MONITOR_ENABLED: bool = True
+    MONGO_SLOW_QUERY_MS: float = 100.0  # آستانه لاگ کوئری کند
+    QUERY_MONITOR_MAX_SHAPES: int = 500  # حداکثر شکل‌های کوئری نگهداری شده
+    QUERY_MONITOR_SAMPLE_SIZE: int = 512  # تعداد نمونه‌های تاخیر برای محاسبه صدک
+    QUERY_MONITOR_EXPLAIN_INTERVAL: int = 600  # seconds - فاصله explain مجدد یک شکل کند
+    INDEX_ADVISOR_MAX_EXAMINED_RATIO: float = 10.0  # نسبت مجاز اسناد/کلیدهای بررسی شده به بازگشتی
+    INDEX_ADVISOR_SAMPLE_LIMIT: int = 20  # اندازه صفحه در explain شکل‌ها
+    
+    # پردازش متن و جستجو
+    SEARCH_TOKEN_MIN_LENGTH: int = 2  # حداقل طول توکن قابل جستجو
+    SEARCH_TOKENS_MAX: int = 64  # حداکثر تعداد توکن ذخیره شده برای هر توییت
+    
+    # تشخیص توییت‌های تقریباً تکراری (MinHash + LSH)
+    DEDUP_ENABLED: bool = True
+    DEDUP_WINDOW_HOURS: int = 24  # پنجره زمانی مقایسه
+    DEDUP_MAX_FINGERPRINTS: int = 200000  # سقف امضاهای نگهداری شده در حافظه
+    DEDUP_NUM_PERM: int = 64  # تعداد جایگشت‌های MinHash
+    DEDUP_BANDS: int = 16  # تعداد باندهای LSH (باید بر DEDUP_NUM_PERM بخش‌پذیر باشد)
+    DEDUP_SIMILARITY: float = 0.7  # حداقل شباهت Jaccard تخمینی برای تکراری بودن
+    DEDUP_MIN_TOKENS: int = 5  # متن‌های کوتاه‌تر بررسی نمی‌شوند
+    DEDUP_DROP_RAW_DATA: bool = True  # عدم ذخیره raw_data برای نسخه‌های تکراری
+    
+    # موضوعات داغ (Count-Min Sketch + Space-Saving)
+    TRENDING_ENABLED: bool = True
+    TRENDING_BUCKET_MINUTES: int = 10  # طول هر بازه زمانی
+    TRENDING_RETENTION_MINUTES: int = 180  # مدت نگهداری بازه‌ها (حداکثر پنجره قابل مقایسه دو برابر پنجره درخواستی است)
+    TRENDING_CMS_WIDTH: int = 1024
+    TRENDING_CMS_DEPTH: int = 4
+    TRENDING_TOP_K: int = 100  # کاندیدهای پرتکرار هر بازه
+    TRENDING_SNAPSHOT_MINUTES: int = 5  # فاصله ذخیره بازه‌ها در MongoDB
+    
+    # شمارش تقریبی نویسندگان یکتا (HyperLogLog)
+    HLL_PRECISION: int = 12  # 4096 رجیستر، خطای نسبی حدود 1.6%
+    HLL_MEMORY_HOURS: int = 2  # ساعت‌های نگهداری شده در حافظه هر پروسه
+    HLL_ROLLUP_TTL_DAYS: int = 90  # مدت نگهداری اسناد author_rollups
+    
+    # تاریخچه تعاملات و سرعت تعامل
+    ENGAGEMENT_BUCKET_SIZE: int = 200  # حداکثر نمونه در هر سند تاریخچه (یک توییت در یک روز)
+    ENGAGEMENT_HISTORY_TTL_DAYS: int = 30
+    VELOCITY_SMOOTHING: float = 0.5  # ضریب میانگین نمایی سرعت
+    VELOCITY_SCORE_SCALE: float = 1000.0  # سرعت (تعامل در ساعت) معادل امتیاز 100
+    
+    # برنامه‌ریز به‌روزرسانی آمار توییت‌ها (صف اولویت تعامل مورد انتظار)
+    REFRESH_BUDGET_PER_HOUR: int = 100  # سقف درخواست‌های دریافت آمار در ساعت
+    REFRESH_TICK_SECONDS: int = 60  # فاصله اجرای برنامه‌ریز
+    REFRESH_MAX_AGE_HOURS: int = 72  # توییت‌های قدیمی‌تر تثبیت شده فرض می‌شوند
+    REFRESH_MIN_INTERVAL_MINUTES: int = 15  # حداقل فاصله دو به‌روزرسانی یک توییت
+    REFRESH_VELOCITY_HALF_LIFE_HOURS: float = 6.0  # نیمه عمر کاهش سرعت تعامل
+    REFRESH_IMPORTANCE_WEIGHT: float = 1.0  # تقویت اولویت براساس امتیاز اهمیت (امتیاز 100 = دو برابر)
+    REFRESH_MIN_PRIORITY: float = 1.0  # حداقل تعامل مورد انتظار برای ارزش دریافت مجدد
+    REFRESH_EXPLORATION_HOURS: float = 6.0  # توییت‌های جوان‌تر حداقل با سرعت پیشین بررسی می‌شوند
+    REFRESH_PRIOR_VELOCITY: float = 2.0  # سرعت پیشین توییت‌های جوان (تعامل در ساعت)
+    REFRESH_CANDIDATE_LIMIT: int = 2000  # سقف کاندیدهای هر کوئری
+    
+    # امتیاز اهمیت توییت (فرمول اعلانی؛ هر جمله: field، weight، cap و scale=linear|log)
+    SCORING_FORMULA: Dict[str, Any] = {
+        "terms": [
+            {"field": "user_followers_count", "weight": 0.001, "cap": 50},  # حداکثر 50 امتیاز برای فالوئرها
+            {"field": "favorite_count", "weight": 0.1, "cap": 30},  # حداکثر 30 امتیاز برای لایک‌ها
+            {"field": "retweet_count", "weight": 0.2, "cap": 20},  # حداکثر 20 امتیاز برای ریتوییت‌ها
+        ],
+        "decay_half_life_hours": None  # نیمه عمر کاهش امتیاز با سن توییت
+    }
+    SCORING_BATCH_SIZE: int = 1000  # اندازه دسته محاسبه مجدد
+    SCORING_MAX_BATCHES: int = 50  # حداکثر دسته‌ها در هر اجرای زمان‌بند
+    SCORING_RESCORE_MINUTES: int = 30  # فاصله اجرای محاسبه مجدد
+    SCORING_DECAY_REFRESH_HOURS: int = 24  # فاصله دورهای کامل محاسبه مجدد در صورت فعال بودن کاهش با زمان
+    
+    # جستجوی توییت‌ها با برش‌ها ($facet)
+    SEARCH_MAX_TIME_MS: int = 5000  # سقف زمان اجرای هر کوئری جستجو
+    SEARCH_SAMPLE_THRESHOLD: int = 100000  # در حالت approximate، بیش از این تعداد نتیجه برش‌ها نمونه‌گیری می‌شوند
+    SEARCH_SAMPLE_SIZE: int = 20000
+    
+    # شمارنده‌های روزانه موجودیت‌ها (هشتگ، منشن، لینک)
+    ENTITY_COUNTS_TTL_DAYS: int = 90
+    ENTITY_TOP_MAX_DAYS: int = 30  # حداکثر بازه روزهای پرتکرارترین موجودیت‌ها
+    
+    # کالکشن کاربران
+    USER_CACHE_SIZE: int = 50000  # نویسندگان نگه داشته شده در کش LRU برای رد upsert پروفایل تکراری
+    
+    # غنی‌سازی توییت‌ها (مراحل با اجاره دسته‌ای روی کالکشن tweets)
+    ENRICHMENT_INTERVAL_SECONDS: int = 60
+    ENRICHMENT_MAX_BATCHES: int = 20  # حداکثر دسته‌های هر مرحله در هر اجرای زمان‌بند
+    ENRICHMENT_LEASE_SECONDS: int = 300  # پس از این مدت دسته اجاره شده کارگر از کار افتاده دوباره قابل برداشت است
+    ENRICHMENT_PROCESSES: int = 4  # پروسه‌های کارگر مراحل cpu
+    ENRICHMENT_THREADS: int = 8  # نخ‌های کارگر مراحل io
+    
+    # تحلیل احساسات (واژگان فارسی)
+    SENTIMENT_ENABLED: bool = True
+    SENTIMENT_BATCH_SIZE: int = 2000  # توییت‌های هر دسته
+    SENTIMENT_CONCURRENCY: int = 4  # دسته‌های هم‌زمان در حال پردازش
+    SENTIMENT_LEXICON_PATH: Optional[str] = None  # فایل TSV واژگان تکمیلی (کلمه<TAB>وزن)
+    
+    # استخراج موضوعات (TF-IDF تنک و k-means کروی مینی‌بچ)
+    TOPIC_ENABLED: bool = True
+    TOPIC_INTERVAL_MINUTES: int = 30
+    TOPIC_WINDOW_HOURS: int = 24  # هر کلمه کلیدی در هر بازه مدل جداگانه دارد
+    TOPIC_CLUSTERS: int = 12  # تعداد موضوعات هر مدل
+    TOPIC_MAX_FEATURES: int = 5000  # سقف واژگان هر مدل
+    TOPIC_BATCH_SIZE: int = 1000  # اندازه مینی‌بچ
+    TOPIC_MAX_BATCHES: int = 20  # حداکثر دسته‌ها برای هر کلمه کلیدی در هر اجرا
+    TOPIC_MIN_TOKENS: int = 3  # توییت‌های کوتاه‌تر برچسب نمی‌خورند
+    TOPICS_PER_TWEET: int = 2
+    TOPIC_MIN_SIMILARITY: float = 0.1  # حداقل شباهت کسینوسی برای انتساب موضوع
+    TOPIC_SEED_MAX_SIMILARITY: float = 0.5  # اسناد کم‌شباهت‌تر به همه مراکز، مرکز جدید می‌سازند (تا TOPIC_CLUSTERS)
+    TOPIC_TOP_TERMS: int = 8  # کلمات توصیف هر موضوع
+    TOPIC_RETENTION_DAYS: int = 30  # مدت نگهداری مدل‌ها و توصیف موضوعات
+    
+    # نگهداری توییت‌ها (حذف دسته‌ای با محدودیت نرخ؛ کلمات کلیدی می‌توانند سیاست خود را داشته باشند)
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_MINUTES: int = 60
+    RETENTION_DEFAULT_DAYS: Optional[int] = 90  # None یعنی نگهداری دائمی
+    RETENTION_MIN_IMPORTANCE: Optional[float] = 10.0  # توییت‌های با امتیاز بیشتر یا مساوی حذف نمی‌شوند (None: بدون استثنا)
+    RETENTION_BATCH_SIZE: int = 1000  # حداکثر اسناد بررسی شده در هر دسته _id
+    RETENTION_MIN_BATCH_SIZE: int = 50
+    RETENTION_MAX_DOCS_PER_SECOND: int = 500  # سقف نرخ حذف
+    RETENTION_TARGET_LATENCY_MS: int = 200  # تاخیر هدف هر دسته؛ بیشتر از آن اندازه دسته نصف می‌شود
+    RETENTION_MAX_RUN_SECONDS: int = 300  # سقف زمان هر اجرا؛ ادامه از نقطه ذخیره شده
+    
+    # آرشیو سرد (توییت‌های منقضی پیش از حذف در فایل‌های NDJSON فشرده با zstd نوشته می‌شوند)
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_PATH: str = "archive"
+    ARCHIVE_COMPRESSION_LEVEL: int = 10
+    ARCHIVE_BLOCK_SIZE: int = 128  # توییت‌های هر فریم zstd (دانه‌بندی ایندکس پراکنده)
+    ARCHIVE_DICT_SIZE: int = 64 * 1024  # اندازه دیکشنری آموزش داده شده هر روز (بایت)
+    ARCHIVE_DICT_MIN_SAMPLES: int = 200  # حداقل توییت‌ها برای آموزش دیکشنری
+    ARCHIVE_SMALL_SEGMENT_TWEETS: int = 5000  # سگمنت‌های کوچک‌تر از این اندازه در فشرده‌سازی ادغام می‌شوند
+    ARCHIVE_MAX_SMALL_SEGMENTS: int = 8  # حداکثر سگمنت کوچک هر روز پیش از ادغام با نوشتن بعدی
+    ARCHIVE_INDEX_CACHE_SIZE: int = 256  # حداکثر ایندکس‌های پراکنده و دیکشنری‌های نگه داشته در حافظه
+    
+    # فشرده‌سازی انتخابی کالکشن‌ها (compact فقط برای کالکشن‌های دارای فضای قابل بازپس‌گیری)
+    COMPACTION_ENABLED: bool = True
+    COMPACTION_INTERVAL_MINUTES: int = 60
+    COMPACTION_WINDOW_START_HOUR: int = 2  # پنجره نگهداری به ساعت UTC (شروع == پایان یعنی همیشه)
+    COMPACTION_WINDOW_END_HOUR: int = 5
+    COMPACTION_MIN_RECLAIMABLE_MB: int = 256
+    COMPACTION_MIN_RECLAIMABLE_RATIO: float = 0.2  # نسبت فضای قابل بازپس‌گیری به حجم ذخیره‌سازی
+    COMPACTION_EXCLUDED_COLLECTIONS: List[str] = ["scheduler_jobs", "migrations"]
+    COMPACTION_HISTORY_TTL_DAYS: int = 180
+    
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
     
@@ -59,6 +242,9 @@ class Settings(BaseSettings):
     LOG_ROTATION: bool = True
     LOG_MAX_BYTES: int = 10485760  # 10MB
     LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_ENABLED: bool = True  # قالب‌بندی و نوشتن لاگ‌ها در رشته QueueListener
+    LOG_QUEUE_SIZE: int = 10000  # در صف پر رکوردها حذف می‌شوند
+    LOG_SAMPLE_INTERVAL_SECONDS: float = 10.0  # فاصله ثبت پیام‌های تکراری هر مورد
     
     class Config:
         case_sensitive = True
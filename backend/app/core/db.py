@@ -1,17 +1,58 @@
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import IndexModel
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from typing import Dict, Any, Optional, List
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+from typing import Dict, Any, Optional, List, Tuple
 from app.core.config import settings
 from app.core.logging import get_logger, DatabaseError
+from app.core.indexes import INDEX_SPECS
+from app.core.metrics import mongo_metrics_listener
+from app.core.query_monitor import query_monitor
 
 logger = get_logger("app.core.db")
 
+DEFAULT_PROFILE = "default"
+ANALYTICS_PROFILE = "analytics"
+
+def client_options(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    تبدیل تعریف یک پروفایل MONGODB_CLIENT_PROFILES به آرگومان‌های AsyncIOMotorClient
+    
+    Args:
+        profile: min_pool_size، max_pool_size، max_idle_time_ms، read_preference و max_staleness_seconds
+        
+    Returns:
+        dict: آرگومان‌های کلاینت
+    """
+    mode = read_pref_mode_from_name(profile.get("read_preference", "primary"))
+    staleness = profile.get("max_staleness_seconds", -1)
+    if mode == 0:
+        # primary سقف تاخیر نمی‌پذیرد
+        staleness = -1
+    elif staleness != -1 and staleness < 90:
+        raise ValueError("max_staleness_seconds must be at least 90 (or -1 for no bound)")
+    
+    options = {
+        "minPoolSize": profile.get("min_pool_size", 0),
+        "maxPoolSize": profile.get("max_pool_size", 100),
+        "maxIdleTimeMS": profile.get("max_idle_time_ms"),
+        "read_preference": make_read_preference(mode, None, max_staleness=staleness),
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    compressors = [name.strip() for name in settings.MONGODB_COMPRESSORS.split(",") if name.strip()]
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
 class MongoDB:
     """کلاس مدیریت اتصال MongoDB"""
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
     
+    # کلاینت‌های پروفایل‌های غیر پیش‌فرض (پول اتصال جدا)
+    profile_clients: Dict[str, AsyncIOMotorClient] = {}
+    
     # کش برای نگه داشتن کالکشن ها
     _collections: Dict[str, AsyncIOMotorCollection] = {}
     
@@ -19,13 +60,16 @@ class MongoDB:
     _connection_attempts: int = 0
     MAX_CONNECTION_ATTEMPTS: int = 5
     
-    def get_collection(self, name: str) -> AsyncIOMotorCollection:
-        """دریافت کالکشن با کش کردن"""
-        if name not in self._collections:
+    def get_collection(self, name: str, profile: str = DEFAULT_PROFILE) -> AsyncIOMotorCollection:
+        """دریافت کالکشن پروفایل با کش کردن (پروفایل بدون کلاینت از کلاینت پیش‌فرض استفاده می‌کند)"""
+        key = name if profile == DEFAULT_PROFILE else f"{profile}:{name}"
+        if key not in self._collections:
             if not self.db:
                 raise DatabaseError("Database connection not initialized")
-            self._collections[name] = self.db[name]
-        return self._collections[name]
+            client = self.profile_clients.get(profile)
+            database = client[self.db.name] if client is not None else self.db
+            self._collections[key] = database[name]
+        return self._collections[key]
     
     async def ping(self) -> bool:
         """تست اتصال به دیتابیس"""
@@ -42,12 +86,22 @@ class MongoDB:
         info = {
             "connected": self.client is not None,
             "database": settings.MONGODB_DB,
+            "profiles": [DEFAULT_PROFILE] + list(self.profile_clients.keys()),
             "collections": list(self._collections.keys()) if self._collections else []
         }
         return info
 
 db = MongoDB()
 
+def _command_listeners() -> List[Any]:
+    """لیست listener های دستورات MongoDB براساس تنظیمات"""
+    listeners = []
+    if settings.METRICS_ENABLED:
+        listeners.append(mongo_metrics_listener)
+    if settings.QUERY_MONITOR_ENABLED:
+        listeners.append(query_monitor)
+    return listeners
+
 async def connect_to_mongo() -> None:
     """اتصال به MongoDB با مکانیزم تلاش مجدد"""
     logger.info("Connecting to MongoDB...")
@@ -55,13 +109,27 @@ async def connect_to_mongo() -> None:
     while db._connection_attempts < db.MAX_CONNECTION_ATTEMPTS:
         try:
             # تنظیم تایم اوت کوتاه تر برای تشخیص سریع مشکلات اتصال
+            profiles = settings.MONGODB_CLIENT_PROFILES
             db.client = AsyncIOMotorClient(
-                settings.MONGODB_URI, 
-                serverSelectionTimeoutMS=5000
+                settings.MONGODB_URI,
+                event_listeners=_command_listeners(),
+                **client_options(profiles.get(DEFAULT_PROFILE, {}))
             )
             await db.client.admin.command('ping')
             db.db = db.client[settings.MONGODB_DB]
             
+            # کلاینت‌های پروفایل‌های دیگر با پول اتصال و read preference خود
+            for name, profile in profiles.items():
+                if name != DEFAULT_PROFILE:
+                    db.profile_clients[name] = AsyncIOMotorClient(
+                        settings.MONGODB_URI,
+                        event_listeners=_command_listeners(),
+                        **client_options(profile)
+                    )
+            
+            if settings.QUERY_MONITOR_ENABLED:
+                query_monitor.bind(db.client, asyncio.get_running_loop())
+            
             logger.info(f"Connected to MongoDB: {settings.MONGODB_DB}")
             await create_indexes()
             return
@@ -90,58 +158,89 @@ async def close_mongo_connection() -> None:
     logger.info("Closing MongoDB connection...")
     if db.client:
         db.client.close()
+        for client in db.profile_clients.values():
+            client.close()
         db.client = None
+        db.profile_clients = {}
         db._collections = {}
         db._connection_attempts = 0
         logger.info("MongoDB connection closed")
 
-async def create_indexes() -> None:
-    """ایجاد ایندکس‌های مورد نیاز"""
-    try:
-        # ایندکس های توییت ها
-        await db.get_collection("tweets").create_index("tweet_id", unique=True)
-        await db.get_collection("tweets").create_index("created_at")
-        await db.get_collection("tweets").create_index("keywords")
-        await db.get_collection("tweets").create_index("user_id")
-        await db.get_collection("tweets").create_index("importance_score")
-        await db.get_collection("tweets").create_index([("text", "text")], default_language="none") 
-        
-        # برای بهبود عملکرد جستجوهای رایج
-        await db.get_collection("tweets").create_index([
-            ("created_at", -1), 
-            ("importance_score", -1)
-        ])
-        
-        # ایندکس ترکیبی برای فیلتر کاربر و زمان
-        await db.get_collection("tweets").create_index([
-            ("user_screen_name", 1), 
-            ("created_at", -1)
-        ])
+# گزینه‌های ایندکس که در مقایسه تعریف با ایندکس موجود بررسی می‌شوند
+INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+def diff_indexes(specs: List[IndexModel], existing: Dict[str, Dict[str, Any]]) -> Tuple[List[IndexModel], List[str]]:
+    """
+    مقایسه تعریف ایندکس‌ها با خروجی index_information کالکشن
+    
+    Args:
+        specs: ایندکس‌های تعریف شده در INDEX_SPECS
+        existing: ایندکس‌های موجود (نام -> اطلاعات)
         
-        # ایندکس های کلمات کلیدی
-        await db.get_collection("keywords").create_index("keyword", unique=True)
-        await db.get_collection("keywords").create_index("is_active")
-        await db.get_collection("keywords").create_index("priority")
-        await db.get_collection("keywords").create_index("last_extracted_at")
+    Returns:
+        tuple: (ایندکس‌های ناموجود، نام ایندکس‌هایی که کلید یا گزینه‌های آنها با تعریف متفاوت است)
+    """
+    missing = []
+    changed = []
+    for index in specs:
+        document = index.document
+        current = existing.get(document["name"])
+        if current is None:
+            missing.append(index)
+            continue
         
-        # ایندکس ترکیبی برای فیلترهای رایج
-        await db.get_collection("keywords").create_index([
-            ("is_active", 1), 
-            ("priority", 1)
-        ])
+        same_keys = [(field, direction) for field, direction in current["key"]] == list(document["key"].items())
+        same_options = all(
+            bool(current.get(option)) == bool(document.get(option)) if option in ("unique", "sparse")
+            else current.get(option) == document.get(option)
+            for option in INDEX_OPTIONS
+        )
+        if not (same_keys and same_options):
+            changed.append(document["name"])
+    return missing, changed
+
+async def _ensure_collection_indexes(collection_name: str, specs: List[IndexModel]) -> int:
+    """ایجاد ایندکس‌های ناموجود یک کالکشن"""
+    collection = db.get_collection(collection_name)
+    missing, changed = diff_indexes(specs, await collection.index_information())
+    
+    if changed:
+        logger.warning(f"Indexes on {collection_name} differ from their definition: {', '.join(changed)}")
+    if missing:
+        await collection.create_indexes(missing)
+        logger.info(f"Created indexes on {collection_name}: {', '.join(index.document['name'] for index in missing)}")
+    return len(missing)
+
+async def create_indexes() -> None:
+    """
+    ایجاد ایندکس‌های مورد نیاز (تعریف شده در app.core.indexes)
+    
+    ایندکس‌های موجود با list_indexes مقایسه و فقط ایندکس‌های ناموجود ساخته می‌شوند؛ کالکشن‌ها همزمان بررسی می‌شوند.
+    """
+    try:
+        created = await asyncio.gather(*(
+            _ensure_collection_indexes(collection_name, indexes)
+            for collection_name, indexes in INDEX_SPECS.items()
+        ))
         
-        logger.info("All database indexes created successfully")
+        logger.info(f"Database indexes verified ({sum(created)} created)")
     except Exception as e:
         logger.error(f"Error creating database indexes: {e}")
         raise DatabaseError("Failed to create database indexes", detail={"error": str(e)})
 
-def get_collection(collection_name: str) -> AsyncIOMotorCollection:
-    """دسترسی به کالکشن با بررسی اتصال"""
+def get_collection(collection_name: str, profile: str = DEFAULT_PROFILE) -> AsyncIOMotorCollection:
+    """
+    دسترسی به کالکشن با بررسی اتصال
+    
+    Args:
+        collection_name: نام کالکشن
+        profile: پروفایل کلاینت؛ ANALYTICS_PROFILE برای aggregation های آمار و تحلیل (خواندن از secondary)
+    """
     if not db.client or not db.db:
         logger.error("Attempting to get collection without database connection")
         raise DatabaseError("Database not connected")
     
-    return db.get_collection(collection_name)
+    return db.get_collection(collection_name, profile)
 
 async def get_database_stats() -> Dict[str, Any]:
     """دریافت آمار دیتابیس برای مانیتورینگ"""
@@ -149,20 +248,22 @@ async def get_database_stats() -> Dict[str, Any]:
         raise DatabaseError("Database not connected")
     
     try:
-        # دریافت آمار کلی دیتابیس
-        db_stats = await db.db.command("dbStats")
-        
-        # دریافت اندازه و تعداد اسناد برای هر کالکشن
-        collections_stats = {}
         collections = await db.db.list_collection_names()
         
-        for collection_name in collections:
-            collection_stats = await db.db.command("collStats", collection_name)
-            collections_stats[collection_name] = {
+        # آمار کلی دیتابیس و آمار هر کالکشن به صورت همزمان
+        db_stats, *all_collection_stats = await asyncio.gather(
+            db.db.command("dbStats"),
+            *(db.db.command("collStats", collection_name) for collection_name in collections)
+        )
+        
+        collections_stats = {
+            collection_name: {
                 "count": collection_stats.get("count", 0),
                 "size": collection_stats.get("size", 0),
                 "avg_document_size": collection_stats.get("avgObjSize", 0)
             }
+            for collection_name, collection_stats in zip(collections, all_collection_stats)
+        }
         
         # ترکیب آمار
         stats = {
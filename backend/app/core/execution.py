@@ -0,0 +1,196 @@
+import time
+import functools
+import contextvars
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from app.core.config import settings
+from app.core.db import get_collection, ANALYTICS_PROFILE
+from app.core.logging import get_logger
+from app.core.stats import summarize
+
+logger = get_logger("app.core.execution")
+
+# اجرای جاری در زمینه (context) فعلی؛ سرویس‌ها بدون دریافت صریح آن را به‌روزرسانی می‌کنند
+_current_execution: contextvars.ContextVar = contextvars.ContextVar("current_execution", default=None)
+
+
+class TaskExecution:
+    """ثبت زمان‌بندی و نتیجه یک اجرای کار در کالکشن execution_logs"""
+
+    def __init__(self, task_name: str, trigger: str = "scheduled"):
+        self.task_name = task_name
+        self.trigger = trigger
+        self.start_time: Optional[datetime] = None
+        self.end_time: Optional[datetime] = None
+        # لیست به جای دیکشنری: متن کلمه کلیدی ممکن است شامل . یا $ باشد که در نام فیلد مجاز نیست
+        self.keyword_timings: List[Dict[str, Any]] = []
+        self.api_calls = 0
+        self.tweets_inserted = 0
+        self.tweets_updated = 0
+        self.errors: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self._started_at = 0.0
+        self._token = None
+
+    def record_api_call(self, count: int = 1) -> None:
+        """ثبت فراخوانی API خارجی"""
+        self.api_calls += count
+
+    def record_tweets(self, inserted: int = 0, updated: int = 0) -> None:
+        """ثبت تعداد توییت‌های افزوده و به‌روزرسانی شده"""
+        self.tweets_inserted += inserted
+        self.tweets_updated += updated
+
+    def record_error(self, error: Any) -> None:
+        """ثبت خطا (با سقف تعداد برای جلوگیری از رشد بی‌رویه سند)"""
+        if len(self.errors) < settings.EXECUTION_LOG_MAX_ERRORS:
+            self.errors.append(str(error))
+
+    def record_keyword(self, keyword: str, duration_seconds: float, result: Dict[str, Any]) -> None:
+        """ثبت زمان و نتیجه استخراج یک کلمه کلیدی"""
+        timing = {
+            "keyword": keyword,
+            "duration_seconds": round(duration_seconds, 4),
+            "inserted": result.get("inserted", 0),
+            "updated": result.get("updated", 0),
+            "skipped": result.get("skipped", 0),
+        }
+        self.keyword_timings.append(timing)
+        self.record_tweets(result.get("inserted", 0), result.get("updated", 0))
+
+        if "error" in result:
+            timing["error"] = result["error"]
+            self.record_error(f"{keyword}: {result['error']}")
+
+    def set_result(self, result: Any) -> None:
+        """ثبت نتیجه نهایی کار"""
+        if isinstance(result, dict):
+            self.result = result
+
+    def _status(self, exc: Optional[BaseException]) -> str:
+        if exc is not None:
+            return "error"
+        if self.result and self.result.get("status") == "error":
+            return "error"
+        return "success"
+
+    def to_document(self, status: str) -> Dict[str, Any]:
+        """تبدیل اجرا به سند قابل ذخیره"""
+        result = None
+        if self.result is not None:
+            # جزئیات هر کلمه کلیدی جداگانه در keyword_timings ذخیره می‌شود
+            result = {k: v for k, v in self.result.items() if k != "results"}
+
+        return {
+            "task_name": self.task_name,
+            "trigger": self.trigger,
+            "status": status,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_seconds": round(time.perf_counter() - self._started_at, 4),
+            "keyword_timings": self.keyword_timings,
+            "api_calls": self.api_calls,
+            "tweets_inserted": self.tweets_inserted,
+            "tweets_updated": self.tweets_updated,
+            "errors": self.errors,
+            "result": result,
+        }
+
+    async def __aenter__(self) -> "TaskExecution":
+        self.start_time = datetime.utcnow()
+        self._started_at = time.perf_counter()
+        self._token = _current_execution.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.end_time = datetime.utcnow()
+        _current_execution.reset(self._token)
+
+        if exc is not None:
+            self.record_error(exc)
+
+        document = self.to_document(self._status(exc))
+
+        try:
+            await get_collection("execution_logs").insert_one(document)
+        except Exception as e:
+            # ثبت لاگ اجرا نباید باعث شکست خود کار شود
+            logger.warning(f"Failed to record execution log for {self.task_name}: {e}")
+
+        return False
+
+
+def get_current_execution() -> Optional[TaskExecution]:
+    """دریافت اجرای جاری (در صورت وجود)"""
+    return _current_execution.get()
+
+
+def record_api_call(count: int = 1) -> None:
+    """ثبت فراخوانی API در اجرای جاری"""
+    execution = _current_execution.get()
+    if execution is not None:
+        execution.record_api_call(count)
+
+
+def track_execution(task_name: str, trigger: str = "scheduled") -> Callable:
+    """
+    دکوریتور ثبت اجرای یک کار async در execution_logs
+
+    Args:
+        task_name: نام کار
+        trigger: منبع اجرا (scheduled یا manual)
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with TaskExecution(task_name, trigger) as execution:
+                result = await func(*args, **kwargs)
+                execution.set_result(result)
+                return result
+        return wrapper
+    return decorator
+
+
+async def get_execution_stats(task_name: Optional[str] = None, days: int = 7) -> Dict[str, Dict[str, Any]]:
+    """
+    محاسبه صدک‌های مدت اجرا برای هر کار
+
+    Args:
+        task_name: فیلتر نام کار
+        days: بازه زمانی (روز)
+
+    Returns:
+        dict: آمار هر کار به تفکیک نام
+    """
+    query: Dict[str, Any] = {"start_time": {"$gte": datetime.utcnow() - timedelta(days=days)}}
+    if task_name:
+        query["task_name"] = task_name
+
+    pipeline = [
+        {"$match": query},
+        {"$group": {
+            "_id": "$task_name",
+            "durations": {"$push": "$duration_seconds"},
+            "errors": {"$sum": {"$cond": [{"$eq": ["$status", "error"]}, 1, 0]}},
+            "api_calls": {"$sum": "$api_calls"},
+            "tweets_inserted": {"$sum": "$tweets_inserted"},
+            "tweets_updated": {"$sum": "$tweets_updated"},
+            "last_run": {"$max": "$start_time"},
+        }},
+    ]
+
+    stats = {}
+    async for item in get_collection("execution_logs", ANALYTICS_PROFILE).aggregate(pipeline):
+        durations = summarize(item["durations"])
+        stats[item["_id"]] = {
+            "runs": durations.pop("count"),
+            "errors": item["errors"],
+            "duration_seconds": durations,
+            "api_calls": item["api_calls"],
+            "tweets_inserted": item["tweets_inserted"],
+            "tweets_updated": item["tweets_updated"],
+            "last_run": item["last_run"],
+        }
+
+    return stats
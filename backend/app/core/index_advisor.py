@@ -0,0 +1,273 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.core.query_monitor import collect_plan_stages
+
+logger = get_logger("app.core.index_advisor")
+
+# عملگرهایی که در قاعده ESR به عنوان برابری در نظر گرفته می‌شوند
+EQUALITY_OPERATORS = {"$eq", "$in"}
+
+
+def query_catalogue(samples: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    فهرست شکل‌های کوئری واقعی API با مقادیر نمونه
+
+    Args:
+        samples: مقادیر نمونه (keyword, user_screen_name, tweet_id, search_token)
+
+    Returns:
+        list: شکل‌های کوئری (نام، کالکشن، فیلتر، مرتب‌سازی و در صورت نیاز فیلتر جزئی)
+    """
+    now = datetime.utcnow()
+
+    return [
+        {
+            "name": "get_tweets_by_keyword",
+            "collection": "tweets",
+            "filter": {"keywords": samples["keyword"]},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweets_by_keyword_importance",
+            "collection": "tweets",
+            "filter": {"keywords": samples["keyword"], "importance_score": {"$gte": 10}},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweets_recent",
+            "collection": "tweets",
+            "filter": {},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweets_importance",
+            "collection": "tweets",
+            "filter": {"importance_score": {"$gte": 10}},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweets_by_user",
+            "collection": "tweets",
+            "filter": {"user_screen_name": samples["user_screen_name"]},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweets_search",
+            "collection": "tweets",
+            "filter": {"search_tokens": samples["search_token"]},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "get_tweet",
+            "collection": "tweets",
+            "filter": {"tweet_id": samples["tweet_id"]},
+            "sort": [],
+        },
+        {
+            "name": "refresh_planner_recent",
+            "collection": "tweets",
+            "filter": {"created_at": {"$gte": now - timedelta(hours=72)}, "updated_in_db": {"$lt": now - timedelta(minutes=15)}},
+            "sort": [("created_at", -1)],
+        },
+        {
+            "name": "refresh_planner_fast",
+            "collection": "tweets",
+            "filter": {
+                "created_at": {"$gte": now - timedelta(hours=72)},
+                "updated_in_db": {"$lt": now - timedelta(minutes=15)},
+                "velocity_score": {"$gt": 0}
+            },
+            "sort": [("velocity_score", -1)],
+        },
+        {
+            "name": "active_keywords",
+            "collection": "keywords",
+            "filter": {"is_active": True},
+            "sort": [("priority", 1)],
+        },
+        {
+            "name": "get_keywords",
+            "collection": "keywords",
+            "filter": {},
+            "sort": [("priority", 1)],
+        },
+    ]
+
+
+def recommend_index(shape: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    پیشنهاد ایندکس ترکیبی براساس قاعده ESR (برابری، مرتب‌سازی، بازه)
+
+    Args:
+        shape: شکل کوئری از فهرست
+
+    Returns:
+        dict: کلیدهای ایندکس، تعداد کلیدهای با جهت ثابت (برابری و مرتب‌سازی) و در صورت نیاز partialFilterExpression
+    """
+    equality: List[Tuple[str, int]] = []
+    ranges: List[Tuple[str, int]] = []
+
+    for field, value in shape["filter"].items():
+        if field.startswith("$"):
+            continue
+        if isinstance(value, dict) and value and not set(value.keys()) <= EQUALITY_OPERATORS:
+            ranges.append((field, 1))
+        else:
+            equality.append((field, 1))
+
+    sort_fields = [field for field, _ in shape["sort"]]
+    keys = equality + list(shape["sort"])
+    exact = len(keys)
+    keys += [(field, direction) for field, direction in ranges if field not in sort_fields]
+
+    if not keys:
+        return None
+
+    recommendation: Dict[str, Any] = {"keys": keys, "exact": exact}
+    if shape.get("partial_filter"):
+        recommendation["partialFilterExpression"] = shape["partial_filter"]
+
+    return recommendation
+
+
+def _covering_index(keys: List[Tuple[str, int]], exact: int, existing: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """
+    پیدا کردن ایندکس موجودی که کلیدهای پیشنهادی پیشوند آن باشند
+
+    جهت فیلدهای برابری و مرتب‌سازی (exact کلید اول) باید یکسان یا کاملاً معکوس باشد؛
+    برای فیلدهای بازه فقط نام فیلد مقایسه می‌شود.
+    """
+    for name, info in existing.items():
+        index_keys = [(field, int(direction)) if direction in (1, -1) else (field, direction)
+                      for field, direction in info["key"]]
+        if len(index_keys) < len(keys):
+            continue
+
+        reversed_keys = [(field, -direction) if isinstance(direction, int) else (field, direction)
+                         for field, direction in index_keys]
+        exact_match = index_keys[:exact] == keys[:exact] or reversed_keys[:exact] == keys[:exact]
+        range_match = [field for field, _ in index_keys[exact:len(keys)]] == [field for field, _ in keys[exact:]]
+
+        if exact_match and range_match:
+            return name
+    return None
+
+
+def analyze_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    تحلیل خروجی explain("executionStats")
+
+    Returns:
+        dict: مراحل پلان، ایندکس استفاده شده، آمار اجرا و هشدارها
+    """
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = collect_plan_stages(winning_plan)
+    execution_stats = explain.get("executionStats", {})
+
+    n_returned = execution_stats.get("nReturned", 0)
+    keys_examined = execution_stats.get("totalKeysExamined", 0)
+    docs_examined = execution_stats.get("totalDocsExamined", 0)
+    examined_ratio = max(keys_examined, docs_examined) / max(n_returned, 1)
+
+    index_name = None
+    plan = winning_plan
+    while plan:
+        if plan.get("indexName"):
+            index_name = plan["indexName"]
+            break
+        plan = plan.get("inputStage")
+
+    flags = []
+    if "COLLSCAN" in stages:
+        flags.append("COLLSCAN")
+    if "SORT" in stages:
+        flags.append("IN_MEMORY_SORT")
+    if examined_ratio > settings.INDEX_ADVISOR_MAX_EXAMINED_RATIO and max(keys_examined, docs_examined) > 0:
+        flags.append("HIGH_EXAMINED_RATIO")
+
+    return {
+        "stages": stages,
+        "index": index_name,
+        "n_returned": n_returned,
+        "keys_examined": keys_examined,
+        "docs_examined": docs_examined,
+        "examined_ratio": round(examined_ratio, 2),
+        "execution_time_ms": execution_stats.get("executionTimeMillis", 0),
+        "flags": flags,
+    }
+
+
+async def _sample_values() -> Dict[str, Any]:
+    """دریافت مقادیر نمونه واقعی برای اجرای explain"""
+    samples = {"keyword": "", "user_screen_name": "", "tweet_id": "", "search_token": ""}
+
+    keyword = await get_collection("keywords").find_one({"is_active": True}, {"keyword": 1})
+    if keyword:
+        samples["keyword"] = keyword["keyword"]
+
+    tweet = await get_collection("tweets").find_one(
+        {}, {"tweet_id": 1, "user_screen_name": 1, "keywords": 1, "search_tokens": 1}, sort=[("created_at", -1)]
+    )
+    if tweet:
+        samples["tweet_id"] = tweet.get("tweet_id", "")
+        samples["user_screen_name"] = tweet.get("user_screen_name", "")
+        if tweet.get("search_tokens"):
+            samples["search_token"] = tweet["search_tokens"][0]
+        if not samples["keyword"] and tweet.get("keywords"):
+            samples["keyword"] = tweet["keywords"][0]
+
+    return samples
+
+
+async def run_index_advisor() -> List[Dict[str, Any]]:
+    """
+    اجرای explain برای همه شکل‌های کوئری و پیشنهاد ایندکس
+
+    Returns:
+        list: گزارش هر شکل شامل تحلیل پلان و ایندکس پیشنهادی
+    """
+    samples = await _sample_values()
+    existing_indexes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    report = []
+
+    for shape in query_catalogue(samples):
+        collection = get_collection(shape["collection"])
+
+        if shape["collection"] not in existing_indexes:
+            existing_indexes[shape["collection"]] = await collection.index_information()
+
+        cursor = collection.find(shape["filter"]).limit(settings.INDEX_ADVISOR_SAMPLE_LIMIT)
+        if shape["sort"]:
+            cursor = cursor.sort(shape["sort"])
+
+        try:
+            explain = await cursor.explain()
+            analysis = analyze_explain(explain)
+        except Exception as e:
+            logger.error(f"Explain failed for shape {shape['name']}: {e}")
+            analysis = {"error": str(e), "flags": []}
+
+        recommendation = recommend_index(shape)
+        if recommendation:
+            covered_by = _covering_index(
+                recommendation["keys"], recommendation.pop("exact"), existing_indexes[shape["collection"]]
+            )
+            recommendation["covered_by"] = covered_by
+            recommendation["keys"] = [list(key) for key in recommendation["keys"]]
+            if covered_by and not analysis["flags"]:
+                recommendation = None
+
+        report.append({
+            "name": shape["name"],
+            "collection": shape["collection"],
+            "filter_keys": sorted(shape["filter"].keys()),
+            "sort": [list(key) for key in shape["sort"]],
+            "analysis": analysis,
+            "recommendation": recommendation,
+        })
+
+    return report
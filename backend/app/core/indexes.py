@@ -0,0 +1,208 @@
+from typing import Dict, List
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from app.core.config import settings
+
+# تعریف یکتای ایندکس‌های هر کالکشن؛ create_indexes، توابع مدل‌ها و میگریشن‌ها از همین لیست استفاده می‌کنند.
+# ترتیب کلیدهای ایندکس‌های ترکیبی از قاعده ESR پیروی می‌کند: برابری، مرتب‌سازی، بازه.
+
+TWEET_INDEXES: List[IndexModel] = [
+    IndexModel([("tweet_id", ASCENDING)], name="tweet_id_1", unique=True),
+    IndexModel([("user_id", ASCENDING)], name="user_id_1"),
+    # جستجوی متنی روی توکن‌های نرمال شده (جایگزین ایندکس text)
+    IndexModel([("search_tokens", ASCENDING), ("created_at", DESCENDING)], name="search_tokens_1_created_at_-1"),
+
+    # get_tweets با کلمه کلیدی: keywords (برابری) + created_at (مرتب‌سازی) + importance_score (بازه)
+    IndexModel(
+        [("keywords", ASCENDING), ("created_at", DESCENDING), ("importance_score", DESCENDING)],
+        name="keywords_1_created_at_-1_importance_score_-1"
+    ),
+    # get_tweets بدون کلمه کلیدی و پاکسازی توییت‌های قدیمی
+    IndexModel([("created_at", DESCENDING), ("importance_score", DESCENDING)], name="created_at_-1_importance_score_-1"),
+    # فیلتر کاربر و زمان
+    IndexModel([("user_screen_name", ASCENDING), ("created_at", DESCENDING)], name="user_screen_name_1_created_at_-1"),
+    IndexModel([("sentiment_label", ASCENDING), ("created_at", DESCENDING)], name="sentiment_label_1_created_at_-1"),
+    # توییت‌های یک موضوع و پیمایش توییت‌های جدید هر کلمه کلیدی در استخراج موضوعات
+    IndexModel([("topics", ASCENDING), ("created_at", DESCENDING)], name="topics_1_created_at_-1"),
+    IndexModel([("keywords", ASCENDING), ("_id", ASCENDING)], name="keywords_1__id_1"),
+    # توییت‌های یک هشتگ، منشن یا لینک (کلیدهای نرمال شده type:value)
+    IndexModel([("entity_keys", ASCENDING), ("created_at", DESCENDING)], name="entity_keys_1_created_at_-1"),
+    # صف مراحل غنی‌سازی (آرایه pending_enrichment پس از پایان همه مراحل خالی است)
+    IndexModel([("pending_enrichment", ASCENDING), ("_id", ASCENDING)], name="pending_enrichment_1__id_1"),
+    # اعضای یک خوشه تکراری و بزرگ‌ترین خوشه‌ها (فقط توییت‌های اصلی دارای نسخه تکراری)
+    IndexModel([("cluster_id", ASCENDING), ("created_at", DESCENDING)], name="cluster_id_1_created_at_-1"),
+    IndexModel(
+        [("duplicate_count", DESCENDING), ("created_at", DESCENDING)],
+        name="duplicate_clusters",
+        partialFilterExpression={"duplicate_count": {"$gt": 0}}
+    ),
+    # مرتب‌سازی براساس سرعت تعامل و کاندیدهای سریع برنامه‌ریز به‌روزرسانی
+    IndexModel(
+        [("velocity_score", DESCENDING), ("updated_in_db", ASCENDING)],
+        name="velocity_score_-1_updated_in_db_1"
+    ),
+    # کوئری‌های برنامه‌ریز به‌روزرسانی (ESR): مرتب‌سازی created_at یا velocity_score و سپس بازه‌ها
+    IndexModel([("created_at", DESCENDING), ("updated_in_db", ASCENDING)], name="created_at_-1_updated_in_db_1"),
+    IndexModel(
+        [("velocity_score", DESCENDING), ("created_at", DESCENDING), ("updated_in_db", ASCENDING)],
+        name="velocity_score_-1_created_at_-1_updated_in_db_1"
+    ),
+]
+
+KEYWORD_INDEXES: List[IndexModel] = [
+    IndexModel([("keyword", ASCENDING)], name="keyword_1", unique=True),
+    IndexModel([("priority", ASCENDING)], name="priority_1"),
+    IndexModel([("last_extracted_at", ASCENDING)], name="last_extracted_at_1"),
+    # کلمات کلیدی فعال به ترتیب اولویت (پیشوند is_active جایگزین ایندکس تکی آن است)
+    IndexModel([("is_active", ASCENDING), ("priority", ASCENDING)], name="is_active_1_priority_1"),
+    IndexModel([("tags", ASCENDING), ("is_active", ASCENDING)], name="tags_1_is_active_1"),
+]
+
+EXECUTION_LOG_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("start_time", ASCENDING)],
+        name="start_time_1",
+        expireAfterSeconds=settings.EXECUTION_LOG_TTL_DAYS * 24 * 3600
+    ),
+    IndexModel([("task_name", ASCENDING), ("start_time", DESCENDING)], name="task_name_1_start_time_-1"),
+]
+
+TRENDING_SNAPSHOT_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("keyword", ASCENDING), ("kind", ASCENDING), ("bucket_start", ASCENDING), ("node", ASCENDING)],
+        name="keyword_1_kind_1_bucket_start_1_node_1",
+        unique=True
+    ),
+    IndexModel(
+        [("bucket_start", ASCENDING)],
+        name="bucket_start_1",
+        expireAfterSeconds=settings.TRENDING_RETENTION_MINUTES * 60
+    ),
+]
+
+AUTHOR_ROLLUP_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("keyword", ASCENDING), ("hour", ASCENDING)],
+        name="keyword_1_hour_1",
+        unique=True
+    ),
+    IndexModel(
+        [("hour", ASCENDING)],
+        name="hour_1",
+        expireAfterSeconds=settings.HLL_ROLLUP_TTL_DAYS * 24 * 3600
+    ),
+]
+
+ENGAGEMENT_HISTORY_INDEXES: List[IndexModel] = [
+    IndexModel([("tweet_id", ASCENDING), ("day", ASCENDING)], name="tweet_id_1_day_1"),
+    IndexModel(
+        [("day", ASCENDING)],
+        name="day_1",
+        expireAfterSeconds=settings.ENGAGEMENT_HISTORY_TTL_DAYS * 24 * 3600
+    ),
+]
+
+TOPIC_MODEL_INDEXES: List[IndexModel] = [
+    IndexModel([("keyword", ASCENDING), ("window_start", ASCENDING)], name="keyword_1_window_start_1", unique=True),
+    IndexModel(
+        [("window_start", ASCENDING)],
+        name="window_start_1",
+        expireAfterSeconds=settings.TOPIC_RETENTION_DAYS * 24 * 3600
+    ),
+]
+
+TOPIC_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("keyword", ASCENDING), ("window_start", DESCENDING), ("size", DESCENDING)],
+        name="keyword_1_window_start_-1_size_-1"
+    ),
+    IndexModel(
+        [("window_start", ASCENDING)],
+        name="window_start_1",
+        expireAfterSeconds=settings.TOPIC_RETENTION_DAYS * 24 * 3600
+    ),
+]
+
+# ایندکس‌هایی که با ایندکس‌های ترکیبی بالا پوشش داده شده‌اند و باید حذف شوند
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    "tweets": [
+        "created_at_1", "keywords_1", "importance_score_1", "importance_score_-1", "created_at_-1",
+        # قاعده ثابت importance > 50 با برنامه‌ریز به‌روزرسانی جایگزین شده است
+        "refresh_candidates",
+        # پرچم is_processed با پرچم‌های هر مرحله غنی‌سازی جایگزین شده است
+        "unprocessed",
+    ],
+    "keywords": ["is_active_1"],
+}
+
+ENTITY_COUNT_INDEXES: List[IndexModel] = [
+    # upsert شمارنده (همه کلیدها برابری) و پرتکرارترین‌ها: type و keyword (برابری) + day (بازه)
+    IndexModel(
+        [("type", ASCENDING), ("keyword", ASCENDING), ("day", ASCENDING), ("value", ASCENDING)],
+        name="type_1_keyword_1_day_1_value_1",
+        unique=True
+    ),
+    IndexModel(
+        [("day", ASCENDING)],
+        name="day_1",
+        expireAfterSeconds=settings.ENTITY_COUNTS_TTL_DAYS * 24 * 3600
+    ),
+]
+
+USER_INDEXES: List[IndexModel] = [
+    IndexModel([("user_id", ASCENDING)], name="user_id_1", unique=True),
+    IndexModel([("screen_name_lower", ASCENDING)], name="screen_name_lower_1"),
+]
+
+COMPACTION_HISTORY_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("started_at", ASCENDING)],
+        name="started_at_1",
+        expireAfterSeconds=settings.COMPACTION_HISTORY_TTL_DAYS * 24 * 3600
+    ),
+]
+
+# سری زمانی آمار سیستم؛ هر وضوح یک سند به ازای هر بازه (start) با TTL جداگانه
+SYSTEM_STATS_RAW_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("start", ASCENDING)],
+        name="start_1",
+        unique=True,
+        expireAfterSeconds=settings.SYSTEM_STATS_RAW_TTL_DAYS * 24 * 3600
+    ),
+]
+
+SYSTEM_STATS_HOURLY_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("start", ASCENDING)],
+        name="start_1",
+        unique=True,
+        expireAfterSeconds=settings.SYSTEM_STATS_HOURLY_TTL_DAYS * 24 * 3600
+    ),
+]
+
+SYSTEM_STATS_DAILY_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [("start", ASCENDING)],
+        name="start_1",
+        unique=True,
+        expireAfterSeconds=settings.SYSTEM_STATS_DAILY_TTL_DAYS * 24 * 3600
+    ),
+]
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "tweets": TWEET_INDEXES,
+    "keywords": KEYWORD_INDEXES,
+    "execution_logs": EXECUTION_LOG_INDEXES,
+    "trending_snapshots": TRENDING_SNAPSHOT_INDEXES,
+    "author_rollups": AUTHOR_ROLLUP_INDEXES,
+    "engagement_history": ENGAGEMENT_HISTORY_INDEXES,
+    "topic_models": TOPIC_MODEL_INDEXES,
+    "topics": TOPIC_INDEXES,
+    "users": USER_INDEXES,
+    "entity_counts": ENTITY_COUNT_INDEXES,
+    "compaction_history": COMPACTION_HISTORY_INDEXES,
+    "system_stats_raw": SYSTEM_STATS_RAW_INDEXES,
+    "system_stats_1h": SYSTEM_STATS_HOURLY_INDEXES,
+    "system_stats_1d": SYSTEM_STATS_DAILY_INDEXES,
+}
@@ -1,11 +1,14 @@
 import logging
 import sys
 import os
-import json
+import time
+import queue
+import atexit
 import traceback
+import orjson
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, Optional, Tuple
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from app.core.config import settings
 
 class LogConfig(BaseModel):
@@ -65,15 +68,16 @@ class LogConfig(BaseModel):
                 "encoding": "utf8"
             }
         
-        # تنظیم لاگر اصلی
-        self.loggers[self.LOGGER_NAME] = {
-            "handlers": ["default", "file"],
-            "level": self.LOG_LEVEL,
-            "propagate": False
-        }
+        # تنظیم لاگر اصلی و لاگرهای ماژول‌های برنامه (app.*)
+        for logger_name in (self.LOGGER_NAME, "app"):
+            self.loggers[logger_name] = {
+                "handlers": ["default", "file"],
+                "level": self.LOG_LEVEL,
+                "propagate": False
+            }
 
 class JsonFormatter(logging.Formatter):
-    """فرمتر لاگ JSON برای تحلیل آسان تر"""
+    """فرمتر لاگ JSON برای تحلیل آسان تر (سریال‌سازی با orjson)"""
     def __init__(self):
         super().__init__()
         self.default_msec_format = '%s.%03d'
@@ -105,8 +109,108 @@ class JsonFormatter(logging.Formatter):
                 "message": str(record.exc_info[1]),
                 "traceback": traceback.format_exception(*record.exc_info)
             }
-            
-        return json.dumps(log_record, ensure_ascii=False)
+        
+        # مقادیر غیرقابل سریال‌سازی (مانند ObjectId) به رشته تبدیل می‌شوند
+        return orjson.dumps(log_record, default=str).decode("utf-8")
+
+class QueueLogHandler(QueueHandler):
+    """
+    انتقال رکوردها به صف لاگ بدون قالب‌بندی و نوشتن در رشته فراخوان
+    
+    قالب‌بندی (از جمله traceback) و نوشتن فایل در رشته QueueListener انجام می‌شود.
+    در صف پر رکورد به جای مسدود کردن حلقه رویداد حذف و شمارش می‌شود.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ادغام آرگومان‌های پیام (مقادیر در لحظه ثبت)؛ بقیه قالب‌بندی به رشته شنونده سپرده می‌شود"""
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogSampler:
+    """
+    محدودسازی پیام‌های تکراری هر مورد (مانند خطای ذخیره هر توییت)
+    
+    برای هر کلید حداکثر یک پیام در هر interval ثانیه ثبت می‌شود و تعداد پیام‌های حذف شده
+    به پیام بعدی همان کلید افزوده می‌شود.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._state: Dict[str, Tuple[float, int]] = {}
+    
+    def allow(self, key: str) -> Optional[int]:
+        """
+        آیا پیام کلید ثبت شود
+        
+        Returns:
+            int: تعداد پیام‌های حذف شده از آخرین ثبت، یا None اگر پیام باید حذف شود
+        """
+        now = time.monotonic()
+        last, suppressed = self._state.get(key, (None, 0))
+        if last is not None and now - last < self.interval:
+            self._state[key] = (last, suppressed + 1)
+            return None
+        self._state[key] = (now, 0)
+        return suppressed
+    
+    def log(self, logger: logging.Logger, level: int, key: str, message: str, **kwargs: Any) -> bool:
+        """
+        ثبت پیام با محدودیت نرخ کلید
+        
+        Returns:
+            bool: ثبت شدن پیام
+        """
+        suppressed = self.allow(key)
+        if suppressed is None:
+            return False
+        if suppressed:
+            message = f"{message} ({suppressed} similar messages suppressed)"
+        # stacklevel: محل فراخوان (نه این متد) در رکورد ثبت می‌شود
+        logger.log(level, message, stacklevel=2, **kwargs)
+        return True
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueLogHandler] = None
+
+def _start_queue_logging(logger_names: Tuple[str, ...]) -> None:
+    """جایگزینی هندلرهای لاگرها با صف و اجرای هندلرهای اصلی در QueueListener"""
+    global _listener, _queue_handler
+    
+    sink_handlers = list(logging.getLogger(logger_names[0]).handlers)
+    _queue_handler = QueueLogHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    for logger_name in logger_names:
+        logging.getLogger(logger_name).handlers = [_queue_handler]
+    
+    _listener = QueueListener(_queue_handler.queue, *sink_handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """نوشتن رکوردهای باقی‌مانده صف و توقف رشته شنونده"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def logging_status() -> Dict[str, Any]:
+    """وضعیت صف لاگ"""
+    if _queue_handler is None:
+        return {"queued": False}
+    return {
+        "queued": _listener is not None,
+        "queue_size": _queue_handler.queue.qsize(),
+        "max_queue_size": settings.LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped
+    }
 
 def setup_logging():
     """تنظیم اولیه سیستم لاگینگ"""
@@ -119,6 +223,10 @@ def setup_logging():
         log_config = LogConfig()
         logging.config.dictConfig(log_config.dict())
         
+        # قالب‌بندی و نوشتن لاگ‌ها در رشته جداگانه
+        if settings.LOG_QUEUE_ENABLED:
+            _start_queue_logging(tuple(log_config.loggers))
+        
         # تنظیم لاگر ریشه
         root_logger = logging.getLogger()
         root_logger.setLevel(settings.LOG_LEVEL)
@@ -145,15 +253,19 @@ def get_logger(name: str) -> logging.Logger:
     import logging.config
     
     # اطمینان از راه‌اندازی سیستم لاگینگ
+    # پرچم پیش از راه‌اندازی تنظیم می‌شود تا لاگ داخل setup_logging دوباره آن را اجرا نکند
     if not hasattr(get_logger, "_initialized"):
-        setup_logging()
         get_logger._initialized = True
+        setup_logging()
     
     # ایجاد لاگر
     logger = logging.getLogger(name)
     
     return logger
 
+# نمونه سینگلتون
+log_sampler = LogSampler(settings.LOG_SAMPLE_INTERVAL_SECONDS)
+
 class AppException(Exception):
     """پایه خطاهای برنامه برای مدیریت بهتر خطاها"""
     def __init__(
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+    CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.core.metrics")
+
+# باکت‌های تاخیر (ثانیه) - از یک میلی‌ثانیه تا ده ثانیه
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+PROVIDER_REQUEST_DURATION = Histogram(
+    "provider_request_duration_seconds",
+    "Twitter provider request latency by endpoint and status",
+    ["provider", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+PROVIDER_RETRIES = Counter(
+    "provider_request_retries_total",
+    "Retried Twitter provider requests",
+    ["provider", "endpoint"]
+)
+
+TWEETS_INGESTED = Counter(
+    "tweets_ingested_total",
+    "Tweets stored per keyword",
+    ["keyword", "outcome"]
+)
+
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth",
+    "Scheduler job instances submitted but not finished",
+    multiprocess_mode="livesum"
+)
+
+SCHEDULER_MISSED_JOBS = Counter(
+    "scheduler_missed_jobs_total",
+    "Scheduler jobs that missed their run time",
+    ["job_id"]
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between scheduled and actual wake-up of the event loop",
+    buckets=LATENCY_BUCKETS
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float) -> None:
+    """ثبت تاخیر یک درخواست HTTP"""
+    HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status)).observe(duration)
+
+
+def observe_provider_request(provider: str, endpoint: str, status: Any, duration: float) -> None:
+    """ثبت تاخیر یک درخواست به سرویس توییتر"""
+    PROVIDER_REQUEST_DURATION.labels(provider=provider, endpoint=endpoint, status=str(status)).observe(duration)
+
+
+def record_provider_retry(provider: str, endpoint: str) -> None:
+    """ثبت تلاش مجدد درخواست به سرویس توییتر"""
+    PROVIDER_RETRIES.labels(provider=provider, endpoint=endpoint).inc()
+
+
+def record_ingested(keyword: str, inserted: int = 0, updated: int = 0) -> None:
+    """ثبت تعداد توییت‌های ذخیره شده برای یک کلمه کلیدی"""
+    if inserted:
+        TWEETS_INGESTED.labels(keyword=keyword, outcome="inserted").inc(inserted)
+    if updated:
+        TWEETS_INGESTED.labels(keyword=keyword, outcome="updated").inc(updated)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    تولید خروجی متنی Prometheus
+
+    در حالت چند worker (متغیر PROMETHEUS_MULTIPROC_DIR) مقادیر همه پروسه‌ها تجمیع می‌شوند.
+
+    Returns:
+        tuple: (محتوا، نوع محتوا)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """پاکسازی فایل‌های متریک پروسه جاری در حالت چند worker"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """ثبت تاخیر دستورات MongoDB به تفکیک کالکشن و نوع دستور"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> Tuple[Any, int]:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event) -> None:
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._pending[self._key(event)] = collection
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._pending.pop(self._key(event), "-")
+        MONGO_COMMAND_DURATION.labels(
+            collection=collection,
+            command=event.command_name,
+            outcome=outcome
+        ).observe(event.duration_micros / 1_000_000)
+
+    def succeeded(self, event) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event) -> None:
+        self._finish(event, "failure")
+
+
+class EventLoopMonitor:
+    """اندازه‌گیری تاخیر حلقه رویداد با خواب دوره‌ای"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            EVENT_LOOP_LAG.observe(max(lag, 0.0))
+
+    def start(self) -> None:
+        """شروع پایش"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("Event loop lag monitor started")
+
+    async def stop(self) -> None:
+        """توقف پایش"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# نمونه‌های سینگلتون
+mongo_metrics_listener = MongoMetricsListener()
+event_loop_monitor = EventLoopMonitor(settings.EVENT_LOOP_LAG_INTERVAL)
@@ -29,9 +29,13 @@ class MigrationManager:
         self.migrations_package = migrations_package
         self.migrations: List[Migration] = []
         self._loaded = False
+        self._collection_ready = False
     
     async def _ensure_migration_collection(self) -> None:
-        """اطمینان از وجود کالکشن میگریشن"""
+        """اطمینان از وجود کالکشن میگریشن (یک بار در هر پروسه)"""
+        if self._collection_ready:
+            return
+        
         try:
             # ایجاد کالکشن میگریشن اگر وجود ندارد
             collections = await db.db.list_collection_names()
@@ -40,6 +44,8 @@ class MigrationManager:
                 
                 # ایجاد ایندکس یکتا برای نسخه
                 await db.get_collection("migrations").create_index("version", unique=True)
+            
+            self._collection_ready = True
         
         except Exception as e:
             logger.error(f"Error creating migrations collection: {e}")
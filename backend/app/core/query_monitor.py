@@ -0,0 +1,348 @@
+import time
+import asyncio
+import threading
+from collections import deque, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from bson import json_util
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.stats import summarize
+
+logger = get_logger("app.core.query_monitor")
+
+# دستوراتی که شکل کوئری برایشان معنا دارد
+MONITORED_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify", "insert"}
+
+# فیلدهایی از دستور که برای اجرای مجدد explain لازم است
+_EXPLAIN_FIELDS = {
+    "find": ("find", "filter", "sort", "projection", "limit", "skip", "hint"),
+    "aggregate": ("aggregate", "pipeline", "hint"),
+    "count": ("count", "query", "limit", "skip", "hint"),
+    "distinct": ("distinct", "key", "query"),
+}
+
+
+def _filter_shape(query: Any) -> List[str]:
+    """تبدیل فیلتر به لیست مرتب کلیدها همراه با نوع عملگر (بدون مقادیر)"""
+    if not isinstance(query, dict):
+        return []
+
+    shape = []
+    for key, value in query.items():
+        if key in ("$and", "$or", "$nor") and isinstance(value, list):
+            parts = sorted({"&".join(_filter_shape(item)) for item in value})
+            shape.append(f"{key}({'|'.join(parts)})")
+        elif isinstance(value, dict) and value and all(str(k).startswith("$") for k in value):
+            shape.append(f"{key}:{','.join(sorted(value.keys()))}")
+        else:
+            shape.append(f"{key}:eq")
+
+    return sorted(shape)
+
+
+def _sort_shape(sort: Any) -> List[str]:
+    """تبدیل مشخصات مرتب‌سازی به لیست قابل نمایش"""
+    if isinstance(sort, dict):
+        return [f"{key}:{direction}" for key, direction in sort.items()]
+    return []
+
+
+def normalize_command(command_name: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    نرمال‌سازی یک دستور MongoDB به شکل کوئری (کالکشن + کلیدهای فیلتر + مرتب‌سازی)
+
+    Args:
+        command_name: نام دستور
+        command: متن دستور
+
+    Returns:
+        dict: شکل کوئری شامل کلید یکتا، یا None برای دستورات غیرقابل پایش
+    """
+    if command_name not in MONITORED_COMMANDS:
+        return None
+
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        return None
+
+    query: Any = {}
+    sort: Any = None
+    stages: List[str] = []
+
+    if command_name == "find":
+        query = command.get("filter", {})
+        sort = command.get("sort")
+    elif command_name == "aggregate":
+        pipeline = command.get("pipeline", [])
+        stages = [next(iter(stage)) for stage in pipeline if stage]
+        if pipeline and "$match" in pipeline[0]:
+            query = pipeline[0]["$match"]
+        for stage in pipeline:
+            if "$sort" in stage:
+                sort = stage["$sort"]
+                break
+    elif command_name in ("count", "distinct"):
+        query = command.get("query", {})
+    elif command_name == "findAndModify":
+        query = command.get("query", {})
+        sort = command.get("sort")
+    elif command_name == "update":
+        updates = command.get("updates") or [{}]
+        query = updates[0].get("q", {})
+    elif command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        query = deletes[0].get("q", {})
+
+    filter_keys = _filter_shape(query)
+    sort_keys = _sort_shape(sort)
+
+    key = f"{collection}.{command_name} filter={{{', '.join(filter_keys)}}}"
+    if sort_keys:
+        key += f" sort={{{', '.join(sort_keys)}}}"
+    if stages:
+        key += f" stages=[{', '.join(stages)}]"
+
+    return {
+        "key": key,
+        "collection": collection,
+        "command": command_name,
+        "filter_keys": filter_keys,
+        "sort": sort_keys,
+        "stages": stages,
+        "filter": query,
+    }
+
+
+def collect_plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """جمع‌آوری نام مراحل یک پلان اجرا (از ریشه به برگ)"""
+    stages = []
+    while plan:
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            for child in plan["inputStages"]:
+                stages.extend(collect_plan_stages(child))
+            break
+        else:
+            break
+    return stages
+
+
+def _docs_returned(command_name: str, reply: Dict[str, Any]) -> int:
+    """تعداد اسناد بازگشتی یا تغییر یافته از پاسخ دستور"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", []))
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class QueryShapeStats:
+    """آمار غلتان یک شکل کوئری"""
+
+    def __init__(self, shape: Dict[str, Any]):
+        self.collection = shape["collection"]
+        self.command = shape["command"]
+        self.filter_keys = shape["filter_keys"]
+        self.sort = shape["sort"]
+        self.stages = shape["stages"]
+        self.count = 0
+        self.failures = 0
+        self.slow_count = 0
+        self.total_ms = 0.0
+        self.docs_returned = 0
+        self.latencies_ms: deque = deque(maxlen=settings.QUERY_MONITOR_SAMPLE_SIZE)
+        self.docs_examined: Optional[int] = None
+        self.keys_examined: Optional[int] = None
+        self.plan_stages: List[str] = []
+        self.explained_at = 0.0
+        self.last_seen = 0.0
+        self.example_filter: Optional[str] = None
+
+    def to_dict(self, key: str) -> Dict[str, Any]:
+        latency = summarize(self.latencies_ms)
+        return {
+            "shape": key,
+            "collection": self.collection,
+            "command": self.command,
+            "filter_keys": self.filter_keys,
+            "sort": self.sort,
+            "stages": self.stages,
+            "count": self.count,
+            "failures": self.failures,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total_ms, 2),
+            "latency_ms": {k: v for k, v in latency.items() if k != "count"},
+            "avg_docs_returned": round(self.docs_returned / self.count, 2) if self.count else 0.0,
+            "docs_examined": self.docs_examined,
+            "keys_examined": self.keys_examined,
+            "plan_stages": self.plan_stages,
+            "example_filter": self.example_filter,
+            "last_seen": self.last_seen,
+        }
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """
+    پایش دستورات MongoDB به تفکیک شکل کوئری
+
+    - صدک‌های غلتان تاخیر و تعداد اسناد بازگشتی برای هر شکل
+    - لاگ دستورات کندتر از آستانه همراه با فیلتر
+    - اجرای explain نمونه برای شکل‌های کند جهت ثبت تعداد اسناد بررسی شده
+    """
+
+    def __init__(self):
+        self._shapes: "OrderedDict[str, QueryShapeStats]" = OrderedDict()
+        self._pending: Dict[Tuple[Any, int], Tuple[Dict[str, Any], Dict[str, Any], str]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+
+    def bind(self, client, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """اتصال به کلاینت Motor و حلقه رویداد برای اجرای explain"""
+        self._client = client
+        self._loop = loop or asyncio.get_event_loop()
+
+    @staticmethod
+    def _key(event) -> Tuple[Any, int]:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event) -> None:
+        shape = normalize_command(event.command_name, event.command)
+        if shape is None:
+            return
+        with self._lock:
+            self._pending[self._key(event)] = (shape, event.command, event.database_name)
+
+    def succeeded(self, event) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop(self._key(event), None)
+        if pending is None:
+            return
+
+        shape, command, database_name = pending
+        duration_ms = event.duration_micros / 1000.0
+        slow = duration_ms >= settings.MONGO_SLOW_QUERY_MS
+        explain = False
+
+        with self._lock:
+            stats = self._shapes.get(shape["key"])
+            if stats is None:
+                stats = QueryShapeStats(shape)
+                self._shapes[shape["key"]] = stats
+                # حذف قدیمی‌ترین شکل در صورت عبور از سقف
+                while len(self._shapes) > settings.QUERY_MONITOR_MAX_SHAPES:
+                    self._shapes.popitem(last=False)
+            else:
+                self._shapes.move_to_end(shape["key"])
+
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.latencies_ms.append(duration_ms)
+            stats.last_seen = time.time()
+            if failed:
+                stats.failures += 1
+            else:
+                stats.docs_returned += _docs_returned(event.command_name, event.reply)
+            if slow:
+                stats.slow_count += 1
+                stats.example_filter = json_util.dumps(shape["filter"])[:500]
+                if (
+                    event.command_name in _EXPLAIN_FIELDS
+                    and time.time() - stats.explained_at > settings.QUERY_MONITOR_EXPLAIN_INTERVAL
+                ):
+                    stats.explained_at = time.time()
+                    explain = True
+
+        if slow:
+            logger.warning(
+                f"Slow query ({duration_ms:.1f}ms) {shape['key']} "
+                f"filter={json_util.dumps(shape['filter'])[:500]}"
+            )
+
+        if explain:
+            self._schedule_explain(shape["key"], event.command_name, command, database_name)
+
+    def _schedule_explain(self, key: str, command_name: str, command: Dict[str, Any], database_name: str) -> None:
+        """زمان‌بندی explain روی حلقه رویداد (رویدادهای listener در thread های pymongo اجرا می‌شوند)"""
+        if self._client is None or self._loop is None or self._loop.is_closed():
+            return
+
+        explain_command = {field: command[field] for field in _EXPLAIN_FIELDS[command_name] if field in command}
+        if command_name == "aggregate":
+            explain_command["cursor"] = {}
+
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._explain(key, explain_command, database_name), self._loop
+            )
+        except RuntimeError:
+            pass
+
+    async def _explain(self, key: str, command: Dict[str, Any], database_name: str) -> None:
+        """اجرای explain و ثبت تعداد کلیدها و اسناد بررسی شده"""
+        try:
+            result = await self._client[database_name].command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+        except Exception as e:
+            logger.debug(f"Explain failed for {key}: {e}")
+            return
+
+        execution_stats = result.get("executionStats")
+        if execution_stats is None:
+            # در aggregate آمار اجرا داخل مرحله $cursor قرار دارد
+            for stage in result.get("stages", []):
+                cursor_stage = stage.get("$cursor")
+                if cursor_stage:
+                    execution_stats = cursor_stage.get("executionStats")
+                    result = cursor_stage
+                    break
+        if not execution_stats:
+            return
+
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is not None:
+                stats.docs_examined = execution_stats.get("totalDocsExamined")
+                stats.keys_examined = execution_stats.get("totalKeysExamined")
+                stats.plan_stages = collect_plan_stages(result.get("queryPlanner", {}).get("winningPlan", {}))
+
+    def top_shapes(self, limit: int = 20, sort_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """
+        دریافت شکل‌های پرهزینه
+
+        Args:
+            limit: تعداد نتایج
+            sort_by: معیار مرتب‌سازی (total_ms, count, p95, slow_count)
+        """
+        with self._lock:
+            shapes = [stats.to_dict(key) for key, stats in self._shapes.items()]
+
+        if sort_by == "p95":
+            shapes.sort(key=lambda s: s["latency_ms"]["p95"], reverse=True)
+        else:
+            shapes.sort(key=lambda s: s.get(sort_by, 0), reverse=True)
+
+        return shapes[:limit]
+
+    def reset(self) -> None:
+        """پاک کردن آمار جمع‌آوری شده"""
+        with self._lock:
+            self._shapes.clear()
+
+
+# نمونه سینگلتون
+query_monitor = QueryMonitor()
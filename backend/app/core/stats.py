@@ -0,0 +1,52 @@
+from typing import Dict, Iterable, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    محاسبه صدک با درون‌یابی خطی روی لیست مرتب شده
+
+    Args:
+        sorted_values: مقادیر مرتب شده صعودی
+        q: صدک مورد نظر بین 0 و 100
+
+    Returns:
+        float: مقدار صدک (صفر برای لیست خالی)
+    """
+    if not sorted_values:
+        return 0.0
+
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+
+    position = (len(sorted_values) - 1) * (q / 100.0)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction)
+
+
+def summarize(values: Iterable[float], quantiles: Sequence[float] = (50, 90, 95, 99)) -> Dict[str, float]:
+    """
+    خلاصه آماری یک سری مقادیر (تعداد، میانگین، بیشینه و صدک‌ها)
+
+    Args:
+        values: مقادیر
+        quantiles: صدک‌های مورد نیاز
+
+    Returns:
+        dict: خلاصه آماری با کلیدهای count, avg, max, p50, ...
+    """
+    sorted_values = sorted(values)
+    count = len(sorted_values)
+
+    summary = {
+        "count": count,
+        "avg": round(sum(sorted_values) / count, 4) if count else 0.0,
+        "max": round(float(sorted_values[-1]), 4) if count else 0.0,
+    }
+
+    for q in quantiles:
+        summary[f"p{int(q)}"] = round(percentile(sorted_values, q), 4)
+
+    return summary
@@ -1,8 +1,9 @@
 import time
 import os
+from contextlib import contextmanager
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from fastapi.staticfiles import StaticFiles
@@ -11,8 +12,12 @@ from typing import Dict, Any, List
 from app.api.v1.router import api_router
 from app.core.config import settings
 from app.core.db import connect_to_mongo, close_mongo_connection, get_database_stats
-from app.core.logging import get_logger, AppException
+from app.core.logging import get_logger, AppException, shutdown_logging
+from app.core.metrics import event_loop_monitor, mark_process_dead, observe_request, render_metrics
 from app.core.migrations import run_migrations
+from app.services.enrichment import enrichment_runner
+from app.services.system_sampler import system_sampler
+from app.services.trending import trending_engine
 from app.tasks.scheduler import setup_scheduler, shutdown_scheduler
 
 # تنظیم لاگینگ
@@ -45,12 +50,21 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-# میان‌افزار زمان پردازش
+# میان‌افزار زمان پردازش و متریک تاخیر درخواست‌ها
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        if settings.METRICS_ENABLED:
+            # استفاده از الگوی مسیر (نه مسیر واقعی) برای محدود ماندن تعداد برچسب‌ها
+            route = request.scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            observe_request(request.method, route_label, status_code, process_time)
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
@@ -76,16 +90,28 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"error": "An unexpected error occurred", "detail": str(exc), "type": type(exc).__name__}
     )
 
+@contextmanager
+def _startup_phase(timings: Dict[str, float], name: str):
+    """اندازه‌گیری مدت یک مرحله راه‌اندازی (میلی‌ثانیه)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
 # رویدادها
 @app.on_event("startup")
 async def startup_event():
     """رویداد راه‌اندازی برنامه"""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
     try:
         logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION} in {settings.ENVIRONMENT} mode")
         logger.info(f"Debug mode: {settings.DEBUG}")
         
-        # اتصال به MongoDB
-        await connect_to_mongo()
+        # اتصال به MongoDB و ایجاد ایندکس‌های ناموجود
+        with _startup_phase(timings, "mongodb"):
+            await connect_to_mongo()
         logger.info("Connected to MongoDB")
         
         # بررسی اعتبار تنظیمات توییتر
@@ -96,12 +122,32 @@ async def startup_event():
             )
         
         # اجرای میگریشن‌ها
-        await run_migrations()
+        with _startup_phase(timings, "migrations"):
+            await run_migrations()
+        
+        # بازیابی آمار موضوعات داغ
+        if settings.TRENDING_ENABLED:
+            with _startup_phase(timings, "trending_restore"):
+                await trending_engine.restore()
         
         # راه‌اندازی زمان‌بند
-        await setup_scheduler()
+        with _startup_phase(timings, "scheduler"):
+            await setup_scheduler()
         
-        logger.info(f"{settings.PROJECT_NAME} startup completed")
+        # پایش تاخیر حلقه رویداد
+        if settings.METRICS_ENABLED:
+            event_loop_monitor.start()
+        
+        # نمونه‌برداری پس‌زمینه آمار سیستم
+        if settings.SYSTEM_SAMPLER_ENABLED:
+            system_sampler.start()
+        
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        app.state.startup_timings = timings
+        logger.info(
+            f"{settings.PROJECT_NAME} startup completed in {timings['total']} ms "
+            f"({', '.join(f'{name}={value} ms' for name, value in timings.items() if name != 'total')})"
+        )
     except Exception as e:
         logger.error(f"Error during startup: {e}")
         logger.exception(e)
@@ -115,8 +161,27 @@ async def shutdown_event():
     # خاموش کردن زمان‌بند
     await shutdown_scheduler()
     
+    # ذخیره آخرین بازه‌های موضوعات داغ
+    if settings.TRENDING_ENABLED:
+        try:
+            await trending_engine.snapshot()
+        except Exception as e:
+            logger.error(f"Error saving trending snapshot on shutdown: {e}")
+    
+    # بستن پول‌های کارگر مراحل غنی‌سازی
+    enrichment_runner.shutdown()
+    
+    # توقف پایش‌ها و پاکسازی متریک‌های پروسه
+    await event_loop_monitor.stop()
+    await system_sampler.stop()
+    mark_process_dead()
+    
     # بستن اتصال دیتابیس
     await close_mongo_connection()
+    
+    # نوشتن لاگ‌های باقی‌مانده صف
+    logger.info("Application shutdown complete")
+    shutdown_logging()
 
 # مسیر ریشه
 @app.get("/")
@@ -156,6 +221,13 @@ async def health_check():
     
     return status
 
+# متریک‌های Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """خروجی متریک‌ها در قالب متنی Prometheus"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 # مسیرهای داکیومنتیشن سفارشی
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
@@ -168,15 +240,18 @@ async def custom_swagger_ui_html():
         swagger_css_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@4/swagger-ui.css",
     )
 
-@app.get("/openapi.json", include_in_schema=False)
-async def get_open_api_endpoint():
-    """JSON مستندات OpenAPI"""
-    return get_openapi(
-        title=settings.PROJECT_NAME,
-        version=settings.VERSION,
-        description="API Documentation for Twitter Monitoring System",
-        routes=app.routes,
-    )
+def custom_openapi() -> Dict[str, Any]:
+    """ساخت مستندات OpenAPI یک بار در هر پروسه و کش آن"""
+    if app.openapi_schema is None:
+        app.openapi_schema = get_openapi(
+            title=settings.PROJECT_NAME,
+            version=settings.VERSION,
+            description="API Documentation for Twitter Monitoring System",
+            routes=app.routes,
+        )
+    return app.openapi_schema
+
+app.openapi = custom_openapi
 
 # اضافه کردن API سیستم
 from app.api.v1.endpoints import system
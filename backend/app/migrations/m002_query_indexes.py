@@ -0,0 +1,56 @@
+from pymongo.errors import OperationFailure
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.indexes import INDEX_SPECS, OBSOLETE_INDEXES
+from app.core.logging import get_logger
+
+logger = get_logger("app.migrations.m002_query_indexes")
+
+# ایندکس‌های ترکیبی که این میگریشن اضافه می‌کند (برای برگشت)
+ADDED_INDEXES = {
+    "tweets": ["keywords_1_created_at_-1_importance_score_-1", "refresh_candidates"],
+}
+
+class QueryIndexesMigration(Migration):
+    """هماهنگ‌سازی ایندکس‌ها با شکل‌های کوئری API (پیشنهادهای index advisor)"""
+    version = "002"
+    description = "Align indexes with API query shapes (ESR compound and partial indexes)"
+    
+    async def up(self):
+        """ایجاد ایندکس‌های ترکیبی و حذف ایندکس‌های تکی پوشش داده شده"""
+        logger.info("Aligning indexes with API query shapes")
+        
+        # ابتدا ایندکس‌های جدید ساخته می‌شوند تا کوئری‌ها بدون ایندکس نمانند
+        for collection_name, indexes in INDEX_SPECS.items():
+            await get_collection(collection_name).create_indexes(indexes)
+        
+        for collection_name, index_names in OBSOLETE_INDEXES.items():
+            collection = get_collection(collection_name)
+            existing = await collection.index_information()
+            
+            for index_name in index_names:
+                if index_name in existing:
+                    await collection.drop_index(index_name)
+                    logger.info(f"Dropped obsolete index {collection_name}.{index_name}")
+        
+        logger.info("Query indexes migration completed successfully")
+    
+    async def down(self):
+        """بازگرداندن ایندکس‌های تکی قبلی"""
+        logger.info("Rolling back query indexes migration")
+        
+        tweets_collection = get_collection("tweets")
+        await tweets_collection.create_index("created_at")
+        await tweets_collection.create_index("keywords")
+        await tweets_collection.create_index("importance_score")
+        await get_collection("keywords").create_index("is_active")
+        
+        for collection_name, index_names in ADDED_INDEXES.items():
+            for index_name in index_names:
+                try:
+                    await get_collection(collection_name).drop_index(index_name)
+                except OperationFailure:
+                    pass
+        
+        logger.info("Query indexes migration rolled back successfully")
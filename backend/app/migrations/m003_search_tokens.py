@@ -0,0 +1,74 @@
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.indexes import TWEET_INDEXES
+from app.core.logging import get_logger
+from app.services.text_processing import build_search_tokens
+
+logger = get_logger("app.migrations.m003_search_tokens")
+
+# اندازه هر دسته در پر کردن search_tokens توییت‌های موجود
+BACKFILL_BATCH_SIZE = 1000
+
+class SearchTokensMigration(Migration):
+    """جایگزینی ایندکس text با توکن‌های نرمال شده جستجو"""
+    version = "003"
+    description = "Backfill normalized search_tokens and drop the raw text index"
+    
+    async def up(self):
+        """ساخت search_tokens برای توییت‌های موجود، ایجاد ایندکس چندکلیدی و حذف ایندکس text"""
+        logger.info("Backfilling search tokens")
+        
+        tweets_collection = get_collection("tweets")
+        await tweets_collection.create_indexes(
+            [index for index in TWEET_INDEXES if index.document["name"] == "search_tokens_1_created_at_-1"]
+        )
+        
+        cursor = tweets_collection.find(
+            {"search_tokens": {"$exists": False}},
+            {"_id": 1, "text": 1}
+        ).batch_size(BACKFILL_BATCH_SIZE)
+        
+        operations = []
+        backfilled = 0
+        async for tweet in cursor:
+            operations.append(UpdateOne(
+                {"_id": tweet["_id"]},
+                {"$set": {"search_tokens": build_search_tokens(tweet.get("text"))}}
+            ))
+            
+            if len(operations) >= BACKFILL_BATCH_SIZE:
+                await tweets_collection.bulk_write(operations, ordered=False)
+                backfilled += len(operations)
+                operations = []
+        
+        if operations:
+            await tweets_collection.bulk_write(operations, ordered=False)
+            backfilled += len(operations)
+        
+        logger.info(f"Backfilled search tokens for {backfilled} tweets")
+        
+        existing = await tweets_collection.index_information()
+        if "text_text" in existing:
+            await tweets_collection.drop_index("text_text")
+            logger.info("Dropped text index tweets.text_text")
+        
+        logger.info("Search tokens migration completed successfully")
+    
+    async def down(self):
+        """بازگرداندن ایندکس text و حذف search_tokens"""
+        logger.info("Rolling back search tokens migration")
+        
+        tweets_collection = get_collection("tweets")
+        await tweets_collection.create_index([("text", "text")], default_language="none")
+        
+        try:
+            await tweets_collection.drop_index("search_tokens_1_created_at_-1")
+        except OperationFailure:
+            pass
+        
+        await tweets_collection.update_many({}, {"$unset": {"search_tokens": ""}})
+        
+        logger.info("Search tokens migration rolled back successfully")
@@ -0,0 +1,54 @@
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.migrations.m004_refresh_planner")
+
+# ایندکس‌های کوئری‌های برنامه‌ریز به‌روزرسانی (جدیدترین و سریع‌ترین توییت‌های پنجره)
+REFRESH_PLANNER_INDEXES = [
+    IndexModel([("created_at", DESCENDING), ("updated_in_db", ASCENDING)], name="created_at_-1_updated_in_db_1"),
+    IndexModel(
+        [("velocity_score", DESCENDING), ("created_at", DESCENDING), ("updated_in_db", ASCENDING)],
+        name="velocity_score_-1_created_at_-1_updated_in_db_1"
+    ),
+]
+
+class RefreshPlannerMigration(Migration):
+    """جایگزینی ایندکس جزئی قاعده قدیمی انتخاب توییت‌ها برای به‌روزرسانی آمار با ایندکس‌های برنامه‌ریز"""
+    version = "004"
+    description = "Replace the importance > 50 refresh index with refresh planner indexes"
+    
+    async def up(self):
+        """حذف ایندکس refresh_candidates و ایجاد ایندکس‌های برنامه‌ریز"""
+        tweets_collection = get_collection("tweets")
+        existing = await tweets_collection.index_information()
+        
+        if "refresh_candidates" in existing:
+            await tweets_collection.drop_index("refresh_candidates")
+            logger.info("Dropped index tweets.refresh_candidates")
+        
+        await tweets_collection.create_indexes(REFRESH_PLANNER_INDEXES)
+        logger.info("Created refresh planner indexes on tweets")
+        
+        logger.info("Refresh planner migration completed successfully")
+    
+    async def down(self):
+        """حذف ایندکس‌های برنامه‌ریز و بازگرداندن ایندکس refresh_candidates"""
+        tweets_collection = get_collection("tweets")
+        existing = await tweets_collection.index_information()
+        
+        for index in REFRESH_PLANNER_INDEXES:
+            if index.document["name"] in existing:
+                await tweets_collection.drop_index(index.document["name"])
+        
+        await tweets_collection.create_indexes([
+            IndexModel(
+                [("importance_score", DESCENDING), ("updated_in_db", ASCENDING)],
+                name="refresh_candidates",
+                partialFilterExpression={"importance_score": {"$gt": 50}}
+            )
+        ])
+        
+        logger.info("Refresh planner migration rolled back successfully")
@@ -0,0 +1,74 @@
+from pymongo import IndexModel, ASCENDING
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.migrations.m005_enrichment_flags")
+
+class EnrichmentFlagsMigration(Migration):
+    """جایگزینی پرچم is_processed با پرچم‌های هر مرحله غنی‌سازی"""
+    version = "005"
+    description = "Replace is_processed with per-stage pending_enrichment and enriched flags"
+    
+    async def up(self):
+        """تبدیل is_processed به pending_enrichment و enriched"""
+        tweets_collection = get_collection("tweets")
+        
+        # توییت‌های پردازش نشده در صف مرحله احساسات قرار می‌گیرند
+        queued = await tweets_collection.update_many(
+            {"is_processed": False},
+            {"$set": {"pending_enrichment": ["sentiment"]}}
+        )
+        # توییت‌هایی که قبلا برچسب احساسات گرفته‌اند
+        await tweets_collection.update_many(
+            {"sentiment_label": {"$exists": True}, "enriched.sentiment": {"$exists": False}},
+            {"$set": {"enriched.sentiment": {"version": 1}}}
+        )
+        await tweets_collection.update_many(
+            {"is_processed": {"$exists": True}},
+            {"$unset": {"is_processed": ""}}
+        )
+        logger.info(f"Queued {queued.modified_count} tweets for the sentiment stage")
+        
+        await tweets_collection.create_indexes([
+            IndexModel([("pending_enrichment", ASCENDING), ("_id", ASCENDING)], name="pending_enrichment_1__id_1")
+        ])
+        
+        existing = await tweets_collection.index_information()
+        if "unprocessed" in existing:
+            await tweets_collection.drop_index("unprocessed")
+            logger.info("Dropped index tweets.unprocessed")
+        
+        logger.info("Enrichment flags migration completed successfully")
+    
+    async def down(self):
+        """بازگرداندن is_processed و ایندکس unprocessed"""
+        tweets_collection = get_collection("tweets")
+        
+        await tweets_collection.update_many(
+            {"pending_enrichment": "sentiment"},
+            {"$set": {"is_processed": False}}
+        )
+        await tweets_collection.update_many(
+            {"is_processed": {"$exists": False}},
+            {"$set": {"is_processed": True}}
+        )
+        await tweets_collection.update_many(
+            {},
+            {"$unset": {"pending_enrichment": "", "enriched": "", "enrichment_leases": "", "enrichment_attempts": ""}}
+        )
+        
+        await tweets_collection.create_indexes([
+            IndexModel(
+                [("is_processed", ASCENDING)],
+                name="unprocessed",
+                partialFilterExpression={"is_processed": False}
+            )
+        ])
+        
+        existing = await tweets_collection.index_information()
+        if "pending_enrichment_1__id_1" in existing:
+            await tweets_collection.drop_index("pending_enrichment_1__id_1")
+        
+        logger.info("Enrichment flags migration rolled back successfully")
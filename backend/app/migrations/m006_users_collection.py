@@ -0,0 +1,82 @@
+from pymongo import UpdateOne
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.indexes import USER_INDEXES
+from app.core.logging import get_logger
+
+logger = get_logger("app.migrations.m006_users_collection")
+
+class UsersCollectionMigration(Migration):
+    """انتقال پروفایل نویسندگان از توییت‌ها به کالکشن users"""
+    version = "006"
+    description = "Move author profiles from tweets into the normalized users collection"
+    
+    async def up(self):
+        """ساخت پروفایل‌ها از جدیدترین توییت هر نویسنده و حذف فیلدهای تکراری توییت‌ها"""
+        tweets_collection = get_collection("tweets")
+        users_collection = get_collection("users")
+        await users_collection.create_indexes(USER_INDEXES)
+        
+        pipeline = [
+            {"$match": {"user_id": {"$nin": [None, ""]}}},
+            {"$sort": {"created_at": -1}},
+            {"$group": {
+                "_id": "$user_id",
+                "screen_name": {"$first": "$user_screen_name"},
+                "name": {"$first": "$user_name"},
+                "verified": {"$first": "$user_verified"},
+                "followers_count": {"$first": "$user_followers_count"},
+                "friends_count": {"$first": "$user_friends_count"},
+                "first_seen_at": {"$min": "$created_in_db"},
+                "updated_at": {"$max": "$updated_in_db"}
+            }}
+        ]
+        
+        operations = []
+        migrated = 0
+        async for user in tweets_collection.aggregate(pipeline, allowDiskUse=True):
+            profile = {key: value for key, value in user.items() if key not in ("_id", "first_seen_at") and value is not None}
+            profile["user_id"] = user["_id"]
+            if profile.get("screen_name"):
+                profile["screen_name_lower"] = profile["screen_name"].lower()
+            operations.append(UpdateOne(
+                {"user_id": user["_id"]},
+                {"$set": profile, "$setOnInsert": {"first_seen_at": user.get("first_seen_at")}},
+                upsert=True
+            ))
+            if len(operations) >= 1000:
+                await users_collection.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+                operations = []
+        if operations:
+            await users_collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+        
+        logger.info(f"Upserted {migrated} user profiles")
+        
+        result = await tweets_collection.update_many(
+            {},
+            {"$unset": {
+                "user_name": "",
+                "user_friends_count": "",
+                "raw_data.user": "",
+                "raw_data.retweeted_status.user": "",
+                "raw_data.quoted_status.user": ""
+            }}
+        )
+        logger.info(f"Removed embedded profile fields from {result.modified_count} tweets")
+        
+        logger.info("Users collection migration completed successfully")
+    
+    async def down(self):
+        """بازگرداندن نام و تعداد دنبال‌شونده‌ها روی توییت‌ها (شیء user داده خام قابل بازگشت نیست)"""
+        tweets_collection = get_collection("tweets")
+        
+        async for user in get_collection("users").find({}, {"user_id": 1, "name": 1, "friends_count": 1}):
+            await tweets_collection.update_many(
+                {"user_id": user["user_id"]},
+                {"$set": {"user_name": user.get("name", ""), "user_friends_count": user.get("friends_count", 0)}}
+            )
+        
+        logger.info("Users collection migration rolled back successfully")
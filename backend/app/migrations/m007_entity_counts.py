@@ -0,0 +1,64 @@
+from pymongo import UpdateOne
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.indexes import ENTITY_COUNT_INDEXES
+from app.core.logging import get_logger
+from app.services.entities import EntityCounter, entity_keys, extract_entities
+
+logger = get_logger("app.migrations.m007_entity_counts")
+
+# اندازه هر دسته در استخراج موجودیت‌های توییت‌های موجود
+BACKFILL_BATCH_SIZE = 1000
+
+class EntityCountsMigration(Migration):
+    """استخراج موجودیت‌های توییت‌های موجود و ساخت شمارنده‌های روزانه entity_counts"""
+    version = "007"
+    description = "Backfill mentions, urls, media and entity_keys and build entity_counts"
+    
+    async def up(self):
+        """پر کردن فیلدهای موجودیت توییت‌های قدیمی به ترتیب _id"""
+        tweets_collection = get_collection("tweets")
+        await get_collection("entity_counts").create_indexes(ENTITY_COUNT_INDEXES)
+        
+        counter = EntityCounter()
+        projection = {"text": 1, "raw_data": 1, "hashtags": 1, "keywords": 1, "created_at": 1}
+        query = {"entity_keys": {"$exists": False}}
+        last_id = None
+        migrated = 0
+        
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            tweets = await tweets_collection.find(batch_query, projection).sort("_id", 1).limit(BACKFILL_BATCH_SIZE).to_list(length=BACKFILL_BATCH_SIZE)
+            if not tweets:
+                break
+            
+            operations = []
+            for tweet in tweets:
+                fields = extract_entities(tweet.get("raw_data") or {}, tweet.get("text", ""))
+                # هشتگ‌های ذخیره شده برای توییت‌هایی که داده خام آنها حذف شده است
+                fields["hashtags"] = list(dict.fromkeys(tweet.get("hashtags", []) + fields["hashtags"]))
+                fields["entity_keys"] = entity_keys(fields)
+                operations.append(UpdateOne({"_id": tweet["_id"]}, {"$set": fields}))
+                counter.record({**tweet, "entity_keys": fields["entity_keys"]})
+            
+            await tweets_collection.bulk_write(operations, ordered=False)
+            await counter.flush()
+            
+            last_id = tweets[-1]["_id"]
+            migrated += len(tweets)
+        
+        logger.info(f"Extracted entities of {migrated} tweets")
+        logger.info("Entity counts migration completed successfully")
+    
+    async def down(self):
+        """حذف entity_keys و کالکشن entity_counts"""
+        await get_collection("tweets").update_many(
+            {"entity_keys": {"$exists": True}},
+            {"$unset": {"entity_keys": ""}}
+        )
+        await get_collection("entity_counts").drop()
+        
+        logger.info("Entity counts migration rolled back successfully")
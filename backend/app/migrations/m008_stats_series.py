@@ -0,0 +1,47 @@
+from datetime import datetime
+from pymongo import UpdateOne
+
+from app.core.migrations import Migration
+from app.core.db import get_collection
+from app.core.indexes import SYSTEM_STATS_DAILY_INDEXES
+from app.core.logging import get_logger
+from app.services.stats_series import RESOLUTION_COLLECTIONS, STATS_METRICS, flatten_sample, summarize
+
+logger = get_logger("app.migrations.m008_stats_series")
+
+class StatsSeriesMigration(Migration):
+    """انتقال اسناد روزانه system_stats به سری زمانی روزانه system_stats_1d"""
+    version = "008"
+    description = "Convert per-day system_stats documents into the system_stats_1d series"
+    
+    async def up(self):
+        """تبدیل هر سند روزانه به یک تجمیع تک‌نقطه‌ای و حذف کالکشن قدیمی"""
+        daily_collection = get_collection(RESOLUTION_COLLECTIONS["1d"])
+        await daily_collection.create_indexes(SYSTEM_STATS_DAILY_INDEXES)
+        
+        operations = []
+        async for stats in get_collection("system_stats").find({"date": {"$exists": True}}):
+            summary = summarize([flatten_sample(stats)])
+            operations.append(UpdateOne(
+                {"start": datetime.strptime(stats["date"], "%Y-%m-%d")},
+                {"$setOnInsert": {**summary, "updated_at": stats.get("timestamp") or datetime.utcnow()}},
+                upsert=True
+            ))
+        if operations:
+            await daily_collection.bulk_write(operations, ordered=False)
+        
+        await get_collection("system_stats").drop()
+        logger.info(f"Converted {len(operations)} daily system_stats documents")
+    
+    async def down(self):
+        """بازسازی اسناد روزانه system_stats از میانگین روزانه"""
+        stats_collection = get_collection("system_stats")
+        
+        async for day in get_collection(RESOLUTION_COLLECTIONS["1d"]).find({}):
+            stats = {"date": day["start"].date().isoformat(), "timestamp": day.get("updated_at") or day["start"]}
+            for name, (section, field) in STATS_METRICS.items():
+                if name in day.get("metrics", {}):
+                    stats.setdefault(section, {})[field] = day["metrics"][name]["avg"]
+            await stats_collection.replace_one({"date": stats["date"]}, stats, upsert=True)
+        
+        logger.info("Stats series migration rolled back successfully")
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
 from bson import ObjectId
+from app.core.indexes import KEYWORD_INDEXES
 from .tweet import PyObjectId
 
 
@@ -14,6 +15,8 @@ class KeywordBase(BaseModel):
     max_tweets_per_request: int = 100
     tags: List[str] = []
     extraction_frequency: int = 60  # زمان بین استخراج‌ها به دقیقه
+    retention_days: Optional[int] = None  # مدت نگهداری توییت‌ها (None: پیش‌فرض سیستم، 0: دائمی)
+    retention_min_importance: Optional[float] = None  # توییت‌های با امتیاز بیشتر یا مساوی حذف نمی‌شوند
 
 
 class KeywordInDB(KeywordBase):
@@ -38,6 +41,8 @@ class KeywordInDB(KeywordBase):
                 "max_tweets_per_request": 100,
                 "tags": ["internet", "filtering"],
                 "extraction_frequency": 60,
+                "retention_days": None,
+                "retention_min_importance": None,
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
                 "total_tweets": 0,
@@ -60,15 +65,10 @@ class KeywordUpdate(BaseModel):
     max_tweets_per_request: Optional[int] = None
     tags: Optional[List[str]] = None
     extraction_frequency: Optional[int] = None
+    retention_days: Optional[int] = None
+    retention_min_importance: Optional[float] = None
 
 
-def create_keyword_indexes(db):
+async def create_keyword_indexes(db):
     """ایجاد ایندکس‌های کالکشن کلمات کلیدی"""
-    db["keywords"].create_index("keyword", unique=True)
-    db["keywords"].create_index("is_active")
-    db["keywords"].create_index("priority")
-    db["keywords"].create_index("last_extracted_at")
-    
-    # ایندکس‌های ترکیبی برای جستجوهای رایج
-    db["keywords"].create_index([("is_active", 1), ("priority", 1)])
-    db["keywords"].create_index([("tags", 1), ("is_active", 1)])
+    await db["keywords"].create_indexes(KEYWORD_INDEXES)
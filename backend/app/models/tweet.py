@@ -3,6 +3,8 @@ from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 from bson import ObjectId
 
+from app.core.indexes import TWEET_INDEXES
+
 
 class PyObjectId(ObjectId):
     """کلاس کمکی برای تبدیل ObjectId به رشته و بالعکس"""
@@ -29,10 +31,8 @@ class TweetBase(BaseModel):
     lang: str
     user_id: str
     user_screen_name: str
-    user_name: str
     user_verified: bool
-    user_followers_count: int
-    user_friends_count: int
+    user_followers_count: int  # تعداد فالوئر در زمان مشاهده (فیلد فرمول امتیاز)؛ پروفایل کامل در کالکشن users
     retweet_count: int
     favorite_count: int
     quote_count: Optional[int] = 0
@@ -51,6 +51,8 @@ class TweetBase(BaseModel):
     retweeted_status_id: Optional[str] = None
     raw_data: Dict[str, Any] = {}  # ذخیره داده‌های خام توییت
     keywords: List[str] = []  # کلمات کلیدی که باعث استخراج این توییت شده‌اند
+    search_tokens: List[str] = []  # توکن‌های نرمال شده متن برای جستجو
+    entity_keys: List[str] = []  # کلیدهای نرمال شده type:value هشتگ‌ها، منشن‌ها و لینک‌ها
 
 
 class TweetInDB(TweetBase):
@@ -58,12 +60,20 @@ class TweetInDB(TweetBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     created_in_db: datetime = Field(default_factory=datetime.utcnow)
     updated_in_db: datetime = Field(default_factory=datetime.utcnow)
-    is_processed: bool = False
+    pending_enrichment: List[str] = []  # مراحل غنی‌سازی باقی مانده
+    enriched: Dict[str, Any] = {}  # نسخه و زمان (یا خطای) هر مرحله غنی‌سازی انجام شده
     importance_score: float = 0.0  # امتیاز اهمیت توییت
+    score_version: Optional[str] = None  # نسخه فرمول امتیاز اهمیت
     sentiment_score: Optional[float] = None  # نتیجه تحلیل احساسات
     sentiment_label: Optional[str] = None  # برچسب احساسات (مثبت، منفی، خنثی)
     topics: List[str] = []  # موضوعات استخراج شده از توییت
     is_sensitive: bool = False  # پرچم محتوای حساس
+    cluster_id: Optional[str] = None  # شناسه توییت اصلی خوشه تکراری‌ها
+    is_duplicate: bool = False  # نسخه تقریباً تکراری از توییت اصلی خوشه
+    duplicate_count: int = 0  # تعداد نسخه‌های تکراری (فقط روی توییت اصلی)
+    velocity: float = 0.0  # سرعت تعامل (تعامل در ساعت، میانگین نمایی)
+    velocity_score: float = 0.0  # امتیاز 0 تا 100 سرعت تعامل
+    engagement_observed_at: Optional[datetime] = None  # زمان آخرین مشاهده شمارنده‌ها
 
     class Config:
         allow_population_by_field_name = True
@@ -78,32 +88,20 @@ class TweetInDB(TweetBase):
                 "lang": "fa",
                 "user_id": "2244994945",
                 "user_screen_name": "username",
-                "user_name": "User Name",
                 "user_verified": False,
                 "user_followers_count": 1000,
-                "user_friends_count": 500,
                 "retweet_count": 10,
                 "favorite_count": 20,
                 "hashtags": ["sample", "test"],
                 "keywords": ["sample"],
                 "created_in_db": datetime.utcnow(),
                 "updated_in_db": datetime.utcnow(),
-                "is_processed": False,
+                "pending_enrichment": ["sentiment"],
                 "importance_score": 0.5
             }
         }
 
 
-def create_tweet_indexes(db):
+async def create_tweet_indexes(db):
     """ایجاد ایندکس‌های کالکشن توییت‌ها"""
-    db["tweets"].create_index("tweet_id", unique=True)
-    db["tweets"].create_index("created_at")
-    db["tweets"].create_index("keywords")
-    db["tweets"].create_index("user_id")
-    db["tweets"].create_index("importance_score")
-    db["tweets"].create_index([("text", "text")], default_language="none")  # ایندکس متنی برای جستجو
-    
-    # ایندکس‌های ترکیبی برای جستجوهای رایج
-    db["tweets"].create_index([("created_at", -1), ("importance_score", -1)])
-    db["tweets"].create_index([("user_screen_name", 1), ("created_at", -1)])
-    db["tweets"].create_index([("sentiment_label", 1), ("created_at", -1)])
+    await db["tweets"].create_indexes(TWEET_INDEXES)
@@ -0,0 +1,359 @@
+import os
+import json
+import uuid
+import fcntl
+import asyncio
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import zstandard as zstd
+from bson import json_util
+from bson.json_util import JSONOptions, JSONMode
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.archive")
+
+# فیلدهایی که در آرشیو نگه داشته نمی‌شوند (فقط برای تشخیص تکراری‌ها لازم‌اند)
+ARCHIVE_PROJECTION = {"minhash": 0}
+
+# JSON توسعه‌یافته؛ ObjectId و تاریخ‌ها هنگام خواندن به همان نوع برمی‌گردند
+ARCHIVE_JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=False)
+
+# مبدا زمانی شناسه‌های snowflake توییتر (میلی‌ثانیه)
+TWITTER_EPOCH_MS = 1288834974657
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+DICTIONARY_NAME = "dictionary.zdict"
+
+
+def id_key(tweet_id: str) -> Tuple[int, str]:
+    """کلید مرتب‌سازی شناسه توییت (ترتیب عددی برای شناسه‌های رقمی)"""
+    return len(tweet_id), tweet_id
+
+
+def snowflake_day(tweet_id: str) -> Optional[str]:
+    """روز ایجاد توییت از شناسه snowflake آن (None برای شناسه‌های غیر snowflake)"""
+    if not tweet_id.isdigit() or int(tweet_id) >> 22 == 0:
+        return None
+    timestamp_ms = (int(tweet_id) >> 22) + TWITTER_EPOCH_MS
+    return datetime.utcfromtimestamp(timestamp_ms / 1000).strftime("%Y-%m-%d")
+
+
+class ColdArchive:
+    """
+    آرشیو سرد توییت‌های حذف شده از کالکشن tweets در فایل‌های محلی
+
+    - هر روز (براساس created_at) یک پوشه با manifest.json و سگمنت‌های NDJSON فشرده با zstd دارد
+    - توییت‌های هر سگمنت به ترتیب tweet_id در بلوک‌های ARCHIVE_BLOCK_SIZE تایی، هر بلوک یک فریم
+      مستقل zstd، نوشته می‌شوند؛ ایندکس پراکنده (.idx) اولین tweet_id و محل هر فریم را نگه می‌دارد
+      و خواندن یک توییت فقط یک فریم را از حالت فشرده خارج می‌کند
+    - برای هر روز یک دیکشنری zstd از نمونه اسناد آموزش داده می‌شود که فشرده‌سازی اسناد کوچک را بهبود می‌دهد
+    - فایل‌ها ابتدا موقت نوشته و سپس جایگزین می‌شوند؛ manifest آخر از همه و زیر قفل فایل روز
+      به‌روزرسانی می‌شود و نام سگمنت‌ها (زمان + uuid) بین پردازه‌ها یکتاست
+    - وقتی تعداد سگمنت‌های کوچک یک روز به ARCHIVE_MAX_SMALL_SEGMENTS برسد، نوشتن بعدی آن‌ها را با
+      دسته جدید در یک سگمنت ادغام می‌کند تا تعداد سگمنت‌هایی که lookup بررسی می‌کند محدود بماند
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.ARCHIVE_PATH
+        self._manifests: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._indexes: "OrderedDict[str, List[List[Any]]]" = OrderedDict()
+        self._dictionaries: "OrderedDict[str, zstd.ZstdCompressionDict]" = OrderedDict()
+
+    def _day_path(self, day: str, name: str = "") -> str:
+        return os.path.join(self.root, day, name)
+
+    @staticmethod
+    def _remember(cache: "OrderedDict[str, Any]", key: str, value: Any) -> None:
+        """افزودن به کش LRU با سقف ARCHIVE_INDEX_CACHE_SIZE"""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > settings.ARCHIVE_INDEX_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    @contextmanager
+    def _locked(self, day: str) -> Iterator[None]:
+        """قفل انحصاری فایل روز برای خواندن-تغییر-نوشتن manifest بین پردازه‌ها"""
+        with open(self._day_path(day, LOCK_NAME), "a") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        """نوشتن اتمیک فایل"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+    def _manifest(self, day: str) -> Dict[str, Any]:
+        """manifest یک روز (با کش براساس زمان تغییر فایل)"""
+        path = self._day_path(day, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {"day": day, "dictionary": None, "segments": []}
+
+        cached = self._manifests.get(day)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        self._manifests[day] = (mtime, manifest)
+        return manifest
+
+    def _dictionary(self, day: str, samples: Optional[List[bytes]] = None) -> Optional[zstd.ZstdCompressionDict]:
+        """
+        دیکشنری zstd یک روز؛ در صورت نبود و وجود نمونه کافی آموزش داده و ذخیره می‌شود
+        """
+        if day in self._dictionaries:
+            self._dictionaries.move_to_end(day)
+            return self._dictionaries[day]
+
+        path = self._day_path(day, DICTIONARY_NAME)
+        if os.path.exists(path):
+            with open(path, "rb") as handle:
+                self._remember(self._dictionaries, day, zstd.ZstdCompressionDict(handle.read()))
+            return self._dictionaries[day]
+
+        if not samples or len(samples) < settings.ARCHIVE_DICT_MIN_SAMPLES:
+            return None
+
+        try:
+            dictionary = zstd.train_dictionary(settings.ARCHIVE_DICT_SIZE, samples)
+        except zstd.ZstdError as e:
+            logger.warning(f"Could not train archive dictionary for {day}: {e}")
+            return None
+
+        self._write_file(path, dictionary.as_bytes())
+        self._remember(self._dictionaries, day, dictionary)
+        return dictionary
+
+    def write(self, tweets: List[Dict[str, Any]]) -> int:
+        """
+        نوشتن توییت‌ها در سگمنت‌های جدید (یک سگمنت برای هر روز)
+
+        Returns:
+            int: تعداد توییت‌های آرشیو شده
+        """
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for tweet in tweets:
+            created_at = tweet.get("created_at")
+            day = created_at.strftime("%Y-%m-%d") if created_at else snowflake_day(tweet["tweet_id"]) or "unknown"
+            by_day.setdefault(day, []).append(tweet)
+
+        for day, day_tweets in by_day.items():
+            self._write_segment(day, day_tweets)
+        return len(tweets)
+
+    def _write_segment(self, day: str, tweets: List[Dict[str, Any]]) -> None:
+        os.makedirs(self._day_path(day), exist_ok=True)
+
+        with self._locked(day):
+            manifest = self._manifest(day)
+            small = [
+                segment for segment in manifest["segments"]
+                if segment["count"] < settings.ARCHIVE_SMALL_SEGMENT_TWEETS
+            ]
+            merged = small if len(small) >= settings.ARCHIVE_MAX_SMALL_SEGMENTS else []
+            for segment in merged:
+                tweets = tweets + self._segment_tweets(day, segment)
+
+            tweets = sorted(tweets, key=lambda tweet: id_key(tweet["tweet_id"]))
+            lines = [
+                json_util.dumps(tweet, json_options=ARCHIVE_JSON_OPTIONS).encode("utf-8") + b"\n"
+                for tweet in tweets
+            ]
+
+            dictionary = self._dictionary(day, lines)
+            compressor = zstd.ZstdCompressor(level=settings.ARCHIVE_COMPRESSION_LEVEL, dict_data=dictionary)
+
+            frames = []
+            index = []
+            offset = 0
+            for start in range(0, len(lines), settings.ARCHIVE_BLOCK_SIZE):
+                frame = compressor.compress(b"".join(lines[start:start + settings.ARCHIVE_BLOCK_SIZE]))
+                index.append([tweets[start]["tweet_id"], offset, len(frame)])
+                frames.append(frame)
+                offset += len(frame)
+
+            name = f"segment-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+            self._write_file(self._day_path(day, f"{name}.ndjson.zst"), b"".join(frames))
+            self._write_file(self._day_path(day, f"{name}.idx"), json.dumps(index).encode("utf-8"))
+
+            merged_names = {segment["name"] for segment in merged}
+            manifest = {
+                **manifest,
+                "dictionary": DICTIONARY_NAME if dictionary is not None else manifest["dictionary"],
+                "segments": [
+                    segment for segment in manifest["segments"] if segment["name"] not in merged_names
+                ] + [{
+                    "name": name,
+                    "count": len(tweets),
+                    "min_id": tweets[0]["tweet_id"],
+                    "max_id": tweets[-1]["tweet_id"],
+                    "bytes": offset,
+                    "raw_bytes": sum(len(line) for line in lines),
+                    "dictionary": dictionary is not None,
+                    "created_at": datetime.utcnow().isoformat()
+                }]
+            }
+            self._write_file(
+                self._day_path(day, MANIFEST_NAME),
+                json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+            )
+
+            # فایل‌های سگمنت‌های ادغام شده پس از به‌روزرسانی manifest حذف می‌شوند
+            for segment_name in merged_names:
+                for suffix in (".ndjson.zst", ".idx"):
+                    path = self._day_path(day, f"{segment_name}{suffix}")
+                    self._indexes.pop(path, None)
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+        if merged:
+            logger.info(f"Merged {len(merged)} small archive segments of {day} into {name}")
+        logger.info(f"Archived {len(tweets)} tweets to {day}/{name} ({offset} bytes)")
+
+    def _segment_tweets(self, day: str, segment: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """خواندن همه توییت‌های یک سگمنت (برای ادغام سگمنت‌های کوچک)"""
+        dictionary = self._dictionary(day) if segment["dictionary"] else None
+        decompressor = zstd.ZstdDecompressor(dict_data=dictionary)
+
+        tweets = []
+        with open(self._day_path(day, f"{segment['name']}.ndjson.zst"), "rb") as handle:
+            for _, offset, length in self._index(day, segment):
+                handle.seek(offset)
+                block = decompressor.decompress(handle.read(length))
+                tweets.extend(
+                    json_util.loads(line, json_options=ARCHIVE_JSON_OPTIONS) for line in block.splitlines() if line
+                )
+        return tweets
+
+    def _index(self, day: str, segment: Dict[str, Any]) -> List[List[Any]]:
+        """ایندکس پراکنده یک سگمنت (با کش LRU)"""
+        index_path = self._day_path(day, f"{segment['name']}.idx")
+        index = self._indexes.get(index_path)
+        if index is not None:
+            self._indexes.move_to_end(index_path)
+            return index
+
+        with open(index_path, encoding="utf-8") as handle:
+            index = json.load(handle)
+        self._remember(self._indexes, index_path, index)
+        return index
+
+    def _days(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (entry for entry in os.listdir(self.root) if os.path.exists(self._day_path(entry, MANIFEST_NAME))),
+            reverse=True
+        )
+
+    def lookup(self, tweet_id: str) -> Optional[Dict[str, Any]]:
+        """
+        جستجوی یک توییت در آرشیو
+
+        ابتدا روز حاصل از شناسه snowflake و سپس سایر روزها بررسی می‌شوند.
+
+        Returns:
+            dict: سند توییت یا None
+        """
+        key = id_key(tweet_id)
+        guessed_day = snowflake_day(tweet_id)
+        days = self._days()
+        if guessed_day in days:
+            days.remove(guessed_day)
+            days.insert(0, guessed_day)
+
+        for day in days:
+            manifest = self._manifest(day)
+            for segment in manifest["segments"]:
+                if id_key(segment["min_id"]) <= key <= id_key(segment["max_id"]):
+                    try:
+                        tweet = self._read(day, segment, tweet_id)
+                    except FileNotFoundError:
+                        # سگمنت در همین لحظه ادغام و حذف شده است؛ manifest جدید دوباره خوانده می‌شود
+                        return self._read_latest(day, tweet_id)
+                    if tweet is not None:
+                        return tweet
+        return None
+
+    def _read_latest(self, day: str, tweet_id: str) -> Optional[Dict[str, Any]]:
+        """جستجوی توییت در سگمنت‌های فعلی یک روز زیر قفل manifest"""
+        key = id_key(tweet_id)
+        with self._locked(day):
+            for segment in self._manifest(day)["segments"]:
+                if id_key(segment["min_id"]) <= key <= id_key(segment["max_id"]):
+                    tweet = self._read(day, segment, tweet_id)
+                    if tweet is not None:
+                        return tweet
+        return None
+
+    def _read(self, day: str, segment: Dict[str, Any], tweet_id: str) -> Optional[Dict[str, Any]]:
+        """خواندن فریم شامل توییت با ایندکس پراکنده سگمنت"""
+        index = self._index(day, segment)
+        position = bisect_right([id_key(entry[0]) for entry in index], id_key(tweet_id)) - 1
+        if position < 0:
+            return None
+        _, offset, length = index[position]
+
+        with open(self._day_path(day, f"{segment['name']}.ndjson.zst"), "rb") as handle:
+            handle.seek(offset)
+            frame = handle.read(length)
+
+        dictionary = self._dictionary(day) if segment["dictionary"] else None
+        block = zstd.ZstdDecompressor(dict_data=dictionary).decompress(frame)
+
+        needle = f'"tweet_id": "{tweet_id}"'.encode("utf-8")
+        for line in block.splitlines():
+            if needle in line:
+                return json_util.loads(line, json_options=ARCHIVE_JSON_OPTIONS)
+        return None
+
+    async def archive(self, tweets: List[Dict[str, Any]]) -> int:
+        """نوشتن توییت‌ها در آرشیو بدون مسدود کردن event loop"""
+        if not tweets:
+            return 0
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.write, tweets)
+
+    async def find(self, tweet_id: str) -> Optional[Dict[str, Any]]:
+        """جستجوی توییت در آرشیو بدون مسدود کردن event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.lookup, tweet_id)
+
+    def status(self) -> Dict[str, Any]:
+        """آمار آرشیو: تعداد روزها، سگمنت‌ها، اسناد و نسبت فشرده‌سازی"""
+        days = self._days()
+        segments = [segment for day in days for segment in self._manifest(day)["segments"]]
+        stored = sum(segment["bytes"] for segment in segments)
+        raw = sum(segment["raw_bytes"] for segment in segments)
+        return {
+            "enabled": settings.ARCHIVE_ENABLED,
+            "days": len(days),
+            "oldest_day": days[-1] if days else None,
+            "segments": len(segments),
+            "tweets": sum(segment["count"] for segment in segments),
+            "bytes": stored,
+            "compression_ratio": round(raw / stored, 2) if stored else None
+        }
+
+
+# نمونه سینگلتون
+cold_archive = ColdArchive()
@@ -0,0 +1,166 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.compaction")
+
+MB = 1024 * 1024
+
+# کلید فضای قابل استفاده مجدد در آمار WiredTiger
+REUSABLE_BYTES = "file bytes available for reuse"
+
+
+def reclaimable_space(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    فضای قابل بازپس‌گیری یک کالکشن و ایندکس‌های آن از خروجی collStats
+
+    Args:
+        stats: خروجی collStats با indexDetails
+
+    Returns:
+        dict: فضای قابل بازپس‌گیری داده و ایندکس‌ها، حجم ذخیره‌سازی و نسبت آنها
+    """
+    collection_bytes = stats.get("wiredTiger", {}).get("block-manager", {}).get(REUSABLE_BYTES, 0)
+    index_bytes = {
+        name: details.get("block-manager", {}).get(REUSABLE_BYTES, 0)
+        for name, details in (stats.get("indexDetails") or {}).items()
+    }
+    storage = stats.get("storageSize", 0) + stats.get("totalIndexSize", 0)
+    reclaimable = collection_bytes + sum(index_bytes.values())
+
+    return {
+        "collection": stats.get("ns", "").split(".", 1)[-1],
+        "storage_bytes": storage,
+        "reclaimable_bytes": reclaimable,
+        "collection_reclaimable_bytes": collection_bytes,
+        "index_reclaimable_bytes": index_bytes,
+        "reclaimable_ratio": round(reclaimable / storage, 4) if storage else 0.0
+    }
+
+
+def plan_compaction(spaces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    انتخاب کالکشن‌هایی که ارزش compact دارند
+
+    کالکشن‌هایی انتخاب می‌شوند که هم حجم و هم نسبت فضای قابل بازپس‌گیری آنها از آستانه بیشتر باشد؛
+    به ترتیب نزولی فضای قابل بازپس‌گیری.
+    """
+    candidates = [
+        space for space in spaces
+        if space["reclaimable_bytes"] >= settings.COMPACTION_MIN_RECLAIMABLE_MB * MB
+        and space["reclaimable_ratio"] >= settings.COMPACTION_MIN_RECLAIMABLE_RATIO
+        and space["collection"] not in settings.COMPACTION_EXCLUDED_COLLECTIONS
+    ]
+    return sorted(candidates, key=lambda space: space["reclaimable_bytes"], reverse=True)
+
+
+def in_maintenance_window(now: datetime, start_hour: int, end_hour: int) -> bool:
+    """آیا ساعت (UTC) در پنجره نگهداری است (پنجره می‌تواند از نیمه‌شب عبور کند)"""
+    if start_hour == end_hour:
+        return True
+    if start_hour < end_hour:
+        return start_hour <= now.hour < end_hour
+    return now.hour >= start_hour or now.hour < end_hour
+
+
+class CompactionPlanner:
+    """
+    اجرای compact فقط برای کالکشن‌های دارای فضای هدر رفته
+
+    compact عملیات روی کالکشن را مسدود می‌کند؛ پس کالکشن‌ها یکی یکی و فقط در پنجره نگهداری
+    (COMPACTION_WINDOW_START_HOUR تا COMPACTION_WINDOW_END_HOUR به UTC) فشرده می‌شوند
+    و نتیجه هر اجرا در کالکشن compaction_history ثبت می‌شود.
+    """
+
+    async def _stats(self, collection_name: str) -> Dict[str, Any]:
+        database = get_collection(collection_name).database
+        return await database.command("collStats", collection_name, indexDetails=True)
+
+    async def measure(self) -> List[Dict[str, Any]]:
+        """
+        فضای قابل بازپس‌گیری همه کالکشن‌ها
+
+        Returns:
+            list: خروجی reclaimable_space هر کالکشن
+        """
+        database = get_collection("tweets").database
+        spaces = []
+        for collection_name in await database.list_collection_names():
+            try:
+                spaces.append(reclaimable_space(await self._stats(collection_name)))
+            except Exception as e:
+                logger.warning(f"Failed to read collStats of {collection_name}: {e}")
+        return spaces
+
+    async def plan(self) -> List[Dict[str, Any]]:
+        """کالکشن‌های نامزد compact بدون اجرای آن"""
+        return plan_compaction(await self.measure())
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        compact کالکشن‌های نامزد در پنجره نگهداری
+
+        Returns:
+            dict: کالکشن‌های فشرده شده و فضای بازپس‌گرفته شده
+        """
+        now = now or datetime.utcnow()
+        window = (settings.COMPACTION_WINDOW_START_HOUR, settings.COMPACTION_WINDOW_END_HOUR)
+        if not in_maintenance_window(now, *window):
+            return {"skipped": "outside maintenance window", "compacted": []}
+
+        database = get_collection("tweets").database
+        history_collection = get_collection("compaction_history")
+        compacted = []
+
+        for candidate in await self.plan():
+            # پنجره پیش از شروع هر کالکشن دوباره بررسی می‌شود
+            if not in_maintenance_window(datetime.utcnow(), *window):
+                logger.info("Maintenance window ended; remaining collections deferred")
+                break
+
+            collection_name = candidate["collection"]
+            record = {
+                "collection": collection_name,
+                "started_at": datetime.utcnow(),
+                "storage_bytes_before": candidate["storage_bytes"],
+                "reclaimable_bytes": candidate["reclaimable_bytes"],
+            }
+            started = time.monotonic()
+            try:
+                result = await database.command({"compact": collection_name})
+                after = reclaimable_space(await self._stats(collection_name))
+                record.update({
+                    "storage_bytes_after": after["storage_bytes"],
+                    "reclaimed_bytes": candidate["storage_bytes"] - after["storage_bytes"],
+                    "bytes_freed": result.get("bytesFreed"),
+                })
+                logger.info(
+                    f"Compacted collection {collection_name}: reclaimed "
+                    f"{record['reclaimed_bytes'] / MB:.1f} MB of {candidate['reclaimable_bytes'] / MB:.1f} MB reusable"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to compact collection {collection_name}: {e}")
+                record["error"] = str(e)
+
+            record["finished_at"] = datetime.utcnow()
+            record["duration_seconds"] = round(time.monotonic() - started, 2)
+            await history_collection.insert_one(dict(record))
+            compacted.append(record)
+
+        return {
+            "compacted": compacted,
+            "reclaimed_bytes": sum(record.get("reclaimed_bytes", 0) for record in compacted)
+        }
+
+    async def history(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """آخرین اجراهای compact"""
+        cursor = get_collection("compaction_history").find({}, {"_id": 0}).sort("started_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+# نمونه سینگلتون
+compaction_planner = CompactionPlanner()
@@ -0,0 +1,150 @@
+import time
+import struct
+import hashlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# عدد اول مرسن برای هش‌های جهانی (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _token_hash(token: str) -> int:
+    """هش پایدار توکن (hash داخلی پایتون برای رشته‌ها در هر پروسه متفاوت است)"""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _permutations(num_perm: int) -> List[Tuple[int, int]]:
+    """ضرایب ثابت و قطعی جایگشت‌ها تا امضاها بین پروسه‌ها و اجراها قابل مقایسه باشند"""
+    permutations = []
+    for index in range(num_perm):
+        seed = hashlib.blake2b(f"minhash-{index}".encode(), digest_size=16).digest()
+        a = int.from_bytes(seed[:8], "big") % (_PRIME - 1) + 1
+        b = int.from_bytes(seed[8:], "big") % _PRIME
+        permutations.append((a, b))
+    return permutations
+
+
+class MinHasher:
+    """محاسبه امضای MinHash برای مجموعه توکن‌ها"""
+
+    def __init__(self, num_perm: int = 64):
+        self.num_perm = num_perm
+        self._permutations = _permutations(num_perm)
+
+    def signature(self, tokens: List[str]) -> Tuple[int, ...]:
+        """
+        امضای MinHash توکن‌های یکتا
+
+        Args:
+            tokens: توکن‌های نرمال شده
+
+        Returns:
+            tuple: num_perm مقدار 32 بیتی
+        """
+        hashes = [_token_hash(token) for token in set(tokens)]
+        return tuple(
+            min(((a * value + b) % _PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self._permutations
+        )
+
+    def pack(self, signature: Tuple[int, ...]) -> bytes:
+        """تبدیل امضا به باینری فشرده برای ذخیره در MongoDB"""
+        return struct.pack(f">{self.num_perm}I", *signature)
+
+    def unpack(self, data: bytes) -> Tuple[int, ...]:
+        """بازیابی امضا از باینری ذخیره شده"""
+        return struct.unpack(f">{self.num_perm}I", bytes(data))
+
+
+def estimate_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """تخمین شباهت Jaccard از روی نسبت مقادیر برابر دو امضا"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    ایندکس درون حافظه امضاهای MinHash پنجره اخیر با باندبندی LSH
+
+    امضا به bands باند تقسیم می‌شود؛ توییت‌هایی که حداقل در یک باند یکسان باشند کاندید هستند
+    و شباهت تخمینی آنها با threshold مقایسه می‌شود.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.7,
+                 window_seconds: float = 86400, max_size: int = 200000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._buckets: List[Dict[int, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        # tweet_id -> (امضا، شناسه خوشه، زمان افزودن) به ترتیب افزودن
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, ...], str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[int]:
+        return [hash(signature[band * self._rows:(band + 1) * self._rows]) for band in range(self._bands)]
+
+    def get(self, tweet_id: str) -> Optional[Tuple[Tuple[int, ...], str, float]]:
+        """دریافت اطلاعات یک توییت ثبت شده"""
+        return self._entries.get(tweet_id)
+
+    def find(self, signature: Tuple[int, ...]) -> Optional[Tuple[str, str, float]]:
+        """
+        جستجوی مشابه‌ترین امضا در پنجره اخیر
+
+        Returns:
+            tuple: (شناسه توییت، شناسه خوشه، شباهت تخمینی) یا None
+        """
+        self._evict()
+
+        best: Optional[Tuple[str, str, float]] = None
+        seen = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            for tweet_id in self._buckets[band].get(key, ()):
+                if tweet_id in seen:
+                    continue
+                seen.add(tweet_id)
+
+                candidate, cluster_id, _ = self._entries[tweet_id]
+                similarity = estimate_similarity(signature, candidate)
+                if similarity >= self.threshold and (best is None or similarity > best[2]):
+                    best = (tweet_id, cluster_id, similarity)
+        return best
+
+    def add(self, tweet_id: str, signature: Tuple[int, ...], cluster_id: str, added_at: Optional[float] = None) -> None:
+        """افزودن امضا به ایندکس"""
+        if tweet_id in self._entries:
+            return
+
+        self._entries[tweet_id] = (signature, cluster_id, added_at or time.time())
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(tweet_id)
+        self._evict()
+
+    def _remove(self, tweet_id: str, signature: Tuple[int, ...]) -> None:
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(tweet_id)
+            except ValueError:
+                pass
+            if not bucket:
+                del self._buckets[band][key]
+
+    def _evict(self) -> None:
+        """حذف امضاهای خارج از پنجره زمانی یا مازاد بر سقف"""
+        cutoff = time.time() - self.window_seconds
+        while self._entries:
+            tweet_id, (signature, _, added_at) = next(iter(self._entries.items()))
+            if added_at >= cutoff and len(self._entries) <= self.max_size:
+                break
+            self._entries.popitem(last=False)
+            self._remove(tweet_id, signature)
@@ -0,0 +1,174 @@
+import math
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.engagement")
+
+# شمارنده‌های تعامل توییت و نام آرایه متناظر در سند تاریخچه
+ENGAGEMENT_FIELDS = {
+    "retweet_count": "retweets",
+    "favorite_count": "favorites",
+    "reply_count": "replies",
+    "quote_count": "quotes",
+}
+
+
+def engagement_total(counts: Dict[str, Any]) -> int:
+    """مجموع تعاملات یک توییت"""
+    return sum(int(counts.get(field) or 0) for field in ENGAGEMENT_FIELDS)
+
+
+def velocity_score(velocity: float) -> float:
+    """
+    تبدیل سرعت تعامل (تعامل در ساعت) به امتیاز 0 تا 100 با مقیاس لگاریتمی
+
+    سرعت VELOCITY_SCORE_SCALE تعامل در ساعت امتیاز 100 می‌گیرد.
+    """
+    if velocity <= 0:
+        return 0.0
+    score = math.log1p(velocity) / math.log1p(settings.VELOCITY_SCORE_SCALE) * 100
+    return round(min(score, 100.0), 2)
+
+
+def initial_velocity_fields(tweet: Dict[str, Any], observed_at: datetime) -> Dict[str, Any]:
+    """
+    سرعت اولیه توییت جدید: تعاملات فعلی تقسیم بر سن توییت
+
+    Returns:
+        dict: فیلدهای velocity، velocity_score و engagement_observed_at
+    """
+    created_at = tweet.get("created_at") or observed_at
+    age_hours = max((observed_at - created_at).total_seconds() / 3600, 1 / 60)
+    velocity = engagement_total(tweet) / age_hours
+
+    return {
+        "velocity": round(velocity, 3),
+        "velocity_score": velocity_score(velocity),
+        "engagement_observed_at": observed_at,
+    }
+
+
+def updated_velocity_fields(previous: Dict[str, Any], counts: Dict[str, Any], observed_at: datetime) -> Dict[str, Any]:
+    """
+    سرعت تعامل پس از به‌روزرسانی آمار، با میانگین نمایی نسبت به سرعت قبلی
+
+    Args:
+        previous: سند فعلی توییت (شمارنده‌ها و زمان مشاهده قبلی)
+        counts: شمارنده‌های جدید
+        observed_at: زمان مشاهده جدید
+
+    Returns:
+        dict: فیلدهای velocity، velocity_score و engagement_observed_at
+    """
+    last_observed = (
+        previous.get("engagement_observed_at")
+        or previous.get("updated_in_db")
+        or previous.get("created_at")
+        or observed_at
+    )
+    elapsed_hours = max((observed_at - last_observed).total_seconds() / 3600, 1 / 60)
+    instant = max(engagement_total(counts) - engagement_total(previous), 0) / elapsed_hours
+
+    previous_velocity = previous.get("velocity")
+    if previous_velocity is None:
+        velocity = instant
+    else:
+        alpha = settings.VELOCITY_SMOOTHING
+        velocity = alpha * instant + (1 - alpha) * previous_velocity
+
+    return {
+        "velocity": round(velocity, 3),
+        "velocity_score": velocity_score(velocity),
+        "engagement_observed_at": observed_at,
+    }
+
+
+class EngagementHistory:
+    """
+    تاریخچه شمارنده‌های تعامل با الگوی bucket
+
+    هر سند یک توییت در یک روز را با آرایه‌های فشرده زمان و شمارنده‌ها نگه می‌دارد؛
+    وقتی سند به ENGAGEMENT_BUCKET_SIZE نمونه برسد، upsert سند جدیدی برای همان روز می‌سازد.
+    """
+
+    def __init__(self):
+        self._pending: List[UpdateOne] = []
+
+    def queue(self, tweet_id: str, counts: Dict[str, Any], observed_at: Optional[datetime] = None) -> None:
+        """افزودن یک نمونه به صف نوشتن"""
+        observed_at = observed_at or datetime.utcnow()
+        day = observed_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        push = {"ts": observed_at}
+        for field, array_name in ENGAGEMENT_FIELDS.items():
+            push[array_name] = int(counts.get(field) or 0)
+
+        self._pending.append(UpdateOne(
+            {"tweet_id": tweet_id, "day": day, "n": {"$lt": settings.ENGAGEMENT_BUCKET_SIZE}},
+            {
+                "$push": push,
+                "$inc": {"n": 1},
+                "$min": {"first": observed_at},
+                "$max": {"last": observed_at}
+            },
+            upsert=True
+        ))
+
+    async def flush(self) -> int:
+        """
+        نوشتن نمونه‌های صف با یک bulk_write
+
+        Returns:
+            int: تعداد نمونه‌های نوشته شده
+        """
+        if not self._pending:
+            return 0
+
+        operations, self._pending = self._pending, []
+        await get_collection("engagement_history").bulk_write(operations, ordered=True)
+        return len(operations)
+
+    async def get_series(self, tweet_id: str, since: datetime) -> List[Dict[str, Any]]:
+        """
+        دریافت نمونه‌های ثبت شده یک توییت از زمان مشخص
+
+        Returns:
+            list: نمونه‌ها به ترتیب زمان همراه با سرعت هر بازه
+        """
+        cursor = get_collection("engagement_history").find(
+            {"tweet_id": tweet_id, "day": {"$gte": since.replace(hour=0, minute=0, second=0, microsecond=0)}},
+            {"_id": 0, "ts": 1, **{name: 1 for name in ENGAGEMENT_FIELDS.values()}}
+        ).sort("day", 1)
+
+        samples = []
+        async for bucket in cursor:
+            for index, observed_at in enumerate(bucket.get("ts", [])):
+                if observed_at < since:
+                    continue
+                sample = {"observed_at": observed_at}
+                for field, array_name in ENGAGEMENT_FIELDS.items():
+                    sample[field] = bucket[array_name][index]
+                samples.append(sample)
+
+        samples.sort(key=lambda sample: sample["observed_at"])
+
+        previous = None
+        for sample in samples:
+            sample["total"] = engagement_total(sample)
+            if previous is None:
+                sample["velocity"] = None
+            else:
+                hours = max((sample["observed_at"] - previous["observed_at"]).total_seconds() / 3600, 1 / 60)
+                sample["velocity"] = round((sample["total"] - previous["total"]) / hours, 3)
+            previous = sample
+
+        return samples
+
+
+# نمونه سینگلتون
+engagement_history = EngagementHistory()
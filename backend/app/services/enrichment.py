@@ -0,0 +1,300 @@
+import time
+import uuid
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.services.sentiment import sentiment_updates
+
+logger = get_logger("app.services.enrichment")
+
+
+class EnrichmentStage:
+    """
+    کلاس پایه مراحل غنی‌سازی توییت‌ها
+
+    هر مرحله اعلام می‌کند:
+    - name: نام مرحله (کلید پرچم‌های pending_enrichment، enriched و enrichment_leases)
+    - kind: cpu (اجرا در پروسه‌های کارگر) یا io (اجرا در نخ‌ها)
+    - batch_size و concurrency: اندازه دسته و تعداد دسته‌های هم‌زمان در حال پردازش
+    - projection: فیلدهای مورد نیاز پردازشگر
+    - processor: تابع سطح ماژول (قابل pickle) که لیست توییت‌ها را می‌گیرد و برای هر توییت
+      فیلدهای $set یا None (خطا) برمی‌گرداند
+    """
+    name: str = "stage"
+    version: int = 1
+    kind: str = "io"
+    batch_size: int = 500
+    concurrency: int = 1
+    max_attempts: int = 3
+    projection: Dict[str, int] = {}
+    processor: Optional[Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, Any]]]]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+
+class SentimentStage(EnrichmentStage):
+    """تحلیل احساسات با واژگان (sentiment_score و sentiment_label)"""
+    name = "sentiment"
+    kind = "cpu"
+    projection = {"text": 1}
+    processor = staticmethod(sentiment_updates)
+
+    def __init__(self):
+        self.batch_size = settings.SENTIMENT_BATCH_SIZE
+        self.concurrency = settings.SENTIMENT_CONCURRENCY
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SENTIMENT_ENABLED
+
+
+class StageStats:
+    """آمار درون حافظه اجرای یک مرحله در این پروسه"""
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.last_batch_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "throughput_per_second": round(self.processed / self.busy_seconds, 1) if self.busy_seconds else None,
+            "last_batch_at": self.last_batch_at
+        }
+
+
+class EnrichmentRunner:
+    """
+    اجرای مراحل غنی‌سازی روی کالکشن tweets
+
+    - صف هر مرحله: توییت‌هایی که نام مرحله در آرایه pending_enrichment آنها است (هنگام ذخیره تنظیم می‌شود)
+    - اجاره: هر دسته با update_many شرطی روی enrichment_leases.<stage> گرفته می‌شود، پس چند پروسه
+      یا ماشین بدون پردازش تکراری همکاری می‌کنند و اجاره‌های منقضی (کارگر از کار افتاده) دوباره قابل برداشت هستند
+    - فشار معکوس: از هر مرحله حداکثر concurrency دسته هم‌زمان در پول مربوط پردازش می‌شود
+    - خطا: تلاش مجدد تا max_attempts؛ پس از آن مرحله با خطا در enriched.<stage> بسته می‌شود
+    """
+
+    def __init__(self, stages: Optional[List[EnrichmentStage]] = None):
+        self.stages: Dict[str, EnrichmentStage] = {}
+        self.stats: Dict[str, StageStats] = {}
+        self._pools: Dict[str, Executor] = {}
+        for stage in stages or []:
+            self.register(stage)
+
+    def register(self, stage: EnrichmentStage) -> None:
+        """افزودن مرحله"""
+        self.stages[stage.name] = stage
+        self.stats[stage.name] = StageStats()
+
+    def stage_names(self) -> List[str]:
+        """نام مراحل فعال (مقدار اولیه pending_enrichment توییت‌های جدید)"""
+        return [name for name, stage in self.stages.items() if stage.enabled]
+
+    def _pool(self, kind: str) -> Executor:
+        if kind not in self._pools:
+            if kind == "cpu":
+                self._pools[kind] = ProcessPoolExecutor(max_workers=settings.ENRICHMENT_PROCESSES)
+            else:
+                self._pools[kind] = ThreadPoolExecutor(max_workers=settings.ENRICHMENT_THREADS)
+        return self._pools[kind]
+
+    async def claim(self, stage: EnrichmentStage) -> List[Dict[str, Any]]:
+        """
+        اجاره یک دسته از صف مرحله
+
+        Returns:
+            list: توییت‌های اجاره شده توسط این فراخوانی
+        """
+        tweets_collection = get_collection("tweets")
+        lease_field = f"enrichment_leases.{stage.name}"
+        now = datetime.utcnow()
+        available = {
+            "pending_enrichment": stage.name,
+            "$or": [{lease_field: {"$exists": False}}, {f"{lease_field}.until": {"$lt": now}}]
+        }
+
+        candidates = await tweets_collection.find(available, {"_id": 1}).limit(stage.batch_size).to_list(length=stage.batch_size)
+        if not candidates:
+            return []
+
+        owner = uuid.uuid4().hex
+        until = now + timedelta(seconds=settings.ENRICHMENT_LEASE_SECONDS)
+        candidate_ids = [tweet["_id"] for tweet in candidates]
+        await tweets_collection.update_many(
+            {**available, "_id": {"$in": candidate_ids}},
+            {"$set": {lease_field: {"owner": owner, "until": until}}}
+        )
+
+        # خواندن دوباره فقط از میان کاندیدها (با ایندکس _id)؛ اسنادی که کارگر دیگری اجاره کرده حذف می‌شوند
+        projection = {**stage.projection, "_id": 1, f"enrichment_attempts.{stage.name}": 1, lease_field: 1}
+        return await tweets_collection.find(
+            {"_id": {"$in": candidate_ids}, f"{lease_field}.owner": owner}, projection
+        ).to_list(length=stage.batch_size)
+
+    def _results(self, stage: EnrichmentStage, tweets: List[Dict[str, Any]],
+                 updates: List[Optional[Dict[str, Any]]], error: Optional[str]) -> List[UpdateOne]:
+        now = datetime.utcnow()
+        lease_field = f"enrichment_leases.{stage.name}"
+        operations = []
+
+        for tweet, update in zip(tweets, updates):
+            # نتیجه فقط با اجاره خود همین کارگر نوشته می‌شود
+            owner = tweet["enrichment_leases"][stage.name]["owner"]
+            lease_filter = {"_id": tweet["_id"], f"{lease_field}.owner": owner}
+            if update is not None:
+                operations.append(UpdateOne(lease_filter, {
+                    "$set": {**update, f"enriched.{stage.name}": {"version": stage.version, "at": now}},
+                    "$pull": {"pending_enrichment": stage.name},
+                    "$unset": {lease_field: ""}
+                }))
+                continue
+
+            attempts = tweet.get("enrichment_attempts", {}).get(stage.name, 0) + 1
+            change: Dict[str, Any] = {
+                "$set": {f"enrichment_attempts.{stage.name}": attempts},
+                "$unset": {lease_field: ""}
+            }
+            if attempts >= stage.max_attempts:
+                change["$set"][f"enriched.{stage.name}"] = {"version": stage.version, "at": now, "error": error or "failed"}
+                change["$pull"] = {"pending_enrichment": stage.name}
+            operations.append(UpdateOne(lease_filter, change))
+
+        return operations
+
+    async def _process(self, stage: EnrichmentStage, tweets: List[Dict[str, Any]]) -> None:
+        """پردازش یک دسته اجاره شده در پول مرحله و نوشتن نتایج"""
+        stats = self.stats[stage.name]
+        started = time.perf_counter()
+        error = None
+
+        payload = [
+            {key: value for key, value in tweet.items() if key not in ("_id", "enrichment_leases", "enrichment_attempts")}
+            for tweet in tweets
+        ]
+        try:
+            loop = asyncio.get_running_loop()
+            updates = await loop.run_in_executor(self._pool(stage.kind), stage.processor, payload)
+        except Exception as e:
+            logger.error(f"Enrichment stage {stage.name} failed on a batch of {len(tweets)}: {e}")
+            updates = [None] * len(tweets)
+            error = str(e)
+
+        await get_collection("tweets").bulk_write(self._results(stage, tweets, updates, error), ordered=False)
+
+        failed = sum(1 for update in updates if update is None)
+        stats.processed += len(tweets) - failed
+        stats.failed += failed
+        stats.batches += 1
+        stats.busy_seconds += time.perf_counter() - started
+        stats.last_batch_at = datetime.utcnow()
+
+    async def run_stage(self, stage: EnrichmentStage, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        پردازش صف یک مرحله تا خالی شدن یا رسیدن به max_batches
+
+        Returns:
+            dict: تعداد دسته‌ها و توییت‌های پردازش شده در این اجرا
+        """
+        slots = asyncio.Semaphore(stage.concurrency)
+        tasks = []
+        batches = 0
+        claimed = 0
+
+        async def process(tweets: List[Dict[str, Any]]) -> None:
+            try:
+                await self._process(stage, tweets)
+            finally:
+                slots.release()
+
+        while max_batches is None or batches < max_batches:
+            # دسته بعدی فقط پس از آزاد شدن یک جای خالی اجاره می‌شود
+            await slots.acquire()
+            tweets = await self.claim(stage)
+            if not tweets:
+                slots.release()
+                break
+            tasks.append(asyncio.create_task(process(tweets)))
+            batches += 1
+            claimed += len(tweets)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {"batches": batches, "tweets": claimed}
+
+    async def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        اجرای هم‌زمان همه مراحل فعال
+
+        Returns:
+            dict: نتیجه هر مرحله
+        """
+        stages = [stage for stage in self.stages.values() if stage.enabled]
+        results = await asyncio.gather(
+            *(self.run_stage(stage, max_batches) for stage in stages),
+            return_exceptions=True
+        )
+
+        summary = {}
+        for stage, result in zip(stages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Enrichment stage {stage.name} failed: {result}")
+                summary[stage.name] = {"error": str(result)}
+            else:
+                summary[stage.name] = result
+        return summary
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        وضعیت مراحل: تعداد صف، عمر قدیمی‌ترین توییت صف (lag) و آمار توان عملیاتی این پروسه
+
+        Returns:
+            dict: وضعیت هر مرحله
+        """
+        tweets_collection = get_collection("tweets")
+        now = datetime.utcnow()
+
+        status = {}
+        for name, stage in self.stages.items():
+            pending = await tweets_collection.count_documents({"pending_enrichment": name})
+            oldest = await tweets_collection.find_one(
+                {"pending_enrichment": name}, {"_id": 1}, sort=[("pending_enrichment", 1), ("_id", 1)]
+            )
+            lag = (now - oldest["_id"].generation_time.replace(tzinfo=None)).total_seconds() if oldest else 0.0
+
+            status[name] = {
+                "enabled": stage.enabled,
+                "kind": stage.kind,
+                "batch_size": stage.batch_size,
+                "concurrency": stage.concurrency,
+                "pending": pending,
+                "lag_seconds": round(lag, 1),
+                **self.stats[name].to_dict()
+            }
+        return status
+
+    def shutdown(self) -> None:
+        """بستن پول‌های نخ و پروسه"""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = {}
+
+
+# نمونه سینگلتون
+enrichment_runner = EnrichmentRunner([
+    SentimentStage(),
+])
@@ -0,0 +1,204 @@
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from pymongo import UpdateOne
+
+from app.core.db import get_collection, ANALYTICS_PROFILE
+from app.core.logging import get_logger
+from app.services.text_processing import normalize_text
+
+logger = get_logger("app.services.entities")
+
+ENTITY_TYPES = ("hashtag", "mention", "url")
+
+# سند تجمیعی همه کلمات کلیدی در entity_counts
+ALL_KEYWORDS = "*"
+
+_HASHTAG_RE = re.compile(r"(?<![\w&])#([\w\u200c]+)")
+_MENTION_RE = re.compile(r"(?<![\w@])@(\w{1,15})")
+_URL_RE = re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE)
+
+
+def extract_entities(tweet_data: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    استخراج هشتگ‌ها، منشن‌ها، لینک‌ها و رسانه‌های توییت
+
+    از entities و extended_entities داده خام استفاده می‌شود و در نبود آنها از متن توییت.
+
+    Args:
+        tweet_data: داده‌های خام توییت
+        text: متن کامل توییت
+
+    Returns:
+        dict: hashtags، mentions، urls و media
+    """
+    entities = tweet_data.get("entities") or {}
+    text = text or ""
+
+    if "hashtags" in entities:
+        hashtags = [hashtag["text"] for hashtag in entities["hashtags"] if hashtag.get("text")]
+    else:
+        hashtags = _HASHTAG_RE.findall(text)
+
+    if "user_mentions" in entities:
+        mentions = [
+            {"screen_name": mention["screen_name"], "user_id": str(mention.get("id_str") or mention.get("id") or "")}
+            for mention in entities["user_mentions"] if mention.get("screen_name")
+        ]
+    else:
+        mentions = [{"screen_name": name, "user_id": ""} for name in _MENTION_RE.findall(text)]
+
+    if "urls" in entities:
+        urls = [url.get("expanded_url") or url.get("url") for url in entities["urls"]]
+        urls = [url for url in urls if url]
+    else:
+        urls = [url.rstrip(".,!?؟،)") for url in _URL_RE.findall(text)]
+
+    media_items = (tweet_data.get("extended_entities") or {}).get("media") or entities.get("media") or []
+    media = [
+        {
+            "type": item.get("type", "photo"),
+            "url": item.get("media_url_https") or item.get("media_url") or "",
+            "media_id": str(item.get("id_str") or item.get("id") or "")
+        }
+        for item in media_items
+    ]
+    # لینک‌های رسانه خود توییت جزو لینک‌های خارجی شمرده نمی‌شوند
+    media_links = {item.get("url") for item in media_items}
+    urls = [url for url in urls if url not in media_links]
+
+    return {
+        "hashtags": list(dict.fromkeys(hashtags)),
+        "mentions": list({mention["screen_name"].lower(): mention for mention in mentions}.values()),
+        "urls": list(dict.fromkeys(urls)),
+        "media": media
+    }
+
+
+def normalize_entity(entity_type: str, value: str) -> str:
+    """
+    مقدار نرمال شده موجودیت برای شمارش و جستجو
+
+    - hashtag: بدون # و با نرمال‌سازی متن فارسی
+    - mention: بدون @ و با حروف کوچک
+    - url: بدون پروتکل، www و اسلش انتهایی؛ نام دامنه با حروف کوچک
+    """
+    value = (value or "").strip()
+    if entity_type == "hashtag":
+        return normalize_text(value.lstrip("#")).replace(" ", "")
+    if entity_type == "mention":
+        return value.lstrip("@").lower()
+    if entity_type == "url":
+        value = re.sub(r"^https?://", "", value, flags=re.IGNORECASE)
+        host, _, path = value.partition("/")
+        host = host.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        return f"{host}/{path}".rstrip("/") if path else host
+    raise ValueError(f"Unknown entity type '{entity_type}'")
+
+
+def entity_keys(tweet: Dict[str, Any]) -> List[str]:
+    """
+    کلیدهای type:value نرمال شده موجودیت‌های توییت (فیلد ایندکس شده entity_keys)
+
+    Returns:
+        list: کلیدهای یکتا
+    """
+    values = [("hashtag", hashtag) for hashtag in tweet.get("hashtags", [])]
+    values += [("mention", mention.get("screen_name", "")) for mention in tweet.get("mentions", [])]
+    values += [("url", url) for url in tweet.get("urls", [])]
+
+    keys = []
+    for entity_type, value in values:
+        normalized = normalize_entity(entity_type, value)
+        if normalized:
+            keys.append(f"{entity_type}:{normalized}")
+    return list(dict.fromkeys(keys))
+
+
+def entity_key(entity_type: str, value: str) -> str:
+    """کلید جستجوی یک موجودیت در entity_keys"""
+    return f"{entity_type}:{normalize_entity(entity_type, value)}"
+
+
+class EntityCounter:
+    """
+    شمارنده‌های روزانه موجودیت‌ها در کالکشن entity_counts
+
+    هر سند یک (type, value, day, keyword) است و count آن با $inc افزایش می‌یابد؛ سند keyword="*"
+    مجموع همه کلمات کلیدی است. افزایش‌ها در حافظه تجمیع و در پایان هر دسته ذخیره نوشته می‌شوند.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()
+
+    def record(self, tweet: Dict[str, Any]) -> None:
+        """افزودن موجودیت‌های یک توییت درج شده به شمارنده‌ها"""
+        keys = tweet.get("entity_keys") or []
+        if not keys:
+            return
+
+        created_at = tweet.get("created_at") or datetime.utcnow()
+        day = created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+        keywords = list(tweet.get("keywords") or []) + [ALL_KEYWORDS]
+
+        for key in keys:
+            entity_type, _, value = key.partition(":")
+            for keyword in keywords:
+                self._pending[(entity_type, value, day, keyword)] += 1
+
+    async def flush(self) -> int:
+        """
+        نوشتن افزایش‌های صف با یک bulk_write
+
+        Returns:
+            int: تعداد اسناد به‌روزرسانی شده
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, Counter()
+        operations = [
+            UpdateOne(
+                {"type": entity_type, "keyword": keyword, "day": day, "value": value},
+                {"$inc": {"count": count}},
+                upsert=True
+            )
+            for (entity_type, value, day, keyword), count in pending.items()
+        ]
+        await get_collection("entity_counts").bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def top(self, entity_type: str, keyword: Optional[str] = None, days: int = 1,
+                  limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        پرتکرارترین موجودیت‌های یک نوع در روزهای اخیر
+
+        Args:
+            entity_type: hashtag، mention یا url
+            keyword: کلمه کلیدی (None برای همه)
+            days: تعداد روزهای اخیر (شامل امروز)
+            limit: حداکثر تعداد
+
+        Returns:
+            list: مقدار و تعداد هر موجودیت به ترتیب نزولی
+        """
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        pipeline = [
+            {"$match": {
+                "type": entity_type,
+                "keyword": keyword or ALL_KEYWORDS,
+                "day": {"$gte": today - timedelta(days=days - 1)}
+            }},
+            {"$group": {"_id": "$value", "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit}
+        ]
+        items = await get_collection("entity_counts", ANALYTICS_PROFILE).aggregate(pipeline).to_list(length=limit)
+        return [{"value": item["_id"], "count": item["count"]} for item in items]
+
+
+# نمونه سینگلتون
+entity_counter = EntityCounter()
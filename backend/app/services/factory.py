@@ -2,17 +2,33 @@ from typing import Dict, Any, Union, Type
 from app.core.config import settings
 from app.core.logging import get_logger
 
-# واردسازی سرویس‌های توییتر
-from app.services.twitter_service import twitter_service  # سرویس رسمی با Tweepy
-from app.services.twitter_api_io_service import twitter_api_io_service  # سرویس TwitterAPI.io
-
 logger = get_logger("app.services.factory")
 
+SERVICE_TYPES = ("twitter_api_io", "official")
+
 class TwitterServiceFactory:
-    """فکتوری برای انتخاب سرویس توییتر براساس تنظیمات"""
+    """فکتوری برای انتخاب سرویس توییتر براساس تنظیمات
+    
+    سرویس‌ها در اولین استفاده ساخته می‌شوند؛ وارد کردن این ماژول Tweepy را بارگذاری یا احراز هویت نمی‌کند.
+    """
+    
+    def __init__(self):
+        self._services: Dict[str, Any] = {}
     
     @staticmethod
-    def get_service():
+    def _build(service_type: str):
+        """ساخت سرویس یک نوع (واردسازی ماژول سرویس فقط در این لحظه)"""
+        if service_type == "official":
+            # استفاده از API رسمی توییتر با Tweepy
+            from app.services.twitter_service import TwitterService
+            logger.info("Using official Twitter API with Tweepy")
+            return TwitterService()
+        
+        from app.services.twitter_api_io_service import twitter_api_io_service
+        logger.info("Using TwitterAPI.io service")
+        return twitter_api_io_service
+    
+    def get_service(self):
         """
         دریافت سرویس توییتر مناسب براساس تنظیمات
         
@@ -21,17 +37,14 @@ class TwitterServiceFactory:
         """
         service_type = settings.TWITTER_SERVICE_TYPE.lower()
         
-        if service_type == "twitter_api_io":
-            logger.info("Using TwitterAPI.io service")
-            return twitter_api_io_service
-        elif service_type == "official":
-            # استفاده از API رسمی توییتر با Tweepy
-            logger.info("Using official Twitter API with Tweepy")
-            return twitter_service
-        else:
+        if service_type not in SERVICE_TYPES:
             # در صورت نامعتبر بودن نوع سرویس، از سرویس پیش‌فرض استفاده می‌کنیم
             logger.warning(f"Invalid service type: {service_type}. Using TwitterAPI.io as default")
-            return twitter_api_io_service
+            service_type = "twitter_api_io"
+        
+        if service_type not in self._services:
+            self._services[service_type] = self._build(service_type)
+        return self._services[service_type]
 
 # نمونه سینگلتون از فکتوری
-twitter_service_factory = TwitterServiceFactory()
\ No newline at end of file
+twitter_service_factory = TwitterServiceFactory()
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger, log_sampler
+from app.services.dedup import MinHasher, NearDuplicateIndex
+from app.services.engagement import ENGAGEMENT_FIELDS, engagement_history, initial_velocity_fields
+from app.services.enrichment import enrichment_runner
+from app.services.entities import entity_counter, entity_keys
+from app.services.scoring import scoring_engine
+from app.services.text_processing import build_search_tokens, normalize_text, tokenize
+from app.services.trending import trending_engine
+from app.services.unique_authors import unique_author_counter
+from app.services.users import user_store
+
+logger = get_logger("app.services.ingest_pipeline")
+
+
+class IngestStage:
+    """
+    کلاس پایه مراحل خط لوله ذخیره توییت
+
+    هر مرحله می‌تواند:
+    - prepare: سند پردازش شده را پیش از ذخیره تغییر دهد
+    - on_saved: پس از درج یا به‌روزرسانی سند اجرا شود
+    - flush: در پایان هر دسته، کارهای تجمیعی را ذخیره کند
+    """
+    name: str = "stage"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        return tweet
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        pass
+
+    async def flush(self) -> None:
+        pass
+
+
+class UsersStage(IngestStage):
+    """
+    انتقال پروفایل نویسنده (و نویسندگان توییت‌های ریتوییت و نقل قول شده) از raw_data به کالکشن users
+
+    پیش از DedupStage اجرا می‌شود تا پروفایل نسخه‌های تکراری هم ثبت شود.
+    """
+    name = "users"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        raw_data = tweet.get("raw_data")
+        if not raw_data:
+            return tweet
+
+        raw_data = {key: value for key, value in raw_data.items() if key != "user"}
+        user_store.observe(tweet["raw_data"].get("user") or {})
+        for nested in ("retweeted_status", "quoted_status"):
+            if isinstance(raw_data.get(nested), dict) and "user" in raw_data[nested]:
+                raw_data[nested] = dict(raw_data[nested])
+                user_store.observe(raw_data[nested].pop("user") or {})
+
+        tweet["raw_data"] = raw_data
+        return tweet
+
+    async def flush(self) -> None:
+        await user_store.flush()
+
+
+class SearchTokensStage(IngestStage):
+    """ساخت توکن‌های نرمال شده جستجو (search_tokens) از متن توییت"""
+    name = "search_tokens"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        tweet["search_tokens"] = build_search_tokens(tweet.get("text"))
+        return tweet
+
+
+class EntityStage(IngestStage):
+    """
+    کلیدهای نرمال شده موجودیت‌ها (entity_keys) و شمارنده‌های روزانه entity_counts
+
+    شمارنده‌ها فقط برای توییت‌های درج شده افزایش می‌یابند.
+    """
+    name = "entities"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        tweet["entity_keys"] = entity_keys(tweet)
+        return tweet
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        if inserted:
+            entity_counter.record(tweet)
+
+    async def flush(self) -> None:
+        await entity_counter.flush()
+
+
+class DedupStage(IngestStage):
+    """
+    تشخیص توییت‌های تقریباً تکراری با MinHash و باندبندی LSH روی توکن‌های نرمال شده
+
+    - cluster_id: شناسه توییت اصلی (اولین نسخه دیده شده) خوشه
+    - is_duplicate: نسخه تکراری؛ در صورت فعال بودن DEDUP_DROP_RAW_DATA داده خام آن ذخیره نمی‌شود
+    - duplicate_count: تعداد نسخه‌های تکراری، روی توییت اصلی با $inc افزایش می‌یابد
+    """
+    name = "dedup"
+
+    def __init__(self):
+        self.hasher = MinHasher(settings.DEDUP_NUM_PERM)
+        self.index = NearDuplicateIndex(
+            num_perm=settings.DEDUP_NUM_PERM,
+            bands=settings.DEDUP_BANDS,
+            threshold=settings.DEDUP_SIMILARITY,
+            window_seconds=settings.DEDUP_WINDOW_HOURS * 3600,
+            max_size=settings.DEDUP_MAX_FINGERPRINTS
+        )
+        self._pending_counts: Dict[str, int] = defaultdict(int)
+        self._warmed_up = False
+        # قفل در اولین فراخوانی و داخل حلقه رویداد جاری ساخته می‌شود
+        self._warm_up_lock: Optional[asyncio.Lock] = None
+
+    async def _warm_up(self) -> None:
+        """
+        بارگذاری امضاهای پنجره اخیر از دیتابیس پس از راه‌اندازی مجدد
+
+        - جدیدترین DEDUP_MAX_FINGERPRINTS امضا خوانده می‌شود
+        - زمان افزودن هر امضا زمان ذخیره توییت (created_in_db) است، همان ساعتی که افزودن‌های زنده
+          استفاده می‌کنند، و امضاها به ترتیب همین زمان اضافه می‌شوند تا ترتیب حذف از ایندکس درست باشد
+        - ذخیره‌های هم‌زمان کلمات کلیدی با قفل منتظر یک بارگذاری می‌مانند؛ پرچم فقط پس از بارگذاری
+          کامل تنظیم می‌شود تا خطای کوئری در دسته بعدی دوباره امتحان شود
+        """
+        if self._warm_up_lock is None:
+            self._warm_up_lock = asyncio.Lock()
+
+        async with self._warm_up_lock:
+            if self._warmed_up:
+                return
+
+            since = datetime.utcnow() - timedelta(hours=settings.DEDUP_WINDOW_HOURS)
+            limit = settings.DEDUP_MAX_FINGERPRINTS
+            tweets = await get_collection("tweets").find(
+                {"created_at": {"$gte": since}, "minhash": {"$exists": True}},
+                {"tweet_id": 1, "minhash": 1, "cluster_id": 1, "created_at": 1, "created_in_db": 1, "_id": 0}
+            ).sort("created_at", -1).limit(limit).to_list(length=limit)
+
+            def added_at(tweet: Dict[str, Any]) -> float:
+                stored_at = tweet.get("created_in_db") or tweet["created_at"]
+                return stored_at.replace(tzinfo=timezone.utc).timestamp()
+
+            for tweet in sorted(tweets, key=added_at):
+                self.index.add(
+                    tweet["tweet_id"],
+                    self.hasher.unpack(tweet["minhash"]),
+                    tweet.get("cluster_id") or tweet["tweet_id"],
+                    added_at(tweet)
+                )
+
+            self._warmed_up = True
+            logger.info(f"Dedup index warmed up with {len(self.index)} signatures")
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        if not settings.DEDUP_ENABLED:
+            return tweet
+        if not self._warmed_up:
+            await self._warm_up()
+
+        tokens = tokenize(tweet.get("text"))
+        if len(tokens) < settings.DEDUP_MIN_TOKENS:
+            return tweet
+
+        tweet_id = tweet["tweet_id"]
+        known = self.index.get(tweet_id)
+        if known:
+            # توییت قبلاً ذخیره شده است (مسیر به‌روزرسانی)
+            signature, cluster_id, _ = known
+            match = None
+        else:
+            signature = self.hasher.signature(tokens)
+            match = self.index.find(signature)
+            cluster_id = match[1] if match else tweet_id
+
+        tweet["minhash"] = self.hasher.pack(signature)
+        tweet["cluster_id"] = cluster_id
+        tweet["is_duplicate"] = cluster_id != tweet_id
+
+        if match and settings.DEDUP_DROP_RAW_DATA:
+            tweet["raw_data"] = {}
+
+        return tweet
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        if not inserted or "minhash" not in tweet:
+            return
+
+        self.index.add(tweet["tweet_id"], self.hasher.unpack(tweet["minhash"]), tweet["cluster_id"])
+        if tweet["is_duplicate"]:
+            self._pending_counts[tweet["cluster_id"]] += 1
+
+    async def flush(self) -> None:
+        if not self._pending_counts:
+            return
+
+        operations = [
+            UpdateOne({"tweet_id": cluster_id}, {"$inc": {"duplicate_count": count}})
+            for cluster_id, count in self._pending_counts.items()
+        ]
+        self._pending_counts = defaultdict(int)
+        await get_collection("tweets").bulk_write(operations, ordered=False)
+
+
+class TrendingStage(IngestStage):
+    """ارسال کلمات و هشتگ‌های توییت‌های جدید به موتور موضوعات داغ"""
+    name = "trending"
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        if not inserted or not settings.TRENDING_ENABLED:
+            return
+
+        hashtags = list(dict.fromkeys(normalize_text(hashtag) for hashtag in tweet.get("hashtags", [])))
+        for keyword in tweet.get("keywords", []):
+            trending_engine.record(keyword, "terms", tweet.get("search_tokens", []), tweet.get("created_at"))
+            trending_engine.record(keyword, "hashtags", hashtags, tweet.get("created_at"))
+
+
+class UniqueAuthorsStage(IngestStage):
+    """ثبت نویسنده توییت در HyperLogLog هر کلمه کلیدی و ساعت"""
+    name = "unique_authors"
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        if not tweet.get("user_id") or not tweet.get("created_at"):
+            return
+        # افزودن تکراری در HyperLogLog بی‌اثر است، پس به‌روزرسانی‌ها هم ثبت می‌شوند
+        for keyword in tweet.get("keywords", []):
+            await unique_author_counter.add(keyword, tweet["user_id"], tweet["created_at"])
+
+    async def flush(self) -> None:
+        await unique_author_counter.flush()
+
+
+class EngagementStage(IngestStage):
+    """
+    ثبت نمونه شمارنده‌های تعامل در engagement_history و سرعت اولیه توییت‌های جدید
+
+    فیلدهای سرعت اولیه فقط هنگام درج نوشته می‌شوند؛ در مسیر به‌روزرسانی سرویس ذخیره سرعت را با
+    updated_velocity_fields نسبت به سند موجود محاسبه می‌کند.
+    """
+    name = "engagement"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        tweet.update(initial_velocity_fields(tweet, datetime.utcnow()))
+        return tweet
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        engagement_history.queue(
+            tweet["tweet_id"],
+            {field: tweet.get(field, 0) for field in ENGAGEMENT_FIELDS},
+            tweet.get("engagement_observed_at")
+        )
+
+    async def flush(self) -> None:
+        await engagement_history.flush()
+
+
+class ScoringStage(IngestStage):
+    """
+    محاسبه امتیاز اهمیت با فرمول scoring_engine
+
+    پس از EngagementStage اجرا می‌شود تا فرمول بتواند از velocity_score استفاده کند.
+    """
+    name = "scoring"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        tweet["importance_score"] = scoring_engine.score(tweet)
+        tweet["score_version"] = scoring_engine.version
+        return tweet
+
+
+class PendingEnrichmentStage(IngestStage):
+    """قرار دادن توییت جدید در صف همه مراحل فعال غنی‌سازی (فقط هنگام درج ذخیره می‌شود)"""
+    name = "pending_enrichment"
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        tweet["pending_enrichment"] = enrichment_runner.stage_names()
+        return tweet
+
+
+class IngestPipeline:
+    """اجرای مراحل ذخیره توییت به ترتیب ثبت؛ خطای یک مرحله مانع ذخیره توییت نمی‌شود"""
+
+    def __init__(self, stages: Optional[List[IngestStage]] = None):
+        self.stages: List[IngestStage] = list(stages or [])
+
+    def register(self, stage: IngestStage) -> None:
+        """افزودن مرحله به انتهای خط لوله"""
+        self.stages.append(stage)
+
+    async def prepare(self, tweet: Dict[str, Any]) -> Dict[str, Any]:
+        """اجرای مراحل پیش از ذخیره"""
+        for stage in self.stages:
+            try:
+                tweet = await stage.prepare(tweet)
+            except Exception as e:
+                log_sampler.log(
+                    logger, logging.WARNING, f"prepare:{stage.name}",
+                    f"Ingest stage {stage.name} failed to prepare tweet {tweet.get('tweet_id')}: {e}"
+                )
+        return tweet
+
+    async def on_saved(self, tweet: Dict[str, Any], inserted: bool) -> None:
+        """اطلاع‌رسانی ذخیره توییت به مراحل"""
+        for stage in self.stages:
+            try:
+                await stage.on_saved(tweet, inserted)
+            except Exception as e:
+                log_sampler.log(
+                    logger, logging.WARNING, f"on_saved:{stage.name}",
+                    f"Ingest stage {stage.name} failed after saving tweet {tweet.get('tweet_id')}: {e}"
+                )
+
+    async def flush(self) -> None:
+        """ذخیره داده‌های تجمیعی مراحل در پایان دسته"""
+        for stage in self.stages:
+            try:
+                await stage.flush()
+            except Exception as e:
+                logger.error(f"Ingest stage {stage.name} failed to flush: {e}")
+
+
+# نمونه سینگلتون
+ingest_pipeline = IngestPipeline([
+    UsersStage(),
+    SearchTokensStage(),
+    EntityStage(),
+    DedupStage(),
+    TrendingStage(),
+    UniqueAuthorsStage(),
+    EngagementStage(),
+    ScoringStage(),
+    PendingEnrichmentStage(),
+])
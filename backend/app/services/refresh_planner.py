@@ -0,0 +1,149 @@
+import math
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.services.engagement import ENGAGEMENT_FIELDS, engagement_total
+
+logger = get_logger("app.services.refresh_planner")
+
+# فیلدهای لازم برای محاسبه اولویت و سرعت تعامل پس از به‌روزرسانی
+CANDIDATE_PROJECTION = {
+    "_id": 0,
+    "tweet_id": 1,
+    "created_at": 1,
+    "updated_in_db": 1,
+    "engagement_observed_at": 1,
+    "velocity": 1,
+    "importance_score": 1,
+    "user_followers_count": 1,
+    **{field: 1 for field in ENGAGEMENT_FIELDS},
+}
+
+
+def refresh_priority(tweet: Dict[str, Any], now: datetime) -> float:
+    """
+    تعامل مورد انتظار از زمان آخرین مشاهده، معیار ارزش دریافت مجدد آمار یک توییت
+
+    سرعت آخرین مشاهده با نیمه عمر REFRESH_VELOCITY_HALF_LIFE_HOURS کاهش می‌یابد، پس تعامل
+    مورد انتظار انتگرال سرعت در بازه بدون مشاهده است؛ امتیاز اهمیت آن را تقویت می‌کند.
+    توییت‌های جوان با سرعت بالا زود و توییت‌های قدیمی تثبیت شده دیر یا هرگز انتخاب می‌شوند.
+    توییت‌های جوان‌تر از REFRESH_EXPLORATION_HOURS حداقل سرعت REFRESH_PRIOR_VELOCITY را دارند تا توییتی
+    که بدون تعامل ذخیره شده و بعدا گسترش می‌یابد با سرعت صفر برای همیشه کنار گذاشته نشود.
+
+    Args:
+        tweet: سند توییت
+        now: زمان فعلی
+
+    Returns:
+        float: تعداد تعامل مورد انتظار (وزن‌دار)
+    """
+    created_at = tweet.get("created_at") or now
+    last_observed = tweet.get("engagement_observed_at") or tweet.get("updated_in_db") or created_at
+    stale_hours = max((now - last_observed).total_seconds() / 3600, 0.0)
+
+    velocity = tweet.get("velocity")
+    if velocity is None:
+        # توییت‌های بدون سرعت ثبت شده: میانگین تعامل از زمان انتشار
+        age_hours = max((last_observed - created_at).total_seconds() / 3600, 1 / 60)
+        velocity = engagement_total(tweet) / age_hours
+
+    # کف اکتشاف برای توییت‌های جوان
+    if (now - created_at).total_seconds() / 3600 < settings.REFRESH_EXPLORATION_HOURS:
+        velocity = max(velocity, settings.REFRESH_PRIOR_VELOCITY)
+
+    half_life = settings.REFRESH_VELOCITY_HALF_LIFE_HOURS
+    expected = velocity * half_life / math.log(2) * (1 - 2 ** (-stale_hours / half_life))
+    boost = 1 + settings.REFRESH_IMPORTANCE_WEIGHT * (tweet.get("importance_score") or 0) / 100
+    return round(expected * boost, 3)
+
+
+class RefreshPlanner:
+    """
+    انتخاب توییت‌ها برای دریافت مجدد آمار با صف اولویت و بودجه ساعتی
+
+    بودجه به صورت سطل توکن با نرخ REFRESH_BUDGET_PER_HOUR پر می‌شود؛ هر اجرای plan
+    به اندازه توکن‌های موجود، پرارزش‌ترین کاندیدها را انتخاب و توکن‌ها را مصرف می‌کند.
+    بودجه مصرف نشده تا سقف دو برابر سهم یک اجرا ذخیره می‌شود.
+    """
+
+    def __init__(self):
+        self._tokens = 0.0
+        self._refilled_at: Optional[datetime] = None
+
+    def _refill(self, now: datetime) -> None:
+        rate = settings.REFRESH_BUDGET_PER_HOUR / 3600
+        tick_budget = rate * settings.REFRESH_TICK_SECONDS
+        if self._refilled_at is None:
+            self._tokens = tick_budget
+        else:
+            elapsed = (now - self._refilled_at).total_seconds()
+            self._tokens = min(self._tokens + elapsed * rate, max(2 * tick_budget, 1.0))
+        self._refilled_at = now
+
+    async def candidates(self, now: datetime) -> List[Dict[str, Any]]:
+        """
+        کاندیدهای به‌روزرسانی: جدیدترین توییت‌ها و سریع‌ترین توییت‌های پنجره REFRESH_MAX_AGE_HOURS
+
+        Returns:
+            list: اسناد توییت به همراه refresh_priority، به ترتیب نزولی اولویت
+        """
+        tweets_collection = get_collection("tweets")
+        query = {
+            "created_at": {"$gte": now - timedelta(hours=settings.REFRESH_MAX_AGE_HOURS)},
+            "updated_in_db": {"$lt": now - timedelta(minutes=settings.REFRESH_MIN_INTERVAL_MINUTES)}
+        }
+        limit = settings.REFRESH_CANDIDATE_LIMIT
+
+        recent = await tweets_collection.find(query, CANDIDATE_PROJECTION).sort(
+            "created_at", -1
+        ).limit(limit).to_list(length=limit)
+        fast = await tweets_collection.find({**query, "velocity_score": {"$gt": 0}}, CANDIDATE_PROJECTION).sort(
+            "velocity_score", -1
+        ).limit(limit).to_list(length=limit)
+
+        unique = {tweet["tweet_id"]: tweet for tweet in recent + fast}
+        for tweet in unique.values():
+            tweet["refresh_priority"] = refresh_priority(tweet, now)
+
+        return sorted(unique.values(), key=lambda tweet: tweet["refresh_priority"], reverse=True)
+
+    async def plan(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        انتخاب پرارزش‌ترین توییت‌ها در حد بودجه موجود
+
+        Returns:
+            list: توییت‌های انتخاب شده به ترتیب اولویت
+        """
+        now = now or datetime.utcnow()
+        self._refill(now)
+        budget = int(self._tokens)
+        if budget <= 0:
+            return []
+
+        candidates = await self.candidates(now)
+        selected = heapq.nlargest(
+            budget,
+            (tweet for tweet in candidates if tweet["refresh_priority"] >= settings.REFRESH_MIN_PRIORITY),
+            key=lambda tweet: tweet["refresh_priority"]
+        )
+        self._tokens -= len(selected)
+
+        logger.debug(f"Refresh plan: {len(selected)} of {len(candidates)} candidates, budget {budget}")
+        return selected
+
+    def status(self) -> Dict[str, Any]:
+        """وضعیت بودجه برنامه‌ریز"""
+        return {
+            "budget_per_hour": settings.REFRESH_BUDGET_PER_HOUR,
+            "tick_seconds": settings.REFRESH_TICK_SECONDS,
+            "available_tokens": round(self._tokens, 2),
+            "refilled_at": self._refilled_at
+        }
+
+
+# نمونه سینگلتون
+refresh_planner = RefreshPlanner()
@@ -0,0 +1,231 @@
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.services.archive import cold_archive, ARCHIVE_PROJECTION
+
+logger = get_logger("app.services.retention")
+
+# فیلدهای لازم برای ارزیابی سیاست نگهداری هر توییت
+RETENTION_PROJECTION = {"_id": 1, "created_at": 1, "importance_score": 1, "keywords": 1}
+
+STATE_ID = "tweets"
+
+
+def default_policy() -> Dict[str, Any]:
+    """سیاست پیش‌فرض نگهداری از تنظیمات"""
+    return {"max_age_days": settings.RETENTION_DEFAULT_DAYS, "min_importance": settings.RETENTION_MIN_IMPORTANCE}
+
+
+def keyword_policy(keyword: Dict[str, Any], default: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    سیاست نگهداری یک کلمه کلیدی
+
+    - retention_days: None برای سیاست پیش‌فرض، 0 برای نگهداری دائمی
+    - retention_min_importance: None برای مقدار پیش‌فرض
+    """
+    days = keyword.get("retention_days")
+    min_importance = keyword.get("retention_min_importance")
+    return {
+        "max_age_days": default["max_age_days"] if days is None else (days or None),
+        "min_importance": default["min_importance"] if min_importance is None else min_importance,
+    }
+
+
+def is_expired(tweet: Dict[str, Any], policies: Dict[str, Dict[str, Any]], default: Dict[str, Any],
+               now: datetime) -> bool:
+    """
+    آیا توییت طبق سیاست همه کلمات کلیدی آن منقضی شده است
+
+    توییتی که به چند کلمه کلیدی تعلق دارد تا زمانی که سیاست یکی از آنها نگهداری آن را بخواهد حذف نمی‌شود.
+
+    Args:
+        tweet: سند توییت (created_at، importance_score و keywords)
+        policies: سیاست کلمات کلیدی دارای سیاست اختصاصی
+        default: سیاست پیش‌فرض
+
+    Returns:
+        bool: قابل حذف بودن
+    """
+    created_at = tweet.get("created_at")
+    if created_at is None:
+        return False
+
+    age_days = (now - created_at).total_seconds() / 86400
+    importance = tweet.get("importance_score") or 0
+
+    for keyword in tweet.get("keywords") or [None]:
+        policy = policies.get(keyword, default) if keyword else default
+        if policy["max_age_days"] is None or age_days <= policy["max_age_days"]:
+            return False
+        if policy["min_importance"] is not None and importance >= policy["min_importance"]:
+            return False
+    return True
+
+
+class RetentionEngine:
+    """
+    حذف تدریجی توییت‌های منقضی به جای یک delete_many بزرگ
+
+    - کالکشن به ترتیب _id در دسته‌های محدود پیمایش و هر سند در برنامه با سیاست‌ها ارزیابی می‌شود،
+      پس هر کوئری حجم کار ثابتی دارد
+    - نرخ حذف به RETENTION_MAX_DOCS_PER_SECOND محدود است
+    - تاخیر هر دسته با میانگین نمایی پایش می‌شود؛ بالاتر از RETENTION_TARGET_LATENCY_MS اندازه دسته
+      نصف و به همان اندازه مکث می‌شود، و در تاخیر کم اندازه دسته به تدریج افزایش می‌یابد
+    - آخرین _id پیمایش شده در کالکشن retention_state ذخیره می‌شود و اجرای بعدی از همان نقطه ادامه می‌دهد
+    - با ARCHIVE_ENABLED توییت‌های منقضی پیش از حذف در آرشیو سرد نوشته می‌شوند
+    """
+
+    def __init__(self):
+        self.batch_size = settings.RETENTION_BATCH_SIZE
+        self.latency_ms: Optional[float] = None
+
+    def _observe(self, elapsed: float) -> float:
+        """
+        ثبت تاخیر یک دسته و تنظیم اندازه دسته بعدی
+
+        Returns:
+            float: مکث اضافه برای کاهش فشار (ثانیه)
+        """
+        latency = elapsed * 1000
+        self.latency_ms = latency if self.latency_ms is None else 0.7 * self.latency_ms + 0.3 * latency
+
+        target = settings.RETENTION_TARGET_LATENCY_MS
+        if self.latency_ms > target:
+            self.batch_size = max(settings.RETENTION_MIN_BATCH_SIZE, self.batch_size // 2)
+            return elapsed
+        if self.latency_ms < target / 2:
+            step = max(settings.RETENTION_MIN_BATCH_SIZE, settings.RETENTION_BATCH_SIZE // 10)
+            self.batch_size = min(settings.RETENTION_BATCH_SIZE, self.batch_size + step)
+        return 0.0
+
+    async def load_policies(self) -> Dict[str, Dict[str, Any]]:
+        """سیاست کلمات کلیدی دارای retention_days یا retention_min_importance"""
+        default = default_policy()
+        cursor = get_collection("keywords").find(
+            {"$or": [{"retention_days": {"$ne": None}}, {"retention_min_importance": {"$ne": None}}]},
+            {"keyword": 1, "retention_days": 1, "retention_min_importance": 1}
+        )
+        return {keyword["keyword"]: keyword_policy(keyword, default) async for keyword in cursor}
+
+    async def run(self, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        ادامه دور جاری حذف تا پایان کالکشن یا رسیدن به سقف زمان
+
+        Returns:
+            dict: تعداد اسناد بررسی و حذف شده و وضعیت تکمیل دور
+        """
+        max_seconds = max_seconds or settings.RETENTION_MAX_RUN_SECONDS
+        tweets_collection = get_collection("tweets")
+        state_collection = get_collection("retention_state")
+
+        now = datetime.utcnow()
+        default = default_policy()
+        policies = await self.load_policies()
+
+        ages = [policy["max_age_days"] for policy in [default, *policies.values()] if policy["max_age_days"] is not None]
+        if not ages:
+            return {"scanned": 0, "deleted": 0, "completed": True}
+        # توییت‌هایی که پس از این زمان ذخیره شده‌اند در این دور بررسی نمی‌شوند
+        upper_id = ObjectId.from_datetime(now - timedelta(days=min(ages)))
+
+        state = await state_collection.find_one({"_id": STATE_ID}) or {}
+        last_id = state.get("last_id")
+        if last_id is None and not state.get("pass_started_at"):
+            await state_collection.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"pass_started_at": now, "pass_scanned": 0, "pass_deleted": 0}},
+                upsert=True
+            )
+
+        started = time.monotonic()
+        scanned = 0
+        deleted = 0
+        completed = False
+
+        while time.monotonic() - started < max_seconds:
+            id_range: Dict[str, Any] = {"$lt": upper_id}
+            if last_id is not None:
+                id_range["$gt"] = last_id
+
+            batch_started = time.monotonic()
+            tweets = await tweets_collection.find({"_id": id_range}, RETENTION_PROJECTION).sort(
+                "_id", 1
+            ).limit(self.batch_size).to_list(length=self.batch_size)
+            if not tweets:
+                completed = True
+                break
+
+            expired = [tweet["_id"] for tweet in tweets if is_expired(tweet, policies, default, now)]
+            batch_deleted = 0
+            if expired:
+                # آرشیو پیش از حذف؛ در صورت خطا این دسته حذف نمی‌شود
+                if settings.ARCHIVE_ENABLED:
+                    await cold_archive.archive(
+                        await tweets_collection.find({"_id": {"$in": expired}}, ARCHIVE_PROJECTION).to_list(length=None)
+                    )
+                result = await tweets_collection.delete_many({"_id": {"$in": expired}})
+                batch_deleted = result.deleted_count
+                deleted += batch_deleted
+            elapsed = time.monotonic() - batch_started
+
+            last_id = tweets[-1]["_id"]
+            scanned += len(tweets)
+            await state_collection.update_one(
+                {"_id": STATE_ID},
+                {
+                    "$set": {"last_id": last_id, "updated_at": datetime.utcnow()},
+                    "$inc": {"pass_scanned": len(tweets), "pass_deleted": batch_deleted}
+                }
+            )
+
+            # سقف نرخ حذف و مکث تطبیقی براساس تاخیر مشاهده شده
+            pause = max(len(expired) / settings.RETENTION_MAX_DOCS_PER_SECOND - elapsed, 0.0)
+            pause += self._observe(elapsed)
+            if pause:
+                await asyncio.sleep(pause)
+
+        if completed:
+            await state_collection.update_one(
+                {"_id": STATE_ID},
+                {
+                    "$set": {"last_id": None, "pass_started_at": None, "last_completed_at": datetime.utcnow()},
+                    "$inc": {"completed_passes": 1}
+                }
+            )
+
+        logger.info(
+            f"Retention run scanned {scanned} and deleted {deleted} tweets "
+            f"(batch size {self.batch_size}, latency {self.latency_ms or 0:.0f} ms, completed: {completed})"
+        )
+
+        return {"scanned": scanned, "deleted": deleted, "completed": completed, "batch_size": self.batch_size}
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        وضعیت دور جاری و سیاست‌های نگهداری
+
+        Returns:
+            dict: نقطه ذخیره شده، سیاست پیش‌فرض و سیاست کلمات کلیدی
+        """
+        state = await get_collection("retention_state").find_one({"_id": STATE_ID}, {"_id": 0}) or {}
+        if state.get("last_id") is not None:
+            state["last_id"] = str(state["last_id"])
+
+        return {
+            "state": state,
+            "default_policy": default_policy(),
+            "keyword_policies": await self.load_policies(),
+            "batch_size": self.batch_size,
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "archive": cold_archive.status()
+        }
+
+
+# نمونه سینگلتون
+retention_engine = RetentionEngine()
@@ -0,0 +1,262 @@
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.scoring")
+
+SCALES = ("linear", "log")
+
+
+class ScoringFormula:
+    """
+    فرمول اعلانی امتیاز اهمیت توییت
+
+    تعریف فرمول:
+        {
+            "terms": [{"field": "favorite_count", "weight": 0.1, "cap": 30, "scale": "linear"}, ...],
+            "decay_half_life_hours": None
+        }
+
+    - هر جمله: مقدار فیلد (در مقیاس log، log1p مقدار) ضرب در وزن و محدود به سقف
+    - decay_half_life_hours: نیمه عمر کاهش امتیاز با سن توییت (None یعنی بدون کاهش)
+    - version: هش تعریف فرمول؛ با هر تغییر فرمول، امتیاز توییت‌های قدیمی قابل محاسبه مجدد است
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        terms = definition.get("terms") or []
+        if not terms:
+            raise ValueError("Scoring formula needs at least one term")
+
+        self.terms: List[Dict[str, Any]] = []
+        for term in terms:
+            if "field" not in term:
+                raise ValueError(f"Scoring term without field: {term}")
+            scale = term.get("scale", "linear")
+            if scale not in SCALES:
+                raise ValueError(f"Unknown scale '{scale}' for field {term['field']}")
+            self.terms.append({
+                "field": term["field"],
+                "weight": float(term.get("weight", 1.0)),
+                "cap": None if term.get("cap") is None else float(term["cap"]),
+                "scale": scale,
+            })
+
+        half_life = definition.get("decay_half_life_hours")
+        self.decay_half_life_hours: Optional[float] = float(half_life) if half_life else None
+
+        canonical = json.dumps(
+            {"terms": self.terms, "decay_half_life_hours": self.decay_half_life_hours},
+            sort_keys=True
+        )
+        self.version = hashlib.blake2b(canonical.encode("utf-8"), digest_size=6).hexdigest()
+
+    @property
+    def fields(self) -> List[str]:
+        """فیلدهای مورد نیاز فرمول"""
+        return list(dict.fromkeys(term["field"] for term in self.terms))
+
+    def compute(self, columns: Dict[str, np.ndarray], age_hours: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        محاسبه برداری امتیاز یک دسته
+
+        Args:
+            columns: آرایه مقادیر هر فیلد
+            age_hours: سن توییت‌ها به ساعت (فقط برای کاهش با زمان)
+
+        Returns:
+            ndarray: امتیازها
+        """
+        size = len(next(iter(columns.values())))
+        scores = np.zeros(size, dtype=np.float64)
+
+        for term in self.terms:
+            values = np.maximum(columns[term["field"]], 0.0)
+            if term["scale"] == "log":
+                values = np.log1p(values)
+            values = values * term["weight"]
+            if term["cap"] is not None:
+                np.minimum(values, term["cap"], out=values)
+            scores += values
+
+        if self.decay_half_life_hours and age_hours is not None:
+            scores *= np.exp2(-np.maximum(age_hours, 0.0) / self.decay_half_life_hours)
+
+        return np.round(scores, 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "terms": self.terms,
+            "decay_half_life_hours": self.decay_half_life_hours,
+        }
+
+
+class ScoringEngine:
+    """
+    محاسبه امتیاز اهمیت توییت‌ها با فرمول قابل تنظیم
+
+    - score: امتیاز یک توییت هنگام ذخیره یا به‌روزرسانی آمار
+    - rescore: محاسبه مجدد دسته‌ای کالکشن tweets با آرایه‌های NumPy و bulk_write
+
+    محاسبه مجدد به ترتیب _id پیش می‌رود و پیشرفت هر دور در کالکشن scoring_state ذخیره می‌شود؛
+    توییت‌هایی که score_version آنها با نسخه فرمول برابر است رد می‌شوند، پس اجرای مجدد
+    از همان نقطه ادامه می‌یابد و توییت‌های جدید (که هنگام ذخیره امتیاز گرفته‌اند) دوباره محاسبه نمی‌شوند.
+    با فعال بودن کاهش با زمان، هر SCORING_DECAY_REFRESH_HOURS ساعت یک دور کامل جدید اجرا می‌شود.
+    """
+
+    def __init__(self, formula: ScoringFormula):
+        self.formula = formula
+
+    @property
+    def version(self) -> str:
+        return self.formula.version
+
+    def _columns(self, tweets: List[Dict[str, Any]], now: datetime):
+        columns = {
+            field: np.fromiter((float(tweet.get(field) or 0) for tweet in tweets), dtype=np.float64, count=len(tweets))
+            for field in self.formula.fields
+        }
+        age_hours = None
+        if self.formula.decay_half_life_hours:
+            age_hours = np.fromiter(
+                ((now - (tweet.get("created_at") or now)).total_seconds() / 3600 for tweet in tweets),
+                dtype=np.float64, count=len(tweets)
+            )
+        return columns, age_hours
+
+    def score(self, tweet: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        """
+        امتیاز اهمیت یک توییت
+
+        Args:
+            tweet: سند توییت (فیلدهای فرمول و created_at)
+            now: زمان مرجع برای کاهش با زمان
+
+        Returns:
+            float: امتیاز اهمیت
+        """
+        columns, age_hours = self._columns([tweet], now or datetime.utcnow())
+        return float(self.formula.compute(columns, age_hours)[0])
+
+    def _pass_id(self, now: datetime) -> str:
+        """شناسه دور محاسبه مجدد"""
+        if not self.formula.decay_half_life_hours:
+            return self.version
+        period = settings.SCORING_DECAY_REFRESH_HOURS * 3600
+        return f"{self.version}-{int(now.timestamp() // period)}"
+
+    async def rescore(self, batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                      restart: bool = False) -> Dict[str, Any]:
+        """
+        محاسبه مجدد امتیاز توییت‌ها از آخرین نقطه ذخیره شده
+
+        Args:
+            batch_size: تعداد توییت‌های هر دسته
+            max_batches: حداکثر دسته‌ها در این اجرا (None برای ادامه تا پایان)
+            restart: شروع دور از ابتدای کالکشن
+
+        Returns:
+            dict: شناسه دور، تعداد توییت‌های امتیازدهی شده و وضعیت تکمیل
+        """
+        batch_size = batch_size or settings.SCORING_BATCH_SIZE
+        tweets_collection = get_collection("tweets")
+        state_collection = get_collection("scoring_state")
+
+        now = datetime.utcnow()
+        pass_id = self._pass_id(now)
+
+        state = None if restart else await state_collection.find_one({"_id": pass_id})
+        if state and state.get("completed_at"):
+            return {"pass_id": pass_id, "version": self.version, "scored": 0, "completed": True}
+        last_id = state.get("last_id") if state else None
+        if not state:
+            # اندازه تقریبی کالکشن از متادیتا برای گزارش پیشرفت دور بدون شمارش کامل
+            total = await tweets_collection.estimated_document_count()
+            await state_collection.replace_one(
+                {"_id": pass_id},
+                {"version": self.version, "last_id": None, "scored": 0, "total": total,
+                 "started_at": now, "updated_at": now},
+                upsert=True
+            )
+
+        projection = {field: 1 for field in self.formula.fields}
+        projection["created_at"] = 1
+
+        scored = 0
+        batches = 0
+        completed = False
+        while max_batches is None or batches < max_batches:
+            query: Dict[str, Any] = {}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            if not self.formula.decay_half_life_hours:
+                query["score_version"] = {"$ne": self.version}
+
+            tweets = await tweets_collection.find(query, projection).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not tweets:
+                completed = True
+                break
+
+            columns, age_hours = self._columns(tweets, now)
+            scores = self.formula.compute(columns, age_hours)
+            operations = [
+                UpdateOne(
+                    {"_id": tweet["_id"]},
+                    {"$set": {"importance_score": float(value), "score_version": self.version}}
+                )
+                for tweet, value in zip(tweets, scores)
+            ]
+            await tweets_collection.bulk_write(operations, ordered=False)
+
+            last_id = tweets[-1]["_id"]
+            scored += len(tweets)
+            batches += 1
+            await state_collection.update_one(
+                {"_id": pass_id},
+                {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}, "$inc": {"scored": len(tweets)}}
+            )
+
+        if completed:
+            await state_collection.update_one({"_id": pass_id}, {"$set": {"completed_at": datetime.utcnow()}})
+
+        logger.info(f"Rescored {scored} tweets with formula {self.version} (pass {pass_id}, completed: {completed})")
+
+        return {"pass_id": pass_id, "version": self.version, "scored": scored, "completed": completed}
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        وضعیت فرمول فعلی و دور جاری محاسبه مجدد
+
+        پیشرفت از سند وضعیت دور (scored و total ثبت شده در شروع دور) محاسبه می‌شود، نه با شمارش
+        توییت‌های با نسخه قدیمی که کل کالکشن را پیمایش می‌کند.
+
+        Returns:
+            dict: فرمول، وضعیت دور و تعداد تقریبی توییت‌های باقی‌مانده
+        """
+        pass_id = self._pass_id(datetime.utcnow())
+        state = await get_collection("scoring_state").find_one({"_id": pass_id}, {"last_id": 0})
+
+        if state is None:
+            remaining = await get_collection("tweets").estimated_document_count()
+        elif state.get("completed_at"):
+            remaining = 0
+        else:
+            remaining = max(state.get("total", 0) - state.get("scored", 0), 0)
+
+        return {
+            "formula": self.formula.to_dict(),
+            "pass_id": pass_id,
+            "state": state,
+            "remaining_tweets": remaining
+        }
+
+
+# نمونه سینگلتون
+scoring_engine = ScoringEngine(ScoringFormula(settings.SCORING_FORMULA))
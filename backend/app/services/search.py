@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.services.text_processing import build_search_query
+
+# برش‌های قابل درخواست در جستجوی توییت‌ها
+FACETS = ("lang", "keywords", "verified", "sentiment", "date")
+
+# فرمت گروه‌بندی هیستوگرام زمانی ($dateTrunc در MongoDB 4.4 موجود نیست)
+HISTOGRAM_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00:00",
+    "day": "%Y-%m-%dT00:00:00",
+}
+
+
+def build_tweet_query(
+    keyword: Optional[str] = None,
+    user_screen_name: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    importance_min: Optional[float] = None,
+    is_verified: Optional[bool] = None,
+    sentiment: Optional[str] = None,
+    topic: Optional[str] = None,
+    search_text: Optional[str] = None,
+    cluster_id: Optional[str] = None,
+    exclude_duplicates: bool = False
+) -> Dict[str, Any]:
+    """
+    ساخت کوئری فیلترهای جستجوی توییت‌ها (مشترک بین GET /tweets و POST /tweets/search)
+
+    Returns:
+        dict: کوئری MongoDB
+    """
+    query: Dict[str, Any] = {}
+
+    if keyword:
+        query["keywords"] = keyword
+
+    if user_screen_name:
+        query["user_screen_name"] = user_screen_name
+
+    if start_date:
+        query.setdefault("created_at", {})["$gte"] = start_date
+
+    if end_date:
+        query.setdefault("created_at", {})["$lte"] = end_date
+
+    if importance_min is not None:
+        query["importance_score"] = {"$gte": importance_min}
+
+    if is_verified is not None:
+        query["user_verified"] = is_verified
+
+    if sentiment:
+        query["sentiment_label"] = sentiment
+
+    if topic:
+        query["topics"] = topic
+
+    # جستجوی متنی روی توکن‌های نرمال شده
+    if search_text:
+        query.update(build_search_query(search_text))
+
+    # فیلتر خوشه‌های تکراری
+    if cluster_id:
+        query["cluster_id"] = cluster_id
+
+    if exclude_duplicates:
+        query["is_duplicate"] = {"$ne": True}
+
+    return query
+
+
+def facet_stages(facets: List[str], limit: int, interval: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    زیرخط‌لوله‌های $facet برش‌های درخواستی
+
+    Args:
+        facets: نام برش‌ها (زیرمجموعه FACETS)
+        limit: حداکثر مقادیر هر برش (به جز هیستوگرام)
+        interval: بازه هیستوگرام زمانی (hour یا day)
+
+    Returns:
+        dict: نام برش -> مراحل aggregation
+    """
+    stages = {}
+    for facet in facets:
+        if facet == "lang":
+            stages[facet] = [{"$sortByCount": "$lang"}, {"$limit": limit}]
+        elif facet == "keywords":
+            stages[facet] = [{"$unwind": "$keywords"}, {"$sortByCount": "$keywords"}, {"$limit": limit}]
+        elif facet == "verified":
+            stages[facet] = [{"$sortByCount": {"$ifNull": ["$user_verified", False]}}]
+        elif facet == "sentiment":
+            stages[facet] = [{"$sortByCount": {"$ifNull": ["$sentiment_label", "unknown"]}}]
+        elif facet == "date":
+            stages[facet] = [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": HISTOGRAM_FORMATS[interval], "date": "$created_at"}},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+        else:
+            raise ValueError(f"Unknown facet '{facet}'")
+    return stages
+
+
+def parse_facets(raw: Dict[str, List[Dict[str, Any]]], scale: float = 1.0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    تبدیل خروجی $facet به لیست value/count
+
+    Args:
+        raw: خروجی زیرخط‌لوله‌های facet_stages
+        scale: ضریب تعمیم شمارش نمونه به کل مجموعه (برای برش‌های تقریبی)
+
+    Returns:
+        dict: نام برش -> لیست مقدار و تعداد
+    """
+    facets = {}
+    for name, buckets in raw.items():
+        items = []
+        for bucket in buckets:
+            value = bucket["_id"]
+            if name == "date" and value is not None:
+                value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+            items.append({"value": value, "count": int(round(bucket["count"] * scale))})
+        facets[name] = items
+    return facets
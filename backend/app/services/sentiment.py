@@ -0,0 +1,149 @@
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.text_processing import normalize_text, split_words
+
+# واژگان احساسات (به شکل نرمال شده: بدون نیم‌فاصله و با ی/ک فارسی)؛ وزن مثبت یا منفی
+LEXICON: Dict[str, float] = {
+    # مثبت
+    "خوب": 1.0, "عالی": 2.0, "زیبا": 1.0, "قشنگ": 1.0, "خوشحال": 2.0, "خوشحالم": 2.0, "شاد": 1.0,
+    "موفق": 1.0, "موفقیت": 1.0, "موفقیتآمیز": 2.0, "پیروز": 1.0, "پیروزی": 2.0, "امید": 1.0,
+    "امیدوار": 1.0, "امیدوارم": 1.0, "بهتر": 1.0, "بهترین": 2.0, "عشق": 1.0, "عاشق": 1.0,
+    "عاشقتم": 2.0, "لذت": 1.0, "ممنون": 1.0, "ممنونم": 1.0, "مرسی": 1.0, "سپاس": 1.0, "تشکر": 1.0,
+    "تبریک": 2.0, "آفرین": 2.0, "درود": 1.0, "شگفتانگیز": 2.0, "فوقالعاده": 2.0, "محشر": 2.0,
+    "خوشبخت": 2.0, "آرامش": 1.0, "رضایت": 1.0, "راضی": 1.0, "مثبت": 1.0, "پیشرفت": 1.0,
+    "رونق": 1.0, "بهبود": 1.0, "افتخار": 2.0, "دلنشین": 1.0, "جذاب": 1.0, "صلح": 1.0,
+    "آزادی": 1.0, "سالم": 1.0, "خوشمزه": 1.0, "حمایت": 1.0, "لبخند": 1.0, "شیرین": 1.0,
+    "دمت": 1.0, "ایول": 2.0, "باحال": 1.0, "خفن": 1.0,
+    "good": 1.0, "great": 2.0, "love": 2.0, "happy": 2.0, "excellent": 2.0, "thanks": 1.0,
+    "best": 2.0, "awesome": 2.0, "nice": 1.0, "win": 1.0,
+    # منفی
+    "بد": -1.0, "بدتر": -1.0, "بدترین": -2.0, "افتضاح": -2.0, "زشت": -1.0, "غم": -1.0,
+    "غمگین": -2.0, "ناراحت": -2.0, "ناراحتم": -2.0, "نگران": -1.0, "نگرانی": -1.0, "ترس": -1.0,
+    "ترسناک": -2.0, "خشم": -2.0, "عصبانی": -2.0, "متاسف": -1.0, "متاسفانه": -1.0, "فاجعه": -2.0,
+    "بحران": -1.0, "شکست": -1.0, "مرگ": -2.0, "کشته": -2.0, "قتل": -2.0, "جنایت": -2.0,
+    "فساد": -2.0, "دزدی": -2.0, "دروغ": -2.0, "دروغگو": -2.0, "ظلم": -2.0, "تورم": -1.0,
+    "گرانی": -1.0, "فقر": -1.0, "بیکاری": -1.0, "مشکل": -1.0, "خطر": -1.0, "خطرناک": -2.0,
+    "درد": -1.0, "رنج": -1.0, "ضعیف": -1.0, "تلخ": -1.0, "نفرت": -2.0, "شرم": -2.0,
+    "شرمآور": -2.0, "افسوس": -1.0, "حیف": -1.0, "وحشتناک": -2.0, "خیانت": -2.0, "تقلب": -2.0,
+    "بیعدالتی": -2.0, "ناامید": -2.0, "ناامیدی": -2.0, "خسته": -1.0, "مزخرف": -2.0, "لعنت": -2.0,
+    "bad": -1.0, "worst": -2.0, "hate": -2.0, "sad": -2.0, "terrible": -2.0, "awful": -2.0,
+    "angry": -2.0, "fail": -1.0, "corrupt": -2.0,
+}
+
+EMOJI_LEXICON: Dict[str, float] = {
+    "😊": 1.0, "😀": 1.0, "😃": 1.0, "😄": 1.0, "😁": 1.0, "😍": 2.0, "🥰": 2.0, "❤": 2.0,
+    "👍": 1.0, "👏": 1.0, "🎉": 2.0, "🙏": 1.0, "💪": 1.0, "🌹": 1.0, "✌": 1.0,
+    "😢": -1.0, "😭": -2.0, "😡": -2.0, "😠": -2.0, "💔": -2.0, "👎": -1.0, "😞": -1.0,
+    "😔": -1.0, "😩": -1.0, "😤": -1.0, "😱": -1.0, "🤬": -2.0,
+}
+
+# نفی کلمه احساسی بعدی («نه خوب»، «بدون مشکل»)
+NEGATORS_BEFORE = frozenset({"نه", "بدون", "هیچ", "not", "no", "never"})
+# نفی کلمه احساسی قبلی («خوب نیست»، «موفق نشد»)
+NEGATORS_AFTER = frozenset({
+    "نیست", "نیستند", "نیستم", "نبود", "نبودند", "نبوده", "نشد", "نشده", "نمیشود", "نمیشه", "ندارد", "نداره",
+})
+INTENSIFIERS = frozenset({"خیلی", "بسیار", "واقعا", "کاملا", "شدیدا", "very", "so", "really"})
+
+# فاصله توکنی اثر نفی و تشدید
+_NEGATION_WINDOW = 3
+_INTENSIFIER_WEIGHT = 1.5
+# ضریب نرمال‌سازی مجموع وزن‌ها به بازه -1 تا 1 (مانند VADER)
+_NORMALIZATION_ALPHA = 15.0
+NEUTRAL_THRESHOLD = 0.05
+
+
+def _load_extra_lexicon(path: Optional[str]) -> Dict[str, float]:
+    """بارگذاری واژگان تکمیلی از فایل TSV (کلمه<TAB>وزن)"""
+    if not path:
+        return {}
+
+    lexicon = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            parts = line.strip().split("\t")
+            if len(parts) == 2 and not parts[0].startswith("#"):
+                lexicon[normalize_text(parts[0]).replace(" ", "")] = float(parts[1])
+    return lexicon
+
+
+_lexicon: Optional[Dict[str, float]] = None
+
+
+def _get_lexicon() -> Dict[str, float]:
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = {**LEXICON, **_load_extra_lexicon(settings.SENTIMENT_LEXICON_PATH)}
+    return _lexicon
+
+
+def score_text(text: Optional[str]) -> Tuple[float, str]:
+    """
+    امتیاز احساسات یک متن با واژگان، نفی و تشدید
+
+    Args:
+        text: متن خام توییت
+
+    Returns:
+        tuple: (امتیاز بین -1 و 1، برچسب positive/negative/neutral)
+    """
+    if not text:
+        return 0.0, "neutral"
+
+    lexicon = _get_lexicon()
+    tokens = split_words(text)
+
+    total = 0.0
+    negate_until = -1
+    intensify_until = -1
+    last_scored: Optional[Tuple[int, float]] = None
+
+    for position, token in enumerate(tokens):
+        if token in NEGATORS_BEFORE:
+            negate_until = position + _NEGATION_WINDOW
+            continue
+        if token in INTENSIFIERS:
+            intensify_until = position + _NEGATION_WINDOW
+            continue
+        if token in NEGATORS_AFTER:
+            if last_scored and position - last_scored[0] <= _NEGATION_WINDOW:
+                # حذف اثر قبلی و اعمال وزن معکوس
+                total -= 2 * last_scored[1]
+                last_scored = None
+            continue
+
+        weight = lexicon.get(token)
+        if weight is None:
+            continue
+        if position <= intensify_until:
+            weight *= _INTENSIFIER_WEIGHT
+        if position <= negate_until:
+            weight = -weight
+        total += weight
+        last_scored = (position, weight)
+
+    total += sum(EMOJI_LEXICON.get(char, 0.0) for char in text)
+
+    score = total / math.sqrt(total * total + _NORMALIZATION_ALPHA) if total else 0.0
+    if score >= NEUTRAL_THRESHOLD:
+        label = "positive"
+    elif score <= -NEUTRAL_THRESHOLD:
+        label = "negative"
+    else:
+        label = "neutral"
+    return round(score, 4), label
+
+
+def score_texts(texts: List[str]) -> List[Tuple[float, str]]:
+    """امتیاز دسته‌ای متن‌ها"""
+    return [score_text(text) for text in texts]
+
+
+def sentiment_updates(tweets: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """پردازشگر مرحله غنی‌سازی sentiment (اجرا در پروسه‌های کارگر)"""
+    return [
+        {"sentiment_score": score, "sentiment_label": label}
+        for score, label in score_texts([tweet.get("text") or "" for tweet in tweets])
+    ]
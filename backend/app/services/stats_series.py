@@ -0,0 +1,252 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from pymongo import UpdateOne
+
+from app.core.db import get_collection, ANALYTICS_PROFILE
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.stats_series")
+
+# متریک‌های سری زمانی (نام -> مسیر در نمونه نمونه‌بردار آمار سیستم)
+STATS_METRICS = {
+    "tweets_total": ("tweets", "total"),
+    "tweets_today": ("tweets", "today"),
+    "tweets_last_24h": ("tweets", "last_24h"),
+    "keywords_total": ("keywords", "total"),
+    "keywords_active": ("keywords", "active"),
+    "database_size_mb": ("database", "size_mb"),
+    "database_storage_mb": ("database", "storage_mb"),
+    "database_objects": ("database", "objects"),
+    "memory_mb": ("system", "memory_mb"),
+    "cpu_percent": ("system", "cpu_percent"),
+    "process_cpu_percent": ("system", "process_cpu_percent"),
+    "host_memory_percent": ("system", "host_memory_percent"),
+    "load_average": ("system", "load_average"),
+}
+
+# کالکشن هر وضوح؛ raw اسناد ساعتی با آرایه نمونه‌ها و بقیه تجمیع min/max/avg هر بازه هستند
+RESOLUTION_COLLECTIONS = {
+    "raw": "system_stats_raw",
+    "1h": "system_stats_1h",
+    "1d": "system_stats_1d",
+}
+
+# سند وضعیت rollup (نقطه اوج: شروع ساعتی که اجرای بعدی باید از آن دوباره محاسبه کند)
+ROLLUP_STATE_ID = "rollup"
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def flatten_sample(sample: Dict[str, Any]) -> Dict[str, float]:
+    """استخراج متریک‌های عددی یک نمونه آمار سیستم"""
+    point = {}
+    for name, (section, field) in STATS_METRICS.items():
+        value = (sample.get(section) or {}).get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            point[name] = value
+    return point
+
+
+def summarize(points: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    تجمیع نقاط خام به min/max/avg هر متریک
+
+    Returns:
+        dict: count و metrics (نام -> min، max، avg و count)
+    """
+    metrics: Dict[str, Dict[str, float]] = {}
+    for point in points:
+        for name, value in point.items():
+            if name not in STATS_METRICS:
+                continue
+            summary = metrics.setdefault(name, {"min": value, "max": value, "sum": 0.0, "count": 0})
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+            summary["sum"] += value
+            summary["count"] += 1
+
+    return {
+        "count": len(points),
+        "metrics": {
+            name: {
+                "min": summary["min"],
+                "max": summary["max"],
+                "avg": round(summary["sum"] / summary["count"], 4),
+                "count": summary["count"]
+            }
+            for name, summary in metrics.items()
+        }
+    }
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    ادغام تجمیع‌های چند بازه (میانگین وزن‌دار با تعداد نقاط)
+
+    Returns:
+        dict: تجمیع بازه بزرگ‌تر با همان ساختار summarize
+    """
+    metrics: Dict[str, Dict[str, float]] = {}
+    for summary in summaries:
+        for name, values in summary["metrics"].items():
+            merged = metrics.setdefault(name, {"min": values["min"], "max": values["max"], "sum": 0.0, "count": 0})
+            merged["min"] = min(merged["min"], values["min"])
+            merged["max"] = max(merged["max"], values["max"])
+            merged["sum"] += values["avg"] * values["count"]
+            merged["count"] += values["count"]
+
+    return {
+        "count": sum(summary["count"] for summary in summaries),
+        "metrics": {
+            name: {
+                "min": merged["min"],
+                "max": merged["max"],
+                "avg": round(merged["sum"] / merged["count"], 4) if merged["count"] else None,
+                "count": merged["count"]
+            }
+            for name, merged in metrics.items()
+        }
+    }
+
+
+class StatsSeries:
+    """
+    سری زمانی آمار سیستم در سه وضوح
+
+    - raw: هر نمونه به سند ساعتی system_stats_raw اضافه می‌شود ($push در یک سند به ازای هر ساعت)
+    - 1h و 1d: تجمیع min/max/avg هر ساعت و هر روز که rollup از وضوح پایین‌تر محاسبه و upsert می‌کند؛
+      rollup از نقطه اوج ذخیره شده در stats_rollup_state ادامه می‌دهد تا توقف job ساعتی را از دست ندهد
+    - هر وضوح TTL جداگانه دارد (SYSTEM_STATS_*_TTL_DAYS)
+    """
+
+    async def record(self, sample: Dict[str, Any]) -> Dict[str, float]:
+        """
+        افزودن یک نمونه به سند ساعتی raw
+
+        Returns:
+            dict: متریک‌های ثبت شده
+        """
+        timestamp = sample.get("timestamp") or datetime.utcnow()
+        point = flatten_sample(sample)
+        await get_collection(RESOLUTION_COLLECTIONS["raw"]).update_one(
+            {"start": hour_start(timestamp)},
+            {
+                "$push": {"samples": {"timestamp": timestamp, **point}},
+                "$inc": {"count": 1},
+                "$max": {"last": timestamp}
+            },
+            upsert=True
+        )
+        return point
+
+    async def rollup(self, now: Optional[datetime] = None, lookback_hours: int = 2) -> Dict[str, int]:
+        """
+        محاسبه دوباره تجمیع ساعت‌ها و روزها از نقطه اوج اجرای قبلی (بازه جاری ناقص است و در اجرای
+        بعدی بازنویسی می‌شود)
+
+        بدون نقطه اوج ذخیره شده همه اسناد raw تجمیع می‌شوند.
+
+        Args:
+            lookback_hours: حداقل ساعت‌های کامل قبلی که دوباره محاسبه می‌شوند (برای نمونه‌های دیررس)
+
+        Returns:
+            dict: تعداد اسناد ساعتی و روزانه به‌روزرسانی شده
+        """
+        now = now or datetime.utcnow()
+        state_collection = get_collection("stats_rollup_state")
+        state = await state_collection.find_one({"_id": ROLLUP_STATE_ID}) or {}
+
+        since_hour = hour_start(now) - timedelta(hours=lookback_hours)
+        if state.get("next_hour") is None:
+            raw_query: Dict[str, Any] = {}
+        else:
+            since_hour = min(since_hour, state["next_hour"])
+            raw_query = {"start": {"$gte": since_hour}}
+
+        hourly_operations = []
+        async for bucket in get_collection(RESOLUTION_COLLECTIONS["raw"]).find(raw_query):
+            summary = summarize([
+                {name: value for name, value in point.items() if name != "timestamp"}
+                for point in bucket.get("samples", [])
+            ])
+            hourly_operations.append(UpdateOne(
+                {"start": bucket["start"]},
+                {"$set": {**summary, "updated_at": now}},
+                upsert=True
+            ))
+        if hourly_operations:
+            await get_collection(RESOLUTION_COLLECTIONS["1h"]).bulk_write(hourly_operations, ordered=False)
+
+        # روزهایی که ساعت‌های به‌روز شده در آنها هستند
+        hour_query = {"start": {"$gte": day_start(since_hour)}} if raw_query else {}
+        hours = await get_collection(RESOLUTION_COLLECTIONS["1h"]).find(hour_query).to_list(length=None)
+
+        by_day: Dict[datetime, List[Dict[str, Any]]] = {}
+        for hour in hours:
+            by_day.setdefault(day_start(hour["start"]), []).append(hour)
+
+        daily_operations = [
+            UpdateOne({"start": day}, {"$set": {**merge_summaries(day_hours), "updated_at": now}}, upsert=True)
+            for day, day_hours in by_day.items()
+        ]
+        if daily_operations:
+            await get_collection(RESOLUTION_COLLECTIONS["1d"]).bulk_write(daily_operations, ordered=False)
+
+        # نقطه اوج پس از نوشتن موفق جلو می‌رود؛ ساعت جاری هنوز ناقص است
+        await state_collection.update_one(
+            {"_id": ROLLUP_STATE_ID},
+            {"$set": {"next_hour": hour_start(now), "updated_at": now}},
+            upsert=True
+        )
+
+        return {"hours": len(hourly_operations), "days": len(daily_operations)}
+
+    async def history(self, resolution: str, start: datetime, end: datetime,
+                      metrics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        نقاط سری زمانی یک وضوح در یک بازه
+
+        Args:
+            resolution: raw، 1h یا 1d
+            metrics: نام متریک‌ها (None برای همه)
+
+        Returns:
+            list: برای raw مقدار هر متریک و برای تجمیع‌ها min/max/avg هر متریک، به ترتیب زمان
+        """
+        collection = get_collection(RESOLUTION_COLLECTIONS[resolution], ANALYTICS_PROFILE)
+        selected = set(metrics or STATS_METRICS)
+
+        if resolution == "raw":
+            points = []
+            cursor = collection.find({"start": {"$gte": hour_start(start), "$lte": end}}).sort("start", 1)
+            async for bucket in cursor:
+                for sample in bucket.get("samples", []):
+                    if start <= sample["timestamp"] <= end:
+                        points.append({
+                            "timestamp": sample["timestamp"],
+                            **{name: value for name, value in sample.items() if name in selected}
+                        })
+            return points
+
+        cursor = collection.find({"start": {"$gte": start, "$lte": end}}).sort("start", 1)
+        return [
+            {
+                "timestamp": bucket["start"],
+                "count": bucket.get("count", 0),
+                **{
+                    name: {key: values[key] for key in ("min", "max", "avg")}
+                    for name, values in bucket.get("metrics", {}).items() if name in selected
+                }
+            }
+            async for bucket in cursor
+        ]
+
+
+# نمونه سینگلتون
+stats_series = StatsSeries()
@@ -0,0 +1,141 @@
+import os
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+import psutil
+
+from app.core.config import settings
+from app.core.db import get_collection, get_database_stats, ANALYTICS_PROFILE
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.system_sampler")
+
+MB = 1024 * 1024
+
+
+def host_metrics(process: psutil.Process) -> Dict[str, Any]:
+    """
+    متریک‌های پروسه و میزبان بدون انتظار
+
+    cpu_percent با interval=None درصد مصرف از فراخوانی قبلی را برمی‌گرداند؛ نمونه‌بردار دوره‌ای آن را صدا می‌زند.
+    """
+    memory = psutil.virtual_memory()
+    with process.oneshot():
+        return {
+            "memory_mb": round(process.memory_info().rss / MB, 2),
+            "process_cpu_percent": process.cpu_percent(interval=None),
+            "threads": process.num_threads(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "host_memory_percent": memory.percent,
+            "load_average": round(os.getloadavg()[0], 2) if hasattr(os, "getloadavg") else None
+        }
+
+
+class SystemSampler:
+    """
+    نمونه‌برداری دوره‌ای آمار سیستم در پس‌زمینه
+
+    آمار دیتابیس، شمارش توییت‌ها و کلمات کلیدی و متریک‌های پروسه با asyncio.gather به صورت همزمان
+    جمع‌آوری و در یک بافر حلقوی نگه داشته می‌شوند؛ endpointها آخرین نمونه را بدون انتظار می‌خوانند.
+    """
+
+    def __init__(self, interval: float, history_size: int):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=history_size)
+        self._process = psutil.Process(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+
+    async def _tweet_counts(self) -> Dict[str, int]:
+        tweets_collection = get_collection("tweets", ANALYTICS_PROFILE)
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        # تعداد کل از متادیتای کالکشن (بدون پیمایش)؛ بازه‌های زمانی با ایندکس created_at شمارش می‌شوند
+        total, today, last_24h = await asyncio.gather(
+            tweets_collection.estimated_document_count(),
+            tweets_collection.count_documents({"created_at": {"$gte": today_start}}),
+            tweets_collection.count_documents({"created_at": {"$gte": datetime.utcnow() - timedelta(hours=24)}})
+        )
+        return {"total": total, "today": today, "last_24h": last_24h}
+
+    async def _keyword_counts(self) -> Dict[str, int]:
+        keywords_collection = get_collection("keywords", ANALYTICS_PROFILE)
+        total, active = await asyncio.gather(
+            keywords_collection.count_documents({}),
+            keywords_collection.count_documents({"is_active": True})
+        )
+        return {"total": total, "active": active}
+
+    async def sample(self) -> Dict[str, Any]:
+        """
+        جمع‌آوری یک نمونه و افزودن آن به بافر
+
+        Returns:
+            dict: آمار دیتابیس، توییت‌ها، کلمات کلیدی و سیستم
+        """
+        db_stats, tweets, keywords = await asyncio.gather(
+            get_database_stats(), self._tweet_counts(), self._keyword_counts()
+        )
+        sample = {
+            "database": {
+                "size_mb": round(db_stats["database_size"] / MB, 2),
+                "storage_mb": round(db_stats["storage_size"] / MB, 2),
+                "collections": db_stats["collections"],
+                "objects": db_stats["objects"],
+                "collections_stats": db_stats["collections_stats"]
+            },
+            "tweets": tweets,
+            "keywords": keywords,
+            "system": host_metrics(self._process),
+            "timestamp": datetime.utcnow()
+        }
+        self.record(sample)
+        return sample
+
+    def record(self, sample: Dict[str, Any]) -> None:
+        """افزودن نمونه به بافر حلقوی"""
+        self._samples.append(sample)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """آخرین نمونه (None پیش از اولین نمونه‌برداری)"""
+        return self._samples[-1] if self._samples else None
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """نمونه‌های اخیر از جدید به قدیم"""
+        samples = list(reversed(self._samples))
+        return samples[:limit] if limit else samples
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """آخرین نمونه یا در صورت نبود، یک نمونه تازه"""
+        return self.latest() or await self.sample()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system stats: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """شروع نمونه‌برداری"""
+        if self._task is None or self._task.done():
+            # مقداردهی اولیه شمارنده‌های cpu_percent
+            self._process.cpu_percent(interval=None)
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run())
+            logger.info("System stats sampler started")
+
+    async def stop(self) -> None:
+        """توقف نمونه‌برداری"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# نمونه سینگلتون
+system_sampler = SystemSampler(settings.SYSTEM_SAMPLER_INTERVAL_SECONDS, settings.SYSTEM_SAMPLER_HISTORY)
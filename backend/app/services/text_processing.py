@@ -0,0 +1,135 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+from app.core.config import settings
+
+# یکسان‌سازی حروف عربی با معادل فارسی و ارقام فارسی/عربی با ارقام لاتین
+_CHARACTER_MAP = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4",
+    "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+
+# اعراب، تنوین، کشیده و نویسه‌های کنترلی جهت متن
+_DIACRITICS_RE = re.compile("[\u064B-\u065F\u0670\u06D6-\u06ED\u0640\u200E\u200F\u202A-\u202E]")
+
+# نیم‌فاصله و نویسه‌های هم‌خانواده؛ حذف می‌شوند تا «می‌روم» و «میروم» یکسان شوند
+_ZWNJ_RE = re.compile("[\u200C\u200D\u00AD\uFEFF]")
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+_MENTION_RE = re.compile(r"@\w+")
+_TOKEN_RE = re.compile(r"\w+")
+
+# کلمات پرتکرار فارسی و انگلیسی که ارزش جستجو ندارند (به شکل نرمال شده)
+STOPWORDS = frozenset("""
+و در به از که این آن با را برای تا یا هم نیز اما اگر چون چه هر همه ما من تو او شما ایشان آنها
+است هست بود شد شده شود میشود کرد کرده کند میکند باشد بوده دارد داشت خواهد نمی نه
+یک دو بر پس پیش روی زیر بین درباره مثل همین همان چنین چند کی کجا چرا چطور
+ای های ها رو هی دیگه دیگر خیلی فقط حتی باید نباید ولی بی
+a an the and or but if of to in on at by for with from as is are was were be been being
+it its this that these those i you he she we they me him her us them my your our their
+not no do does did so than too very can will just rt amp via
+""".split())
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    نرمال‌سازی متن فارسی/انگلیسی برای جستجو
+
+    - یکسان‌سازی ی/ک عربی، ارقام فارسی و عربی
+    - حذف اعراب، کشیده و نیم‌فاصله
+    - حذف لینک‌ها و منشن‌ها و تبدیل به حروف کوچک
+
+    Args:
+        text: متن خام
+
+    Returns:
+        str: متن نرمال شده
+    """
+    if not text:
+        return ""
+
+    text = unicodedata.normalize("NFKC", text)
+    text = _URL_RE.sub(" ", text)
+    text = _MENTION_RE.sub(" ", text)
+    text = text.translate(_CHARACTER_MAP)
+    text = _DIACRITICS_RE.sub("", text)
+    text = _ZWNJ_RE.sub("", text)
+
+    return text.lower()
+
+
+def split_words(text: Optional[str]) -> List[str]:
+    """
+    همه کلمات متن نرمال شده به ترتیب (با کلمات توقف، برای تحلیل‌هایی مانند احساسات که به نفی و قیدها نیاز دارند)
+
+    Args:
+        text: متن خام
+
+    Returns:
+        list: کلمات
+    """
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    تبدیل متن به توکن‌های نرمال شده (با حفظ ترتیب و تکرار، بدون کلمات توقف)
+
+    Args:
+        text: متن خام
+
+    Returns:
+        list: توکن‌ها
+    """
+    return [
+        token for token in split_words(text)
+        if len(token) >= settings.SEARCH_TOKEN_MIN_LENGTH
+        and token not in STOPWORDS
+        and token.replace("_", "")
+    ]
+
+
+def build_search_tokens(text: Optional[str]) -> List[str]:
+    """
+    ساخت آرایه فشرده توکن‌های جستجو برای ذخیره در توییت (یکتا و با سقف تعداد)
+
+    Args:
+        text: متن توییت
+
+    Returns:
+        list: توکن‌های یکتا به ترتیب ظهور
+    """
+    tokens = list(dict.fromkeys(tokenize(text)))
+    return tokens[:settings.SEARCH_TOKENS_MAX]
+
+
+def build_search_query(search_text: Optional[str]) -> dict:
+    """
+    تبدیل عبارت جستجو به فیلتر روی search_tokens با همان نرمال‌سازی زمان ذخیره
+
+    Args:
+        search_text: عبارت جستجوی کاربر
+
+    Returns:
+        dict: فیلتر MongoDB (همه توکن‌ها باید وجود داشته باشند)؛
+              اگر پس از نرمال‌سازی توکنی باقی نماند، فیلتری که هیچ سندی را برنمی‌گرداند
+    """
+    tokens = list(dict.fromkeys(tokenize(search_text)))
+    if not tokens:
+        return {"search_tokens": {"$in": []}}
+    if len(tokens) == 1:
+        return {"search_tokens": tokens[0]}
+    return {"search_tokens": {"$all": tokens}}
@@ -0,0 +1,353 @@
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne, ReplaceOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.services.text_processing import tokenize
+
+logger = get_logger("app.services.topics")
+
+
+class SparseRows:
+    """ماتریس تنک سطری (CSR) بردارهای TF-IDF نرمال شده یک دسته"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, positions: List[int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        # شماره سند ورودی متناظر هر سطر (اسناد بدون کلمه در واژگان حذف می‌شوند)
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def dot(self, centroids: np.ndarray) -> np.ndarray:
+        """ضرب سطرها در مراکز خوشه‌ها (n × k) بدون ساخت ماتریس متراکم"""
+        contributions = self.data[:, None] * centroids[:, self.indices].T
+        return np.add.reduceat(contributions, self.indptr[:-1], axis=0)
+
+
+class TopicModel:
+    """
+    مدل موضوعات یک کلمه کلیدی در یک بازه زمانی: TF-IDF تنک و k-means کروی مینی‌بچ
+
+    واژگان با ورود اسناد جدید (تا TOPIC_MAX_FEATURES) رشد می‌کند و IDF از فراوانی اسناد
+    مشاهده شده محاسبه می‌شود؛ هر دسته مراکز را با نرخ یادگیری 1/تعداد اعضا جابه‌جا می‌کند.
+    """
+
+    def __init__(self, keyword: str, window_start: datetime):
+        self.keyword = keyword
+        self.window_start = window_start
+        self.vocabulary: Dict[str, int] = {}
+        self.document_frequency: List[int] = []
+        self.documents = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.counts: List[int] = []
+
+    def _index_tokens(self, tokens: List[str]) -> List[int]:
+        indices = []
+        for token in dict.fromkeys(tokens):
+            index = self.vocabulary.get(token)
+            if index is None:
+                if len(self.vocabulary) >= settings.TOPIC_MAX_FEATURES:
+                    continue
+                index = self.vocabulary[token] = len(self.vocabulary)
+                self.document_frequency.append(0)
+            indices.append(index)
+        return indices
+
+    def vectorize(self, documents: List[List[str]]) -> SparseRows:
+        """
+        ثبت اسناد در واژگان و فراوانی اسناد و ساخت بردارهای TF-IDF نرمال شده
+
+        Args:
+            documents: توکن‌های هر سند
+        """
+        indexed = [self._index_tokens(tokens) for tokens in documents]
+        positions = [position for position, indices in enumerate(indexed) if indices]
+        rows = [indexed[position] for position in positions]
+        for indices in rows:
+            for index in indices:
+                self.document_frequency[index] += 1
+        self.documents += len(rows)
+
+        frequency = np.asarray(self.document_frequency, dtype=np.float32)
+        idf = np.log((1 + self.documents) / (1 + frequency)) + 1
+
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(indices) for indices in rows], out=indptr[1:])
+        indices = np.fromiter((index for row in rows for index in row), dtype=np.int64, count=int(indptr[-1]))
+        data = idf[indices]
+
+        # نرمال‌سازی L2 هر سطر
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1]))
+        data /= np.repeat(norms, np.diff(indptr))
+
+        if self.centroids is not None and self.centroids.shape[1] < len(self.vocabulary):
+            padding = len(self.vocabulary) - self.centroids.shape[1]
+            self.centroids = np.pad(self.centroids, ((0, 0), (0, padding)))
+
+        return SparseRows(indptr, indices, data.astype(np.float32), positions)
+
+    def _seed(self, rows: SparseRows) -> None:
+        """
+        افزودن مراکز با روش دورترین نقطه تا TOPIC_CLUSTERS مرکز
+
+        اگر دسته اول بازه کوچک باشد مراکز کمتری ساخته می‌شود؛ دسته‌های بعدی از اسنادی که شباهت آنها
+        به همه مراکز موجود کمتر از TOPIC_SEED_MAX_SIMILARITY است مراکز باقی‌مانده را می‌سازند.
+        """
+        existing = len(self.counts) if self.centroids is not None else 0
+        missing = min(settings.TOPIC_CLUSTERS - existing, len(rows))
+        if missing <= 0:
+            return
+
+        if self.centroids is None:
+            self.centroids = np.zeros((0, len(self.vocabulary)), dtype=np.float32)
+            best = None
+        else:
+            best = rows.dot(self.centroids).max(axis=1)
+
+        for cluster in range(existing, existing + missing):
+            position = 0 if best is None else int(np.argmin(best))
+            if existing and best[position] >= settings.TOPIC_SEED_MAX_SIMILARITY:
+                break
+            centroid = np.zeros((1, len(self.vocabulary)), dtype=np.float32)
+            indices, data = rows.row(position)
+            centroid[0, indices] = data
+            self.centroids = np.vstack([self.centroids, centroid])
+            self.counts.append(0)
+            similarity = rows.dot(centroid)[:, 0]
+            best = similarity if best is None else np.maximum(best, similarity)
+
+    def partial_fit(self, rows: SparseRows) -> np.ndarray:
+        """
+        به‌روزرسانی مراکز با یک دسته
+
+        Returns:
+            ndarray: شباهت کسینوسی هر سند با هر مرکز پیش از به‌روزرسانی (n × k)
+        """
+        self._seed(rows)
+
+        similarities = rows.dot(self.centroids)
+        assigned = np.argmax(similarities, axis=1)
+        touched = set()
+        for position, cluster in enumerate(assigned):
+            self.counts[cluster] += 1
+            rate = 1.0 / self.counts[cluster]
+            indices, data = rows.row(position)
+            self.centroids[cluster] *= (1 - rate)
+            self.centroids[cluster, indices] += rate * data
+            touched.add(cluster)
+
+        for cluster in touched:
+            norm = np.linalg.norm(self.centroids[cluster])
+            if norm:
+                self.centroids[cluster] /= norm
+
+        return similarities
+
+    def topic_id(self, cluster: int) -> str:
+        return f"{self.keyword}:{self.window_start:%Y%m%d%H}:{cluster}"
+
+    def descriptors(self) -> List[Dict[str, Any]]:
+        """توصیف موضوعات: پروزن‌ترین کلمات هر مرکز"""
+        terms = np.array(sorted(self.vocabulary, key=self.vocabulary.get))
+        descriptors = []
+        for cluster, centroid in enumerate(self.centroids):
+            if not self.counts[cluster]:
+                continue
+            top = np.argsort(centroid)[::-1][:settings.TOPIC_TOP_TERMS]
+            top_terms = [
+                {"term": str(terms[index]), "weight": round(float(centroid[index]), 4)}
+                for index in top if centroid[index] > 0
+            ]
+            descriptors.append({
+                "_id": self.topic_id(cluster),
+                "keyword": self.keyword,
+                "window_start": self.window_start,
+                "cluster": cluster,
+                "label": "، ".join(term["term"] for term in top_terms[:3]),
+                "terms": top_terms,
+                "size": self.counts[cluster],
+                "updated_at": datetime.utcnow()
+            })
+        return descriptors
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "keyword": self.keyword,
+            "window_start": self.window_start,
+            "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get),
+            "document_frequency": self.document_frequency,
+            "documents": self.documents,
+            "centroids": self.centroids.astype(np.float32).tobytes() if self.centroids is not None else None,
+            "clusters": len(self.counts),
+            "counts": self.counts,
+            "updated_at": datetime.utcnow()
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "TopicModel":
+        model = cls(document["keyword"], document["window_start"])
+        model.vocabulary = {term: index for index, term in enumerate(document["vocabulary"])}
+        model.document_frequency = list(document["document_frequency"])
+        model.documents = document["documents"]
+        model.counts = list(document["counts"])
+        if document.get("centroids") is not None:
+            model.centroids = np.frombuffer(bytes(document["centroids"]), dtype=np.float32).reshape(
+                document["clusters"], -1
+            ).copy()
+        return model
+
+
+class TopicExtractor:
+    """
+    استخراج دوره‌ای موضوعات توییت‌ها به تفکیک کلمه کلیدی و بازه TOPIC_WINDOW_HOURS ساعته
+
+    - فقط توییت‌های ذخیره شده پس از اجرای قبلی (_id بزرگ‌تر از نقطه ثبت شده در topic_state) پردازش می‌شوند
+    - هر دسته TOPIC_BATCH_SIZE توییت مدل بازه خود را به‌روز می‌کند و توییت‌ها موضوعات برتر خود را می‌گیرند
+    - مدل‌ها در topic_models و توصیف موضوعات در topics ذخیره می‌شوند
+    """
+
+    def _window_start(self, created_at: datetime) -> datetime:
+        window_seconds = settings.TOPIC_WINDOW_HOURS * 3600
+        timestamp = (created_at - datetime(1970, 1, 1)).total_seconds()
+        return datetime(1970, 1, 1) + timedelta(seconds=int(timestamp // window_seconds) * window_seconds)
+
+    async def _load_model(self, models: Dict[Tuple[str, datetime], TopicModel],
+                          keyword: str, window_start: datetime) -> TopicModel:
+        key = (keyword, window_start)
+        if key not in models:
+            document = await get_collection("topic_models").find_one({"keyword": keyword, "window_start": window_start})
+            models[key] = TopicModel.from_document(document) if document else TopicModel(keyword, window_start)
+        return models[key]
+
+    async def _process_batch(self, models: Dict[Tuple[str, datetime], TopicModel], keyword: str,
+                             tweets: List[Dict[str, Any]]) -> int:
+        """به‌روزرسانی مدل‌ها با یک دسته و نوشتن موضوعات توییت‌ها"""
+        excluded = set(tokenize(keyword))
+        by_window: Dict[datetime, List[Tuple[Any, List[str]]]] = {}
+        for tweet in tweets:
+            # نسخه‌های تکراری مدل را به سمت یک متن منحرف می‌کنند
+            if tweet.get("is_duplicate"):
+                continue
+            tokens = [token for token in tweet.get("search_tokens", []) if token not in excluded and not token.isdigit()]
+            if len(tokens) >= settings.TOPIC_MIN_TOKENS:
+                by_window.setdefault(self._window_start(tweet["created_at"]), []).append((tweet["_id"], tokens))
+
+        operations = []
+        for window_start, documents in by_window.items():
+            model = await self._load_model(models, keyword, window_start)
+            rows = model.vectorize([tokens for _, tokens in documents])
+            if not len(rows):
+                continue
+            similarities = model.partial_fit(rows)
+
+            for position, scores in zip(rows.positions, similarities):
+                tweet_id = documents[position][0]
+                best = np.argsort(scores)[::-1][:settings.TOPICS_PER_TWEET]
+                topics = [model.topic_id(int(cluster)) for cluster in best if scores[cluster] >= settings.TOPIC_MIN_SIMILARITY]
+                operations.append(UpdateOne({"_id": tweet_id}, {"$addToSet": {"topics": {"$each": topics}}}))
+
+        if operations:
+            await get_collection("tweets").bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def _save(self, models: Dict[Tuple[str, datetime], TopicModel]) -> None:
+        model_operations = []
+        topic_operations = []
+        for model in models.values():
+            if model.centroids is None:
+                continue
+            model_operations.append(ReplaceOne(
+                {"keyword": model.keyword, "window_start": model.window_start},
+                model.to_document(),
+                upsert=True
+            ))
+            for descriptor in model.descriptors():
+                topic_operations.append(ReplaceOne({"_id": descriptor["_id"]}, descriptor, upsert=True))
+
+        if model_operations:
+            await get_collection("topic_models").bulk_write(model_operations, ordered=False)
+        if topic_operations:
+            await get_collection("topics").bulk_write(topic_operations, ordered=False)
+
+    async def run(self, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        استخراج موضوعات توییت‌های جدید
+
+        Args:
+            keywords: کلمات کلیدی (None برای همه کلمات کلیدی فعال)
+
+        Returns:
+            dict: تعداد توییت‌های بررسی و برچسب‌گذاری شده به تفکیک کلمه کلیدی
+        """
+        if keywords is None:
+            cursor = get_collection("keywords").find({"is_active": True}, {"keyword": 1})
+            keywords = [document["keyword"] async for document in cursor]
+
+        state_collection = get_collection("topic_state")
+        tweets_collection = get_collection("tweets")
+        batch_size = settings.TOPIC_BATCH_SIZE
+        since_default = datetime.utcnow() - timedelta(hours=settings.TOPIC_WINDOW_HOURS)
+
+        results = {}
+        for keyword in keywords:
+            state = await state_collection.find_one({"_id": keyword})
+            last_id = state["last_tweet_id"] if state else ObjectId.from_datetime(since_default)
+
+            models: Dict[Tuple[str, datetime], TopicModel] = {}
+            seen = 0
+            labelled = 0
+            for _ in range(settings.TOPIC_MAX_BATCHES):
+                tweets = await tweets_collection.find(
+                    {"keywords": keyword, "_id": {"$gt": last_id}},
+                    {"_id": 1, "search_tokens": 1, "created_at": 1, "is_duplicate": 1}
+                ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+                if not tweets:
+                    break
+
+                labelled += await self._process_batch(models, keyword, tweets)
+                seen += len(tweets)
+                last_id = tweets[-1]["_id"]
+
+            await self._save(models)
+            await state_collection.update_one(
+                {"_id": keyword},
+                {"$set": {"last_tweet_id": last_id, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            results[keyword] = {"tweets": seen, "labelled": labelled, "windows": len(models)}
+
+        logger.info(f"Topic extraction processed {sum(result['tweets'] for result in results.values())} tweets")
+        return results
+
+    async def get_topics(self, keyword: Optional[str], since: datetime, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        دریافت توصیف موضوعات بازه‌های اخیر به ترتیب اندازه
+
+        Returns:
+            list: موضوعات با کلمات برتر و تعداد توییت‌ها
+        """
+        query: Dict[str, Any] = {"window_start": {"$gte": self._window_start(since)}}
+        if keyword:
+            query["keyword"] = keyword
+
+        cursor = get_collection("topics").find(query).sort([("window_start", -1), ("size", -1)]).limit(limit)
+        topics = []
+        async for topic in cursor:
+            topic["id"] = topic.pop("_id")
+            topics.append(topic)
+        return topics
+
+
+# نمونه سینگلتون
+topic_extractor = TopicExtractor()
@@ -0,0 +1,330 @@
+import os
+import time
+import uuid
+import socket
+import hashlib
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Set
+import numpy as np
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+from app.services.text_processing import tokenize
+
+logger = get_logger("app.services.trending")
+
+TREND_KINDS = ("terms", "hashtags")
+
+
+def _hash_indexes(item: str, width: int, depth: int) -> List[int]:
+    """محاسبه ستون هر سطر Count-Min Sketch با یک هش پایدار"""
+    digest = hashlib.blake2b(item.encode("utf-8"), digest_size=4 * depth).digest()
+    return [int.from_bytes(digest[row * 4:(row + 1) * 4], "little") % width for row in range(depth)]
+
+
+class CountMinSketch:
+    """Count-Min Sketch با شمارنده‌های 32 بیتی (قابل ادغام با جمع)"""
+
+    def __init__(self, width: int, depth: int, counts: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array("I", bytes(4 * width * depth))
+
+    def add(self, indexes: List[int], count: int = 1) -> None:
+        for row, column in enumerate(indexes):
+            self.counts[row * self.width + column] += count
+
+    def estimate(self, indexes: List[int]) -> int:
+        return min(self.counts[row * self.width + column] for row, column in enumerate(indexes))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """ادغام با جمع شمارنده‌ها (ابعاد باید یکسان باشد)"""
+        merged = np.frombuffer(self.counts, dtype=np.uint32) + np.frombuffer(other.counts, dtype=np.uint32)
+        self.counts = array("I", merged.astype(np.uint32).tobytes())
+
+    def to_bytes(self) -> bytes:
+        return self.counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, width: int, depth: int) -> "CountMinSketch":
+        counts = array("I")
+        counts.frombytes(bytes(data))
+        return cls(width, depth, counts)
+
+
+class SpaceSaving:
+    """الگوریتم Space-Saving برای نگهداری K مورد پرتکرار با حافظه ثابت"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # item -> [count, error]
+        self.counters: Dict[str, List[int]] = {}
+
+    def add(self, item: str, count: int = 1) -> None:
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            # جایگزینی کم‌تکرارترین مورد؛ شمارش قبلی آن به عنوان خطا ثبت می‌شود
+            minimum = min(self.counters, key=lambda key: self.counters[key][0])
+            min_count = self.counters.pop(minimum)[0]
+            self.counters[item] = [min_count + count, min_count]
+
+    def items(self) -> Iterable[str]:
+        return self.counters.keys()
+
+
+class TrendBucket:
+    """
+    آمار یک بازه زمانی برای یک کلمه کلیدی و نوع (کلمات یا هشتگ‌ها)
+
+    cms و top فقط شمارش همین پروسه هستند و ذخیره می‌شوند؛ base و base_items شمارش بازیابی شده
+    سایر پروسه‌ها و اجراهای قبلی است که فقط در تخمین‌ها جمع می‌شود.
+    """
+
+    def __init__(self, start: int, cms: Optional[CountMinSketch] = None, top: Optional[SpaceSaving] = None):
+        self.start = start
+        self.cms = cms or CountMinSketch(settings.TRENDING_CMS_WIDTH, settings.TRENDING_CMS_DEPTH)
+        self.top = top or SpaceSaving(settings.TRENDING_TOP_K)
+        self.total = 0
+        self.dirty = True
+        self.base: Optional[CountMinSketch] = None
+        self.base_items: Set[str] = set()
+
+    def estimate(self, indexes: List[int]) -> int:
+        count = self.cms.estimate(indexes)
+        if self.base is not None:
+            count += self.base.estimate(indexes)
+        return count
+
+    def items(self) -> Set[str]:
+        return set(self.top.items()) | self.base_items
+
+
+class TrendingEngine:
+    """
+    موتور جریانی موضوعات داغ به تفکیک کلمه کلیدی
+
+    - هر کلمه کلیدی و نوع، بازه‌های زمانی TRENDING_BUCKET_MINUTES دقیقه‌ای دارد
+    - هر بازه یک Count-Min Sketch برای تخمین تکرار و یک Space-Saving برای کاندیدهای پرتکرار دارد
+    - پنجره لغزان از جمع بازه‌ها محاسبه و با پنجره قبلی برای رشد مقایسه می‌شود
+    - هر پروسه شمارش خود را با کلید node جداگانه در trending_snapshots ذخیره می‌کند، پس پروسه‌ها
+      داده یکدیگر را بازنویسی نمی‌کنند؛ پس از راه‌اندازی اسناد همه نودها با جمع ادغام می‌شوند
+    """
+
+    def __init__(self):
+        # شناسه یکتای هر اجرا (pid در کانتینر پس از راه‌اندازی مجدد تکرار می‌شود)
+        self.node = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.bucket_seconds = settings.TRENDING_BUCKET_MINUTES * 60
+        self.retention_seconds = settings.TRENDING_RETENTION_MINUTES * 60
+        self._series: Dict[Tuple[str, str], Dict[int, TrendBucket]] = {}
+        self._version = 0
+        self._cache: Dict[Tuple[Any, ...], Tuple[int, int, List[Dict[str, Any]]]] = {}
+
+    def _bucket_start(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def record(self, keyword: str, kind: str, items: List[str], created_at: Optional[datetime] = None) -> None:
+        """
+        ثبت موارد یک توییت
+
+        Args:
+            keyword: کلمه کلیدی
+            kind: terms یا hashtags
+            items: توکن‌ها یا هشتگ‌های نرمال شده
+            created_at: زمان توییت (UTC)
+        """
+        if not items:
+            return
+
+        now = time.time()
+        timestamp = created_at.replace(tzinfo=timezone.utc).timestamp() if created_at else now
+        if timestamp < now - self.retention_seconds:
+            return
+
+        buckets = self._series.setdefault((keyword, kind), {})
+        start = self._bucket_start(min(timestamp, now))
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = TrendBucket(start)
+            self._prune(buckets, now)
+
+        width, depth = bucket.cms.width, bucket.cms.depth
+        for item in items:
+            bucket.cms.add(_hash_indexes(item, width, depth))
+            bucket.top.add(item)
+        bucket.total += len(items)
+        bucket.dirty = True
+        self._version += 1
+
+    def _prune(self, buckets: Dict[int, TrendBucket], now: float) -> None:
+        cutoff = now - self.retention_seconds
+        for start in [start for start in buckets if start + self.bucket_seconds < cutoff]:
+            del buckets[start]
+
+    def top(self, keyword: Optional[str] = None, kind: str = "terms", window_minutes: int = 60,
+            limit: int = 20, sort_by: str = "count") -> List[Dict[str, Any]]:
+        """
+        موارد داغ پنجره اخیر
+
+        Args:
+            keyword: کلمه کلیدی (None برای همه کلمات کلیدی)
+            kind: terms یا hashtags
+            window_minutes: طول پنجره
+            limit: تعداد نتایج
+            sort_by: count (تکرار در پنجره) یا growth (نسبت به پنجره قبلی)
+
+        Returns:
+            list: موارد با تکرار تخمینی، تکرار پنجره قبلی و ضریب رشد
+        """
+        now = time.time()
+        current_bucket = self._bucket_start(now)
+        cache_key = (keyword, kind, window_minutes, limit, sort_by)
+        cached = self._cache.get(cache_key)
+        if cached and cached[0] == self._version and cached[1] == current_bucket:
+            return cached[2]
+
+        window_seconds = window_minutes * 60
+        window_start = now - window_seconds
+        previous_start = window_start - window_seconds
+
+        series = {
+            series_keyword: buckets for (series_keyword, series_kind), buckets in self._series.items()
+            if series_kind == kind and (keyword is None or series_keyword == keyword)
+        }
+        current = [
+            bucket for buckets in series.values() for bucket in buckets.values()
+            if bucket.start + self.bucket_seconds > window_start
+        ]
+        previous = [
+            bucket for buckets in series.values() for bucket in buckets.values()
+            if previous_start < bucket.start + self.bucket_seconds <= window_start
+        ]
+
+        # کلمات خود کلمه کلیدی همیشه پرتکرارند و موضوع داغ محسوب نمی‌شوند
+        excluded = {token for series_keyword in series for token in tokenize(series_keyword)}
+        candidates = {item for bucket in current for item in bucket.items()} - excluded
+
+        results = []
+        for item in candidates:
+            # ستون‌ها فقط یک بار برای هر ابعاد sketch محاسبه می‌شوند
+            indexes: Dict[Tuple[int, int], List[int]] = {}
+
+            def estimate(bucket: TrendBucket) -> int:
+                shape = (bucket.cms.width, bucket.cms.depth)
+                if shape not in indexes:
+                    indexes[shape] = _hash_indexes(item, *shape)
+                return bucket.estimate(indexes[shape])
+
+            count = sum(estimate(bucket) for bucket in current)
+            previous_count = sum(estimate(bucket) for bucket in previous)
+            results.append({
+                "item": item,
+                "count": count,
+                "previous_count": previous_count,
+                "growth": round((count + 1) / (previous_count + 1), 3)
+            })
+
+        sort_field = "growth" if sort_by == "growth" else "count"
+        results.sort(key=lambda result: (result[sort_field], result["count"]), reverse=True)
+        results = results[:limit]
+
+        if len(self._cache) >= 1000:
+            self._cache.clear()
+        self._cache[cache_key] = (self._version, current_bucket, results)
+        return results
+
+    async def snapshot(self) -> int:
+        """
+        ذخیره بازه‌های تغییر یافته در MongoDB
+
+        Returns:
+            int: تعداد بازه‌های ذخیره شده
+        """
+        now = time.time()
+        operations = []
+        flushed = []
+
+        for (keyword, kind), buckets in self._series.items():
+            self._prune(buckets, now)
+            for bucket in buckets.values():
+                if not bucket.dirty:
+                    continue
+                bucket_start = datetime.utcfromtimestamp(bucket.start)
+                operations.append(ReplaceOne(
+                    {"keyword": keyword, "kind": kind, "bucket_start": bucket_start, "node": self.node},
+                    {
+                        "keyword": keyword,
+                        "kind": kind,
+                        "bucket_start": bucket_start,
+                        "node": self.node,
+                        "width": bucket.cms.width,
+                        "depth": bucket.cms.depth,
+                        "cms": bucket.cms.to_bytes(),
+                        "top": [[item, counter[0], counter[1]] for item, counter in bucket.top.counters.items()],
+                        "total": bucket.total,
+                        "updated_at": datetime.utcnow()
+                    },
+                    upsert=True
+                ))
+                flushed.append(bucket)
+
+        if operations:
+            # پرچم پیش از نوشتن پاک می‌شود تا add() هم‌زمان با نوشتن بازه را دوباره تغییر یافته علامت بزند
+            for bucket in flushed:
+                bucket.dirty = False
+            try:
+                await get_collection("trending_snapshots").bulk_write(operations, ordered=False)
+            except Exception:
+                for bucket in flushed:
+                    bucket.dirty = True
+                raise
+
+        return len(operations)
+
+    async def restore(self) -> int:
+        """
+        بازیابی بازه‌های پنجره نگهداری از MongoDB
+
+        اسناد همه نودهای یک بازه با جمع Count-Min Sketch ها و اجتماع کاندیدهای پرتکرار در base
+        بازه ادغام می‌شوند؛ اسناد با ابعاد sketch متفاوت از تنظیمات فعلی نادیده گرفته می‌شوند.
+
+        Returns:
+            int: تعداد اسناد بازیابی شده
+        """
+        since = datetime.utcfromtimestamp(time.time() - self.retention_seconds)
+        cursor = get_collection("trending_snapshots").find({
+            "bucket_start": {"$gte": since},
+            "width": settings.TRENDING_CMS_WIDTH,
+            "depth": settings.TRENDING_CMS_DEPTH
+        })
+
+        restored = 0
+        async for document in cursor:
+            start = int(document["bucket_start"].replace(tzinfo=timezone.utc).timestamp())
+            buckets = self._series.setdefault((document["keyword"], document["kind"]), {})
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = TrendBucket(start)
+                bucket.dirty = False
+
+            sketch = CountMinSketch.from_bytes(document["cms"], document["width"], document["depth"])
+            if bucket.base is None:
+                bucket.base = sketch
+            else:
+                bucket.base.merge(sketch)
+            bucket.base_items.update(item for item, _, _ in document.get("top", []))
+            restored += 1
+
+        self._version += 1
+        logger.info(f"Restored {restored} trending snapshot documents")
+        return restored
+
+
+# نمونه سینگلتون
+trending_engine = TrendingEngine()
@@ -1,15 +1,23 @@
 import logging
+import time
 import aiohttp
 import asyncio
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 
 from app.core.config import settings
-from app.core.logging import get_logger, APIError
+from app.core.execution import record_api_call
+from app.core.logging import get_logger, APIError, log_sampler
+from app.core.metrics import observe_provider_request, record_provider_retry
+from app.services.engagement import updated_velocity_fields
+from app.services.entities import extract_entities
+from app.services.ingest_pipeline import ingest_pipeline
 from app.models.tweet import TweetInDB
 
 logger = get_logger("app.services.twitter_api_io_service")
 
+PROVIDER_NAME = "twitter_api_io"
+
 class TwitterApiIOService:
     """سرویس دسترسی به API توییتر از طریق TwitterAPI.io"""
     
@@ -32,6 +40,55 @@ class TwitterApiIOService:
         if self.session and not self.session.closed:
             await self.session.close()
             
+    async def _request_json(self, endpoint: str, url: str, params: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        ارسال درخواست GET با تلاش مجدد برای خطاهای موقت و ثبت متریک‌ها
+        
+        Args:
+            endpoint: نام کوتاه نقطه انتهایی برای متریک‌ها
+            url: آدرس درخواست
+            params: پارامترهای درخواست
+            
+        Returns:
+            tuple: (داده JSON، پیام خطا)
+        """
+        error = None
+        
+        for attempt in range(settings.PROVIDER_MAX_RETRIES + 1):
+            if attempt > 0:
+                record_provider_retry(PROVIDER_NAME, endpoint)
+                await asyncio.sleep(settings.PROVIDER_RETRY_BACKOFF * (2 ** (attempt - 1)))
+            
+            record_api_call()
+            started = time.perf_counter()
+            
+            try:
+                session = await self._get_session()
+                async with session.get(url, params=params) as response:
+                    observe_provider_request(PROVIDER_NAME, endpoint, response.status, time.perf_counter() - started)
+                    
+                    if response.status == 200:
+                        return await response.json(), None
+                    
+                    error_text = await response.text()
+                    logger.error(f"Error calling {endpoint}: {response.status} - {error_text}")
+                    error = f"API Error: {response.status} - {error_text}"
+                    
+                    # فقط خطاهای محدودیت نرخ و خطاهای سمت سرور قابل تلاش مجدد هستند
+                    if response.status != 429 and response.status < 500:
+                        return None, error
+                    
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                observe_provider_request(PROVIDER_NAME, endpoint, "connection_error", time.perf_counter() - started)
+                logger.error(f"Connection error in {endpoint}: {e}")
+                error = f"Connection error: {e}"
+            except Exception as e:
+                observe_provider_request(PROVIDER_NAME, endpoint, "exception", time.perf_counter() - started)
+                logger.exception(f"Unexpected error in {endpoint}: {e}")
+                return None, f"Unexpected error: {e}"
+        
+        return None, error
+    
     async def search_tweets(self, query: str, count: int = 100, lang: str = "fa") -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
         جستجوی توییت‌ها با پارامترهای مشخص
@@ -44,39 +101,27 @@ class TwitterApiIOService:
         Returns:
             tuple: (لیست توییت‌ها، پیام خطا)
         """
-        try:
-            session = await self._get_session()
-            params = {
-                "q": query,
-                "count": min(count, 100),  # حداکثر 100 توییت در هر درخواست
-                "result_type": "recent",
-                "tweet_mode": "extended"
-            }
-            
-            if lang:
-                params["lang"] = lang
-                
-            url = f"{self.base_url}/search/tweets.json"
-            
-            logger.info(f"Searching tweets with query: {query}, count: {count}, lang: {lang}")
+        params = {
+            "q": query,
+            "count": min(count, 100),  # حداکثر 100 توییت در هر درخواست
+            "result_type": "recent",
+            "tweet_mode": "extended"
+        }
+        
+        if lang:
+            params["lang"] = lang
             
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    tweets = data.get("statuses", [])
-                    logger.info(f"Found {len(tweets)} tweets for query: {query}")
-                    return tweets, None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Error searching tweets: {response.status} - {error_text}")
-                    return [], f"API Error: {response.status} - {error_text}"
-                    
-        except aiohttp.ClientError as e:
-            logger.error(f"Connection error in search_tweets: {e}")
-            return [], f"Connection error: {e}"
-        except Exception as e:
-            logger.exception(f"Unexpected error in search_tweets: {e}")
-            return [], f"Unexpected error: {e}"
+        url = f"{self.base_url}/search/tweets.json"
+        
+        logger.debug(f"Searching tweets with query: {query}, count: {count}, lang: {lang}")
+        
+        data, error = await self._request_json("search", url, params)
+        if error:
+            return [], error
+        
+        tweets = data.get("statuses", [])
+        log_sampler.log(logger, logging.INFO, f"{PROVIDER_NAME}:search", f"Found {len(tweets)} tweets for query: {query}")
+        return tweets, None
     
     async def get_tweet_by_id(self, tweet_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
@@ -88,31 +133,15 @@ class TwitterApiIOService:
         Returns:
             tuple: (داده توییت، پیام خطا)
         """
-        try:
-            session = await self._get_session()
-            url = f"{self.base_url}/statuses/show.json"
-            params = {
-                "id": tweet_id,
-                "tweet_mode": "extended"
-            }
-            
-            logger.info(f"Getting tweet by ID: {tweet_id}")
-            
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    tweet = await response.json()
-                    return tweet, None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Error getting tweet {tweet_id}: {response.status} - {error_text}")
-                    return None, f"API Error: {response.status} - {error_text}"
-                    
-        except aiohttp.ClientError as e:
-            logger.error(f"Connection error in get_tweet_by_id: {e}")
-            return None, f"Connection error: {e}"
-        except Exception as e:
-            logger.exception(f"Unexpected error in get_tweet_by_id: {e}")
-            return None, f"Unexpected error: {e}"
+        url = f"{self.base_url}/statuses/show.json"
+        params = {
+            "id": tweet_id,
+            "tweet_mode": "extended"
+        }
+        
+        logger.info(f"Getting tweet by ID: {tweet_id}")
+        
+        return await self._request_json("show", url, params)
     
     async def process_tweet(self, tweet_data: Dict[str, Any], keywords: List[str] = None) -> Dict[str, Any]:
         """
@@ -128,13 +157,6 @@ class TwitterApiIOService:
         # استخراج اطلاعات کاربر
         user = tweet_data.get("user", {})
         
-        # استخراج هشتگ‌ها
-        hashtags = []
-        entities = tweet_data.get("entities", {})
-        for hashtag in entities.get("hashtags", []):
-            if "text" in hashtag:
-                hashtags.append(hashtag["text"])
-        
         # تشخیص نوع توییت (ریتوییت، پاسخ، نقل قول)
         is_retweet = "retweeted_status" in tweet_data
         is_quote = tweet_data.get("is_quote_status", False)
@@ -146,11 +168,8 @@ class TwitterApiIOService:
         else:
             text = tweet_data.get("text", "")
         
-        # محاسبه امتیاز اهمیت (الگوریتم ساده)
-        importance_score = 0
-        importance_score += min(user.get("followers_count", 0) / 1000, 50)  # حداکثر 50 امتیاز برای فالوئرها
-        importance_score += min(tweet_data.get("favorite_count", 0) / 10, 30)  # حداکثر 30 امتیاز برای لایک‌ها
-        importance_score += min(tweet_data.get("retweet_count", 0) / 5, 20)  # حداکثر 20 امتیاز برای ریتوییت‌ها
+        # استخراج هشتگ‌ها، منشن‌ها، لینک‌ها و رسانه‌ها
+        entities = extract_entities(tweet_data, text)
         
         # توییت پردازش شده
         processed_tweet = {
@@ -160,24 +179,24 @@ class TwitterApiIOService:
             "lang": tweet_data.get("lang", ""),
             "user_id": str(user.get("id", "")),
             "user_screen_name": user.get("screen_name", ""),
-            "user_name": user.get("name", ""),
             "user_verified": user.get("verified", False),
             "user_followers_count": user.get("followers_count", 0),
-            "user_friends_count": user.get("friends_count", 0),
             "retweet_count": tweet_data.get("retweet_count", 0),
             "favorite_count": tweet_data.get("favorite_count", 0),
             "reply_count": tweet_data.get("reply_count", 0),
             "quote_count": tweet_data.get("quote_count", 0),
-            "hashtags": hashtags,
+            "hashtags": entities["hashtags"],
+            "mentions": entities["mentions"],
+            "urls": entities["urls"],
+            "media": entities["media"],
             "is_retweet": is_retweet,
             "is_quote": is_quote,
             "is_reply": is_reply,
             "in_reply_to_status_id": tweet_data.get("in_reply_to_status_id_str"),
             "in_reply_to_user_id": tweet_data.get("in_reply_to_user_id_str"),
             "in_reply_to_screen_name": tweet_data.get("in_reply_to_screen_name"),
-            "importance_score": importance_score,
             "keywords": keywords or [],
-            "raw_data": tweet_data  # ذخیره داده‌های خام برای استفاده احتمالی در آینده
+            "raw_data": tweet_data  # داده‌های خام (شیء user در خط لوله ذخیره به کالکشن users منتقل می‌شود)
         }
         
         return processed_tweet
@@ -215,6 +234,7 @@ class TwitterApiIOService:
             try:
                 # پردازش توییت
                 processed_tweet = await self.process_tweet(tweet_data, keywords)
+                processed_tweet = await ingest_pipeline.prepare(processed_tweet)
                 tweet_id = processed_tweet["tweet_id"]
                 
                 # بررسی وجود توییت در دیتابیس
@@ -222,42 +242,51 @@ class TwitterApiIOService:
                 
                 if existing_tweet:
                     # به‌روزرسانی کلمات کلیدی و آمار
+                    observed_at = datetime.utcnow()
                     update_data = {
                         "retweet_count": processed_tweet["retweet_count"],
                         "favorite_count": processed_tweet["favorite_count"],
                         "reply_count": processed_tweet["reply_count"],
                         "quote_count": processed_tweet["quote_count"],
-                        "updated_in_db": datetime.utcnow()
+                        "updated_in_db": observed_at
                     }
                     
+                    # سرعت تعامل نسبت به شمارنده‌ها و زمان مشاهده قبلی که همین‌جا جایگزین می‌شوند
+                    update_data.update(updated_velocity_fields(existing_tweet, processed_tweet, observed_at))
+                    
                     # اضافه کردن کلمات کلیدی جدید
                     if keywords:
                         existing_keywords = existing_tweet.get("keywords", [])
                         new_keywords = list(set(existing_keywords + keywords))
                         update_data["keywords"] = new_keywords
                     
-                    # به‌روزرسانی امتیاز اهمیت
-                    update_data["importance_score"] = processed_tweet["importance_score"]
+                    # به‌روزرسانی امتیاز اهمیت (محاسبه شده در خط لوله ذخیره)
+                    if "importance_score" in processed_tweet:
+                        update_data["importance_score"] = processed_tweet["importance_score"]
+                        update_data["score_version"] = processed_tweet["score_version"]
                     
                     await tweets_collection.update_one(
                         {"tweet_id": tweet_id},
                         {"$set": update_data}
                     )
                     updated += 1
+                    await ingest_pipeline.on_saved(processed_tweet, inserted=False)
                 else:
                     # افزودن فیلدهای اضافی
                     processed_tweet["created_in_db"] = datetime.utcnow()
                     processed_tweet["updated_in_db"] = datetime.utcnow()
-                    processed_tweet["is_processed"] = False
                     
                     # ذخیره توییت جدید
                     await tweets_collection.insert_one(processed_tweet)
                     inserted += 1
+                    await ingest_pipeline.on_saved(processed_tweet, inserted=True)
                     
             except Exception as e:
-                logger.error(f"Error saving tweet: {e}")
+                log_sampler.log(logger, logging.ERROR, f"{PROVIDER_NAME}:save_tweet", f"Error saving tweet: {e}")
                 skipped += 1
         
+        await ingest_pipeline.flush()
+        
         return {
             "total": total,
             "inserted": inserted,
@@ -1,13 +1,22 @@
+import logging
 import tweepy
+import time
 import asyncio
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 
 from app.core.config import settings
-from app.core.logging import get_logger, APIError
+from app.core.execution import record_api_call
+from app.core.logging import get_logger, APIError, log_sampler
+from app.core.metrics import observe_provider_request
+from app.services.engagement import updated_velocity_fields
+from app.services.entities import extract_entities
+from app.services.ingest_pipeline import ingest_pipeline
 
 logger = get_logger("app.services.twitter_service")
 
+PROVIDER_NAME = "official"
+
 class TwitterService:
     """سرویس دسترسی به API رسمی توییتر با استفاده از Tweepy"""
     
@@ -67,21 +76,29 @@ class TwitterService:
             return [], "Twitter API not initialized"
         
         try:
+            record_api_call()
+            started = time.perf_counter()
+            
             # اجرای جستجو در یک thread جداگانه برای جلوگیری از blocking
             loop = asyncio.get_event_loop()
-            tweets = await loop.run_in_executor(
-                None, 
-                lambda: self.api.search_tweets(
-                    q=query,
-                    count=min(count, 100),
-                    lang=lang,
-                    tweet_mode="extended"
+            try:
+                tweets = await loop.run_in_executor(
+                    None, 
+                    lambda: self.api.search_tweets(
+                        q=query,
+                        count=min(count, 100),
+                        lang=lang,
+                        tweet_mode="extended"
+                    )
                 )
-            )
+            except Exception:
+                observe_provider_request(PROVIDER_NAME, "search", "error", time.perf_counter() - started)
+                raise
+            observe_provider_request(PROVIDER_NAME, "search", 200, time.perf_counter() - started)
             
             # تبدیل نتایج به دیکشنری
             tweet_dicts = [tweet._json for tweet in tweets]
-            logger.info(f"Found {len(tweet_dicts)} tweets for query: {query}")
+            log_sampler.log(logger, logging.INFO, f"{PROVIDER_NAME}:search", f"Found {len(tweet_dicts)} tweets for query: {query}")
             
             return tweet_dicts, None
             
@@ -106,15 +123,23 @@ class TwitterService:
             return None, "Twitter API not initialized"
         
         try:
+            record_api_call()
+            started = time.perf_counter()
+            
             # دریافت توییت در یک thread جداگانه
             loop = asyncio.get_event_loop()
-            tweet = await loop.run_in_executor(
-                None,
-                lambda: self.api.get_status(
-                    id=tweet_id,
-                    tweet_mode="extended"
+            try:
+                tweet = await loop.run_in_executor(
+                    None,
+                    lambda: self.api.get_status(
+                        id=tweet_id,
+                        tweet_mode="extended"
+                    )
                 )
-            )
+            except Exception:
+                observe_provider_request(PROVIDER_NAME, "show", "error", time.perf_counter() - started)
+                raise
+            observe_provider_request(PROVIDER_NAME, "show", 200, time.perf_counter() - started)
             
             # تبدیل به دیکشنری
             tweet_dict = tweet._json
@@ -141,13 +166,6 @@ class TwitterService:
         # استخراج اطلاعات کاربر
         user = tweet_data.get("user", {})
         
-        # استخراج هشتگ‌ها
-        hashtags = []
-        entities = tweet_data.get("entities", {})
-        for hashtag in entities.get("hashtags", []):
-            if "text" in hashtag:
-                hashtags.append(hashtag["text"])
-        
         # تشخیص نوع توییت (ریتوییت، پاسخ، نقل قول)
         is_retweet = "retweeted_status" in tweet_data
         is_quote = tweet_data.get("is_quote_status", False)
@@ -159,11 +177,8 @@ class TwitterService:
         else:
             text = tweet_data.get("text", "")
         
-        # محاسبه امتیاز اهمیت (الگوریتم ساده)
-        importance_score = 0
-        importance_score += min(user.get("followers_count", 0) / 1000, 50)  # حداکثر 50 امتیاز برای فالوئرها
-        importance_score += min(tweet_data.get("favorite_count", 0) / 10, 30)  # حداکثر 30 امتیاز برای لایک‌ها
-        importance_score += min(tweet_data.get("retweet_count", 0) / 5, 20)  # حداکثر 20 امتیاز برای ریتوییت‌ها
+        # استخراج هشتگ‌ها، منشن‌ها، لینک‌ها و رسانه‌ها
+        entities = extract_entities(tweet_data, text)
         
         # توییت پردازش شده
         processed_tweet = {
@@ -173,24 +188,24 @@ class TwitterService:
             "lang": tweet_data.get("lang", ""),
             "user_id": str(user.get("id", "")),
             "user_screen_name": user.get("screen_name", ""),
-            "user_name": user.get("name", ""),
             "user_verified": user.get("verified", False),
             "user_followers_count": user.get("followers_count", 0),
-            "user_friends_count": user.get("friends_count", 0),
             "retweet_count": tweet_data.get("retweet_count", 0),
             "favorite_count": tweet_data.get("favorite_count", 0),
             "reply_count": tweet_data.get("reply_count", 0),
             "quote_count": tweet_data.get("quote_count", 0),
-            "hashtags": hashtags,
+            "hashtags": entities["hashtags"],
+            "mentions": entities["mentions"],
+            "urls": entities["urls"],
+            "media": entities["media"],
             "is_retweet": is_retweet,
             "is_quote": is_quote,
             "is_reply": is_reply,
             "in_reply_to_status_id": tweet_data.get("in_reply_to_status_id_str"),
             "in_reply_to_user_id": tweet_data.get("in_reply_to_user_id_str"),
             "in_reply_to_screen_name": tweet_data.get("in_reply_to_screen_name"),
-            "importance_score": importance_score,
             "keywords": keywords or [],
-            "raw_data": tweet_data  # ذخیره داده‌های خام برای استفاده احتمالی در آینده
+            "raw_data": tweet_data  # داده‌های خام (شیء user در خط لوله ذخیره به کالکشن users منتقل می‌شود)
         }
         
         return processed_tweet
@@ -228,6 +243,7 @@ class TwitterService:
             try:
                 # پردازش توییت
                 processed_tweet = await self.process_tweet(tweet_data, keywords)
+                processed_tweet = await ingest_pipeline.prepare(processed_tweet)
                 tweet_id = processed_tweet["tweet_id"]
                 
                 # بررسی وجود توییت در دیتابیس
@@ -235,42 +251,51 @@ class TwitterService:
                 
                 if existing_tweet:
                     # به‌روزرسانی کلمات کلیدی و آمار
+                    observed_at = datetime.utcnow()
                     update_data = {
                         "retweet_count": processed_tweet["retweet_count"],
                         "favorite_count": processed_tweet["favorite_count"],
                         "reply_count": processed_tweet["reply_count"],
                         "quote_count": processed_tweet["quote_count"],
-                        "updated_in_db": datetime.utcnow()
+                        "updated_in_db": observed_at
                     }
                     
+                    # سرعت تعامل نسبت به شمارنده‌ها و زمان مشاهده قبلی که همین‌جا جایگزین می‌شوند
+                    update_data.update(updated_velocity_fields(existing_tweet, processed_tweet, observed_at))
+                    
                     # اضافه کردن کلمات کلیدی جدید
                     if keywords:
                         existing_keywords = existing_tweet.get("keywords", [])
                         new_keywords = list(set(existing_keywords + keywords))
                         update_data["keywords"] = new_keywords
                     
-                    # به‌روزرسانی امتیاز اهمیت
-                    update_data["importance_score"] = processed_tweet["importance_score"]
+                    # به‌روزرسانی امتیاز اهمیت (محاسبه شده در خط لوله ذخیره)
+                    if "importance_score" in processed_tweet:
+                        update_data["importance_score"] = processed_tweet["importance_score"]
+                        update_data["score_version"] = processed_tweet["score_version"]
                     
                     await tweets_collection.update_one(
                         {"tweet_id": tweet_id},
                         {"$set": update_data}
                     )
                     updated += 1
+                    await ingest_pipeline.on_saved(processed_tweet, inserted=False)
                 else:
                     # افزودن فیلدهای اضافی
                     processed_tweet["created_in_db"] = datetime.utcnow()
                     processed_tweet["updated_in_db"] = datetime.utcnow()
-                    processed_tweet["is_processed"] = False
                     
                     # ذخیره توییت جدید
                     await tweets_collection.insert_one(processed_tweet)
                     inserted += 1
+                    await ingest_pipeline.on_saved(processed_tweet, inserted=True)
                     
             except Exception as e:
-                logger.error(f"Error saving tweet: {e}")
+                log_sampler.log(logger, logging.ERROR, f"{PROVIDER_NAME}:save_tweet", f"Error saving tweet: {e}")
                 skipped += 1
         
+        await ingest_pipeline.flush()
+        
         return {
             "total": total,
             "inserted": inserted,
@@ -334,6 +359,3 @@ class TwitterService:
                 "updated": 0,
                 "skipped": 0
             }
-
-# نمونه سینگلتون از سرویس
-twitter_service = TwitterService()
\ No newline at end of file
@@ -0,0 +1,201 @@
+import math
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.unique_authors")
+
+# تلاش‌های ادغام هم‌زمان یک سند پیش از واگذاری به flush بعدی
+MERGE_RETRIES = 5
+
+
+class HyperLogLog:
+    """
+    HyperLogLog با 2^precision رجیستر یک بایتی
+
+    ادغام دو HLL بیشینه رجیستر به رجیستر است، بنابراین بازه‌ها و نسخه‌های مختلف
+    (پروسه‌ها/ماشین‌ها) بدون شمارش تکراری قابل ترکیب هستند.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is not None:
+            self.registers = np.frombuffer(bytes(registers), dtype=np.uint8).copy()
+        else:
+            self.registers = np.zeros(self.size, dtype=np.uint8)
+
+    def add(self, item: str) -> None:
+        value = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index = value >> (64 - self.precision)
+        remaining = value & ((1 << (64 - self.precision)) - 1)
+        # موقعیت اولین بیت 1 در بیت‌های باقی مانده
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """تخمین تعداد یکتا"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+
+        # تصحیح بازه کوچک با شمارش خطی
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        """خطای استاندارد نسبی تخمین"""
+        return 1.04 / math.sqrt(self.size)
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+
+def _hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+class UniqueAuthorCounter:
+    """
+    شمارش تقریبی نویسندگان یکتا به تفکیک کلمه کلیدی و ساعت
+
+    همه پروسه‌ها رجیسترهای خود را در یک سند (keyword, hour) کالکشن author_rollups ادغام می‌کنند:
+    سند خوانده، با رجیسترهای محلی بیشینه‌گیری و با شرط نسخه جایگزین می‌شود؛ در صورت تداخل با پروسه
+    دیگر دوباره تلاش می‌شود. پس راه‌اندازی مجدد سند جدیدی نمی‌سازد و داده‌ای بازنویسی نمی‌شود.
+    """
+
+    def __init__(self):
+        self._sketches: Dict[Tuple[str, datetime], HyperLogLog] = {}
+        self._dirty: set = set()
+
+    async def _get(self, keyword: str, hour: datetime) -> HyperLogLog:
+        key = (keyword, hour)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            # ادامه از رجیسترهای ذخیره شده
+            document = await get_collection("author_rollups").find_one(
+                {"keyword": keyword, "hour": hour},
+                {"registers": 1, "precision": 1}
+            )
+            if document and document.get("precision") == settings.HLL_PRECISION:
+                sketch = HyperLogLog(settings.HLL_PRECISION, document["registers"])
+            else:
+                sketch = HyperLogLog(settings.HLL_PRECISION)
+            self._sketches[key] = sketch
+        return sketch
+
+    async def add(self, keyword: str, user_id: str, created_at: datetime) -> None:
+        """ثبت نویسنده یک توییت"""
+        hour = _hour(created_at)
+        sketch = await self._get(keyword, hour)
+        sketch.add(user_id)
+        self._dirty.add((keyword, hour))
+
+    async def _store(self, keyword: str, hour: datetime, now: datetime) -> None:
+        """ادغام رجیسترهای محلی با سند مشترک (keyword, hour) با مقایسه و جایگزینی نسخه"""
+        collection = get_collection("author_rollups")
+        sketch = self._sketches[(keyword, hour)]
+
+        for _ in range(MERGE_RETRIES):
+            document = await collection.find_one(
+                {"keyword": keyword, "hour": hour}, {"registers": 1, "precision": 1, "version": 1}
+            )
+            if document and document.get("precision") == settings.HLL_PRECISION:
+                sketch.merge(HyperLogLog(settings.HLL_PRECISION, document["registers"]))
+
+            fields = {"registers": sketch.to_bytes(), "precision": settings.HLL_PRECISION, "updated_at": now}
+            try:
+                if document is None:
+                    await collection.insert_one({"keyword": keyword, "hour": hour, "version": 1, **fields})
+                    return
+                result = await collection.update_one(
+                    {"_id": document["_id"], "version": document.get("version")},
+                    {"$set": fields, "$inc": {"version": 1}}
+                )
+                if result.matched_count:
+                    return
+            except DuplicateKeyError:
+                pass
+
+        raise RuntimeError(f"Concurrent updates kept conflicting for author rollup {keyword} {hour}")
+
+    async def flush(self) -> int:
+        """
+        ذخیره رجیسترهای تغییر یافته و آزادسازی ساعت‌های قدیمی از حافظه
+
+        کلید پیش از نوشتن از مجموعه تغییرات حذف و در صورت خطا دوباره اضافه می‌شود؛ ثبت هم‌زمان
+        نویسنده در حین نوشتن کلید را دوباره تغییر یافته علامت می‌زند.
+
+        Returns:
+            int: تعداد اسناد به‌روزرسانی شده
+        """
+        now = datetime.utcnow()
+        stored = 0
+        for key in list(self._dirty):
+            self._dirty.discard(key)
+            try:
+                await self._store(*key, now)
+            except Exception:
+                self._dirty.add(key)
+                raise
+            stored += 1
+
+        cutoff = _hour(datetime.utcnow()) - timedelta(hours=settings.HLL_MEMORY_HOURS)
+        for key in [key for key in self._sketches if key[1] < cutoff and key not in self._dirty]:
+            del self._sketches[key]
+
+        return stored
+
+    async def estimate(self, keywords: Optional[List[str]], start: datetime,
+                       end: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        تخمین نویسندگان یکتا در بازه زمانی
+
+        Args:
+            keywords: کلمات کلیدی (None برای همه)
+            start: ابتدای بازه (به ساعت گرد می‌شود)
+            end: انتهای بازه
+
+        Returns:
+            dict: تخمین کل، تخمین هر کلمه کلیدی و خطای نسبی
+        """
+        query: Dict[str, Any] = {"hour": {"$gte": _hour(start)}, "precision": settings.HLL_PRECISION}
+        if end:
+            query["hour"]["$lte"] = end
+        if keywords:
+            query["keyword"] = {"$in": keywords}
+
+        total = HyperLogLog(settings.HLL_PRECISION)
+        by_keyword: Dict[str, HyperLogLog] = {}
+
+        cursor = get_collection("author_rollups").find(query, {"keyword": 1, "registers": 1, "_id": 0})
+        async for document in cursor:
+            sketch = HyperLogLog(settings.HLL_PRECISION, document["registers"])
+            total.merge(sketch)
+            keyword_sketch = by_keyword.setdefault(document["keyword"], HyperLogLog(settings.HLL_PRECISION))
+            keyword_sketch.merge(sketch)
+
+        return {
+            "estimate": total.count(),
+            "relative_error": round(total.relative_error, 4),
+            "by_keyword": {keyword: sketch.count() for keyword, sketch in by_keyword.items()}
+        }
+
+
+# نمونه سینگلتون
+unique_author_counter = UniqueAuthorCounter()
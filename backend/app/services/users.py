@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import get_collection
+from app.core.logging import get_logger
+
+logger = get_logger("app.services.users")
+
+# فیلدهای پروفایل ذخیره شده در کالکشن users (فیلد داده خام توییتر -> فیلد سند)
+PROFILE_FIELDS = {
+    "screen_name": "screen_name",
+    "name": "name",
+    "verified": "verified",
+    "followers_count": "followers_count",
+    "friends_count": "friends_count",
+    "statuses_count": "statuses_count",
+    "description": "description",
+    "location": "location",
+    "profile_image_url_https": "profile_image_url",
+}
+
+# فیلدهای کاربر که روی هر توییت برای فیلتر و مرتب‌سازی باقی می‌مانند
+TWEET_USER_FIELDS = ("user_id", "user_screen_name", "user_verified", "user_followers_count")
+
+
+def user_profile(user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    تبدیل شیء user داده خام توییتر به سند کالکشن users
+
+    Args:
+        user: شیء user توییت
+
+    Returns:
+        dict: سند پروفایل یا None برای کاربر بدون شناسه
+    """
+    if not user or not user.get("id"):
+        return None
+
+    profile = {"user_id": str(user["id"])}
+    for source, field in PROFILE_FIELDS.items():
+        if source in user:
+            profile[field] = user[source]
+
+    created_at = user.get("created_at")
+    if isinstance(created_at, str):
+        try:
+            profile["created_at"] = datetime.strptime(created_at, "%a %b %d %H:%M:%S +0000 %Y")
+        except ValueError:
+            pass
+
+    if "screen_name" in profile:
+        profile["screen_name_lower"] = profile["screen_name"].lower()
+    return profile
+
+
+class AuthorCache:
+    """
+    کش LRU پروفایل‌های نوشته شده در همین پروسه
+
+    برای هر user_id اثر انگشت آخرین پروفایل upsert شده نگه داشته می‌شود؛
+    پروفایل تکراری یک نویسنده پرکار دوباره به دیتابیس فرستاده نمی‌شود.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(profile: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((key, str(value)) for key, value in profile.items()))
+
+    def is_fresh(self, profile: Dict[str, Any]) -> bool:
+        """آیا همین پروفایل قبلا نوشته شده است"""
+        user_id = profile["user_id"]
+        known = self._entries.get(user_id)
+        if known is not None and known == self.fingerprint(profile):
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, profile: Dict[str, Any]) -> None:
+        """ثبت پروفایل نوشته شده"""
+        self._entries[profile["user_id"]] = self.fingerprint(profile)
+        self._entries.move_to_end(profile["user_id"])
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class UserStore:
+    """
+    کالکشن نرمال شده users؛ پروفایل هر نویسنده یک بار به جای تکرار روی هر توییت
+
+    پروفایل‌های تغییر کرده در صف جمع و در پایان هر دسته ذخیره با یک bulk_write upsert می‌شوند.
+    """
+
+    def __init__(self):
+        self.cache = AuthorCache(settings.USER_CACHE_SIZE)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        افزودن پروفایل یک نویسنده به صف نوشتن (در صورت تغییر نسبت به آخرین نسخه نوشته شده)
+
+        Returns:
+            dict: پروفایل ساخته شده
+        """
+        profile = user_profile(user)
+        if profile is None or self.cache.is_fresh(profile):
+            return profile
+        self._pending[profile["user_id"]] = profile
+        return profile
+
+    async def flush(self) -> int:
+        """
+        upsert دسته‌ای پروفایل‌های صف
+
+        Returns:
+            int: تعداد پروفایل‌های نوشته شده
+        """
+        if not self._pending:
+            return 0
+
+        profiles, self._pending = list(self._pending.values()), {}
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"user_id": profile["user_id"]},
+                {"$set": {**profile, "updated_at": now}, "$setOnInsert": {"first_seen_at": now}},
+                upsert=True
+            )
+            for profile in profiles
+        ]
+        try:
+            await get_collection("users").bulk_write(operations, ordered=False)
+        except Exception:
+            # پروفایل‌ها به صف برمی‌گردند مگر نسخه جدیدتری در حین نوشتن صف شده باشد
+            for profile in profiles:
+                self._pending.setdefault(profile["user_id"], profile)
+            raise
+
+        for profile in profiles:
+            self.cache.remember(profile)
+        return len(profiles)
+
+    async def get(self, screen_name: str) -> Optional[Dict[str, Any]]:
+        """دریافت پروفایل با نام کاربری (بدون حساسیت به حروف بزرگ و کوچک)"""
+        return await get_collection("users").find_one(
+            {"screen_name_lower": screen_name.lstrip("@").lower()}, {"_id": 0}
+        )
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """دریافت پروفایل چند نویسنده با شناسه"""
+        cursor = get_collection("users").find({"user_id": {"$in": list(set(user_ids))}}, {"_id": 0})
+        return {profile["user_id"]: profile async for profile in cursor}
+
+    async def attach(self, tweets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """افزودن پروفایل نویسنده (فیلد user) به توییت‌ها با یک کوئری"""
+        user_ids = [tweet["user_id"] for tweet in tweets if tweet.get("user_id")]
+        profiles = await self.get_many(user_ids) if user_ids else {}
+        for tweet in tweets:
+            if tweet.get("user_id"):
+                tweet["user"] = profiles.get(tweet["user_id"])
+        return tweets
+
+    def status(self) -> Dict[str, Any]:
+        """وضعیت کش نویسندگان"""
+        return {
+            "cached_authors": len(self.cache),
+            "max_size": self.cache.max_size,
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "pending": len(self._pending)
+        }
+
+
+# نمونه سینگلتون
+user_store = UserStore()
@@ -3,11 +3,16 @@ import asyncio
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.mongodb import MongoDBJobStore
-from apscheduler.executors.pool import ThreadPoolExecutor, ProcessPoolExecutor
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
 
+from app.core.config import settings
 from app.core.db import db
-from app.tasks.twitter_tasks import extract_tweets_for_all_keywords, update_tweet_stats
+from app.core.metrics import SCHEDULER_QUEUE_DEPTH, SCHEDULER_MISSED_JOBS
+from app.tasks.twitter_tasks import extract_tweets_for_all_keywords, update_tweet_stats, snapshot_trending, rescore_tweets, run_enrichment, extract_topics
+from app.tasks.maintenance_tasks import apply_retention, run_compaction, update_system_stats, rollup_system_stats
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,16 @@ logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
 
 
+def _on_job_event(event):
+    """Track in-flight job instances and missed runs for metrics"""
+    if event.code == EVENT_JOB_SUBMITTED:
+        SCHEDULER_QUEUE_DEPTH.inc()
+    elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+        SCHEDULER_QUEUE_DEPTH.dec()
+    elif event.code == EVENT_JOB_MISSED:
+        SCHEDULER_MISSED_JOBS.labels(job_id=event.job_id).inc()
+
+
 async def setup_scheduler():
     """Set up the scheduler with MongoDB job store and default jobs"""
     logger.info("Setting up scheduler...")
@@ -24,17 +39,20 @@ async def setup_scheduler():
         await asyncio.sleep(1)
     
     # Configure scheduler with MongoDB job store
+    # (the job store is synchronous, so it gets Motor's underlying pymongo client)
     jobstores = {
         'default': MongoDBJobStore(
             database=db.db.name, 
             collection='scheduler_jobs',
-            client=db.client
+            client=db.client.delegate
         )
     }
     
+    # Jobs are coroutines, so the default executor must await them on the event loop
+    # (CPU-bound work such as sentiment scoring uses its own process pool inside the job)
     executors = {
-        'default': ThreadPoolExecutor(20),
-        'processpool': ProcessPoolExecutor(5)
+        'default': AsyncIOExecutor(),
+        'threadpool': ThreadPoolExecutor(20)
     }
     
     job_defaults = {
@@ -58,12 +76,101 @@ async def setup_scheduler():
         name='Extract tweets for all active keywords'
     )
     
+    # Runs continuously; the refresh planner spreads the hourly lookup budget over ticks
     scheduler.add_job(
         update_tweet_stats,
-        trigger=IntervalTrigger(minutes=60),  # Run every hour
+        trigger=IntervalTrigger(seconds=settings.REFRESH_TICK_SECONDS),
         id='update_tweet_stats_job',
         replace_existing=True,
-        name='Update tweet statistics'
+        name='Update tweet statistics',
+        max_instances=1,
+        coalesce=True
+    )
+    
+    scheduler.add_job(
+        rescore_tweets,
+        trigger=IntervalTrigger(minutes=settings.SCORING_RESCORE_MINUTES),
+        id='rescore_tweets_job',
+        replace_existing=True,
+        name='Rescore tweets with the current importance formula'
+    )
+    
+    scheduler.add_job(
+        run_enrichment,
+        trigger=IntervalTrigger(seconds=settings.ENRICHMENT_INTERVAL_SECONDS),
+        id='run_enrichment_job',
+        replace_existing=True,
+        name='Run enrichment stages on new tweets',
+        max_instances=1,
+        coalesce=True
+    )
+    
+    if settings.TOPIC_ENABLED:
+        scheduler.add_job(
+            extract_topics,
+            trigger=IntervalTrigger(minutes=settings.TOPIC_INTERVAL_MINUTES),
+            id='extract_topics_job',
+            replace_existing=True,
+            name='Extract topics of new tweets',
+            max_instances=1,
+            coalesce=True
+        )
+    
+    if settings.SYSTEM_SAMPLER_ENABLED:
+        scheduler.add_job(
+            update_system_stats,
+            trigger=IntervalTrigger(seconds=settings.SYSTEM_STATS_RECORD_SECONDS),
+            id='update_system_stats_job',
+            replace_existing=True,
+            name='Record system stats snapshot',
+            max_instances=1,
+            coalesce=True
+        )
+        
+        scheduler.add_job(
+            rollup_system_stats,
+            trigger=IntervalTrigger(minutes=settings.SYSTEM_STATS_ROLLUP_MINUTES),
+            id='rollup_system_stats_job',
+            replace_existing=True,
+            name='Roll up system stats to hourly and daily aggregates',
+            max_instances=1,
+            coalesce=True
+        )
+    
+    if settings.RETENTION_ENABLED:
+        scheduler.add_job(
+            apply_retention,
+            trigger=IntervalTrigger(minutes=settings.RETENTION_INTERVAL_MINUTES),
+            id='apply_retention_job',
+            replace_existing=True,
+            name='Delete expired tweets by retention policy',
+            max_instances=1,
+            coalesce=True
+        )
+    
+    if settings.COMPACTION_ENABLED:
+        scheduler.add_job(
+            run_compaction,
+            trigger=IntervalTrigger(minutes=settings.COMPACTION_INTERVAL_MINUTES),
+            id='run_compaction_job',
+            replace_existing=True,
+            name='Compact fragmented collections in the maintenance window',
+            max_instances=1,
+            coalesce=True
+        )
+    
+    if settings.TRENDING_ENABLED:
+        scheduler.add_job(
+            snapshot_trending,
+            trigger=IntervalTrigger(minutes=settings.TRENDING_SNAPSHOT_MINUTES),
+            id='snapshot_trending_job',
+            replace_existing=True,
+            name='Persist trending sketches'
+        )
+    
+    scheduler.add_listener(
+        _on_job_event,
+        EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
     )
     
     # Start scheduler
@@ -1,14 +1,43 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any, Optional
 import asyncio
+import time
+import logging
 
 from app.core.config import settings
-from app.core.logging import get_logger
+from app.core.logging import get_logger, log_sampler
 from app.core.db import get_collection
+from app.core.execution import track_execution, get_current_execution
+from app.core.metrics import record_ingested
+from app.services.engagement import engagement_history, updated_velocity_fields
 from app.services.factory import twitter_service_factory
+from app.services.refresh_planner import refresh_planner
+from app.services.scoring import scoring_engine
+from app.services.enrichment import enrichment_runner
+from app.services.topics import topic_extractor
+from app.services.trending import trending_engine
+from app.services.users import user_store
 
 logger = get_logger("app.tasks.twitter_tasks")
 
+async def extract_keyword_timed(twitter_service, keyword: str, limit: int, lang: str) -> Dict[str, Any]:
+    """
+    استخراج توییت‌های یک کلمه کلیدی و ثبت زمان و تعداد آن در اجرای جاری و متریک‌ها
+    
+    Returns:
+        dict: نتیجه استخراج
+    """
+    started = time.perf_counter()
+    result = await twitter_service.extract_tweets_for_keyword(keyword, limit, lang)
+    record_ingested(keyword, result.get("inserted", 0), result.get("updated", 0))
+    
+    execution = get_current_execution()
+    if execution is not None:
+        execution.record_keyword(keyword, time.perf_counter() - started, result)
+    
+    return result
+
+@track_execution("extract_tweets")
 async def extract_tweets_for_all_keywords() -> Dict[str, Any]:
     """
     استخراج توییت‌ها برای تمام کلمات کلیدی فعال
@@ -62,7 +91,7 @@ async def extract_tweets_for_all_keywords() -> Dict[str, Any]:
                     limit = keyword_doc.get("max_tweets_per_request", settings.DEFAULT_TWEETS_LIMIT)
                     lang = settings.DEFAULT_TWEET_LANG
                     
-                    task = twitter_service.extract_tweets_for_keyword(keyword, limit, lang)
+                    task = extract_keyword_timed(twitter_service, keyword, limit, lang)
                     tasks.append(task)
                 
                 # اجرای همزمان تسک‌ها
@@ -88,22 +117,30 @@ async def extract_tweets_for_all_keywords() -> Dict[str, Any]:
                 if i + batch_size < len(keywords_group):
                     await asyncio.sleep(settings.API_RATE_LIMIT_WAIT)
         
-        logger.info(f"Extraction completed for all keywords. Results: {results}")
+        # فقط خلاصه نتایج ثبت می‌شود؛ نتیجه هر کلمه کلیدی در خروجی تسک است
+        failed = [keyword for keyword, result in results.items() if "error" in result]
+        logger.info(
+            f"Extraction completed for {len(results)} keywords: "
+            f"{sum(result.get('inserted', 0) for result in results.values())} inserted, "
+            f"{sum(result.get('updated', 0) for result in results.values())} updated, "
+            f"{len(failed)} failed"
+        )
         return {"status": "success", "results": results}
         
     except Exception as e:
         logger.exception(f"Error in extract_tweets_for_all_keywords: {e}")
         return {"status": "error", "error": str(e)}
 
+@track_execution("update_tweet_stats")
 async def update_tweet_stats() -> Dict[str, Any]:
     """
-    به‌روزرسانی آمار توییت‌های مهم
+    به‌روزرسانی آمار توییت‌های انتخاب شده توسط برنامه‌ریز به‌روزرسانی
+    
+    هر REFRESH_TICK_SECONDS ثانیه اجرا می‌شود و در مجموع حداکثر REFRESH_BUDGET_PER_HOUR درخواست در ساعت می‌فرستد.
     
     Returns:
         dict: نتیجه به‌روزرسانی
     """
-    logger.info("Starting tweet stats update")
-    
     try:
         # دریافت سرویس مناسب
         twitter_service = twitter_service_factory.get_service()
@@ -111,18 +148,11 @@ async def update_tweet_stats() -> Dict[str, Any]:
         # دریافت کالکشن توییت‌ها
         tweets_collection = get_collection("tweets")
         
-        # دریافت توییت‌های مهم برای به‌روزرسانی
-        # توییت‌هایی که امتیاز اهمیت بالا دارند و اخیراً به‌روزرسانی نشده‌اند
-        cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        important_tweets = await tweets_collection.find(
-            {
-                "importance_score": {"$gt": 50},
-                "updated_in_db": {"$lt": cutoff_time}
-            }
-        ).sort("importance_score", -1).limit(100).to_list(length=100)
+        # انتخاب پرارزش‌ترین توییت‌ها (بیشترین تعامل مورد انتظار) در حد بودجه ساعتی
+        important_tweets = await refresh_planner.plan()
         
         if not important_tweets:
-            logger.info("No important tweets found for update")
+            logger.debug("No tweets selected for stats refresh")
             return {
                 "status": "success",
                 "message": "No tweets to update",
@@ -130,10 +160,11 @@ async def update_tweet_stats() -> Dict[str, Any]:
                 "errors": 0
             }
         
-        logger.info(f"Found {len(important_tweets)} important tweets to update")
+        logger.info(f"Refreshing stats for {len(important_tweets)} tweets")
         
         updated_count = 0
         error_count = 0
+        execution = get_current_execution()
         
         # به‌روزرسانی هر توییت
         for tweet in important_tweets:
@@ -144,31 +175,37 @@ async def update_tweet_stats() -> Dict[str, Any]:
                 tweet_data, error = await twitter_service.get_tweet_by_id(tweet_id)
                 
                 if error:
-                    logger.error(f"Error fetching tweet {tweet_id}: {error}")
+                    log_sampler.log(logger, logging.ERROR, "refresh:fetch", f"Error fetching tweet {tweet_id}: {error}")
                     error_count += 1
+                    if execution is not None:
+                        execution.record_error(f"{tweet_id}: {error}")
                     continue
                 
                 if not tweet_data:
-                    logger.warning(f"Tweet {tweet_id} not found or deleted")
+                    log_sampler.log(logger, logging.WARNING, "refresh:missing", f"Tweet {tweet_id} not found or deleted")
                     error_count += 1
                     continue
                 
                 # به‌روزرسانی آمار
+                observed_at = datetime.utcnow()
                 update_data = {
                     "retweet_count": tweet_data.get("retweet_count", tweet.get("retweet_count", 0)),
                     "favorite_count": tweet_data.get("favorite_count", tweet.get("favorite_count", 0)),
                     "reply_count": tweet_data.get("reply_count", tweet.get("reply_count", 0)),
                     "quote_count": tweet_data.get("quote_count", tweet.get("quote_count", 0)),
-                    "updated_in_db": datetime.utcnow()
+                    "updated_in_db": observed_at
                 }
                 
+                # ثبت نمونه در تاریخچه تعاملات و محاسبه سرعت تعامل
+                update_data.update(updated_velocity_fields(tweet, update_data, observed_at))
+                engagement_history.queue(tweet_id, update_data, observed_at)
+                
                 # محاسبه مجدد امتیاز اهمیت
                 user = tweet_data.get("user", {})
-                importance_score = 0
-                importance_score += min(user.get("followers_count", 0) / 1000, 50)
-                importance_score += min(tweet_data.get("favorite_count", 0) / 10, 30)
-                importance_score += min(tweet_data.get("retweet_count", 0) / 5, 20)
-                update_data["importance_score"] = importance_score
+                user_store.observe(user)
+                update_data["user_followers_count"] = user.get("followers_count", tweet.get("user_followers_count", 0))
+                update_data["importance_score"] = scoring_engine.score({**tweet, **update_data}, observed_at)
+                update_data["score_version"] = scoring_engine.version
                 
                 # به‌روزرسانی در دیتابیس
                 result = await tweets_collection.update_one(
@@ -183,8 +220,18 @@ async def update_tweet_stats() -> Dict[str, Any]:
                 await asyncio.sleep(0.5)
                 
             except Exception as e:
-                logger.error(f"Error updating stats for tweet {tweet.get('tweet_id')}: {e}")
+                log_sampler.log(
+                    logger, logging.ERROR, "refresh:update", f"Error updating stats for tweet {tweet.get('tweet_id')}: {e}"
+                )
                 error_count += 1
+                if execution is not None:
+                    execution.record_error(f"{tweet.get('tweet_id')}: {e}")
+        
+        await engagement_history.flush()
+        await user_store.flush()
+        
+        if execution is not None:
+            execution.record_tweets(updated=updated_count)
         
         logger.info(f"Tweet stats update completed. Updated: {updated_count}, errors: {error_count}")
         
@@ -201,4 +248,81 @@ async def update_tweet_stats() -> Dict[str, Any]:
             "error": str(e),
             "updated": 0,
             "errors": 0
-        }
\ No newline at end of file
+        }
+
+async def snapshot_trending() -> Dict[str, Any]:
+    """
+    ذخیره بازه‌های موتور موضوعات داغ در MongoDB برای بازیابی پس از راه‌اندازی مجدد
+    
+    Returns:
+        dict: تعداد بازه‌های ذخیره شده
+    """
+    try:
+        saved = await trending_engine.snapshot()
+        logger.debug(f"Saved {saved} trending buckets")
+        return {"status": "success", "saved": saved}
+    except Exception as e:
+        logger.error(f"Error saving trending snapshot: {e}")
+        return {"status": "error", "error": str(e)}
+
+@track_execution("rescore_tweets")
+async def rescore_tweets() -> Dict[str, Any]:
+    """
+    محاسبه مجدد امتیاز اهمیت توییت‌هایی که با نسخه قبلی فرمول امتیاز گرفته‌اند
+    
+    در هر اجرا حداکثر SCORING_MAX_BATCHES دسته پردازش می‌شود و اجرای بعدی از همان نقطه ادامه می‌دهد.
+    
+    Returns:
+        dict: نتیجه محاسبه مجدد
+    """
+    try:
+        result = await scoring_engine.rescore(max_batches=settings.SCORING_MAX_BATCHES)
+        
+        execution = get_current_execution()
+        if execution is not None:
+            execution.record_tweets(updated=result["scored"])
+        
+        return {"status": "success", **result}
+    except Exception as e:
+        logger.error(f"Error rescoring tweets: {e}")
+        return {"status": "error", "error": str(e)}
+
+@track_execution("run_enrichment")
+async def run_enrichment() -> Dict[str, Any]:
+    """
+    اجرای مراحل غنی‌سازی (تحلیل احساسات و ...) روی صف توییت‌های ذخیره شده
+    
+    Returns:
+        dict: نتیجه هر مرحله
+    """
+    try:
+        stages = await enrichment_runner.run(max_batches=settings.ENRICHMENT_MAX_BATCHES)
+        
+        execution = get_current_execution()
+        if execution is not None:
+            execution.record_tweets(updated=sum(result.get("tweets", 0) for result in stages.values()))
+        
+        return {"status": "success", "stages": stages}
+    except Exception as e:
+        logger.error(f"Error running enrichment stages: {e}")
+        return {"status": "error", "error": str(e)}
+
+@track_execution("extract_topics")
+async def extract_topics() -> Dict[str, Any]:
+    """
+    استخراج موضوعات توییت‌های جدید کلمات کلیدی فعال و پر کردن فیلد topics
+    
+    Returns:
+        dict: نتیجه استخراج به تفکیک کلمه کلیدی
+    """
+    try:
+        keywords = await topic_extractor.run()
+        
+        execution = get_current_execution()
+        if execution is not None:
+            execution.record_tweets(updated=sum(result["labelled"] for result in keywords.values()))
+        
+        return {"status": "success", "keywords": keywords}
+    except Exception as e:
+        logger.error(f"Error extracting topics: {e}")
+        return {"status": "error", "error": str(e)}
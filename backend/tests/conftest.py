@@ -159,9 +159,12 @@ async def sample_tweets(mongodb_test_db, sample_keywords) -> Dict[str, Any]:
         }
     ]
     
-    # افزودن توییت‌ها به دیتابیس
+    # افزودن توییت‌ها به دیتابیس (توکن‌های جستجو مانند زمان ذخیره ساخته می‌شوند)
+    from app.services.text_processing import build_search_tokens
+    
     result = {}
     for tweet in test_tweets:
+        tweet["search_tokens"] = build_search_tokens(tweet["text"])
         insert_result = await tweets_collection.insert_one(tweet)
         tweet["_id"] = insert_result.inserted_id
         tweet["id"] = str(insert_result.inserted_id)
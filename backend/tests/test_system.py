@@ -0,0 +1,353 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+@pytest.mark.asyncio
+async def test_execution_stats_percentiles(app_client: TestClient, mongodb_test_db):
+    """تست محاسبه صدک‌های مدت اجرای کارها"""
+    execution_logs = mongodb_test_db.execution_logs
+    now = datetime.utcnow()
+    
+    # ده اجرای نمونه با مدت 1 تا 10 ثانیه
+    docs = [
+        {
+            "task_name": "extract_tweets",
+            "trigger": "scheduled",
+            "status": "success" if i < 9 else "error",
+            "start_time": now - timedelta(minutes=i),
+            "end_time": now - timedelta(minutes=i) + timedelta(seconds=i + 1),
+            "duration_seconds": float(i + 1),
+            "api_calls": 2,
+            "tweets_inserted": 5,
+            "tweets_updated": 1,
+        }
+        for i in range(10)
+    ]
+    await execution_logs.insert_many(docs)
+    
+    response = app_client.get("/api/v1/system/executions/stats?task_name=extract_tweets")
+    assert response.status_code == 200
+    
+    data = response.json()
+    stats = data["tasks"]["extract_tweets"]
+    assert stats["runs"] == 10
+    assert stats["errors"] == 1
+    assert stats["api_calls"] == 20
+    assert stats["tweets_inserted"] == 50
+    assert stats["duration_seconds"]["p50"] == pytest.approx(5.5)
+    assert stats["duration_seconds"]["max"] == pytest.approx(10.0)
+    
+    await execution_logs.delete_many({"task_name": "extract_tweets"})
+
+@pytest.mark.asyncio
+async def test_execution_logs_filter(app_client: TestClient, mongodb_test_db):
+    """تست فیلتر لاگ‌های اجرا براساس نام کار"""
+    execution_logs = mongodb_test_db.execution_logs
+    now = datetime.utcnow()
+    
+    await execution_logs.insert_one({
+        "task_name": "update_tweet_stats",
+        "status": "success",
+        "start_time": now,
+        "end_time": now,
+        "duration_seconds": 0.5,
+        "keyword_timings": [],
+        "api_calls": 3,
+        "tweets_inserted": 0,
+        "tweets_updated": 3,
+        "errors": [],
+        "result": {"status": "success"}
+    })
+    
+    response = app_client.get("/api/v1/system/executions?task_name=update_tweet_stats")
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["total"] == 1
+    assert data["logs"][0]["api_calls"] == 3
+    assert data["logs"][0]["tweets_updated"] == 3
+    
+    await execution_logs.delete_many({"task_name": "update_tweet_stats"})
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(app_client: TestClient):
+    """تست خروجی متریک‌ها در قالب Prometheus با الگوی مسیر به عنوان برچسب"""
+    app_client.get("/api/v1/keywords/")
+    
+    response = app_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    
+    body = response.text
+    assert "http_request_duration_seconds_bucket" in body
+    assert 'route="/api/v1/keywords/"' in body
+
+def test_query_shape_normalization():
+    """تست نرمال‌سازی دستورات MongoDB به شکل کوئری مستقل از مقادیر"""
+    from app.core.query_monitor import normalize_command
+    
+    first = normalize_command("find", {
+        "find": "tweets",
+        "filter": {"keywords": "test1", "importance_score": {"$gte": 10}},
+        "sort": {"created_at": -1}
+    })
+    second = normalize_command("find", {
+        "find": "tweets",
+        "filter": {"importance_score": {"$gte": 80}, "keywords": "other"},
+        "sort": {"created_at": -1}
+    })
+    
+    assert first["key"] == second["key"]
+    assert first["filter_keys"] == ["importance_score:$gte", "keywords:eq"]
+    assert first["sort"] == ["created_at:-1"]
+    
+    aggregate = normalize_command("aggregate", {
+        "aggregate": "tweets",
+        "pipeline": [{"$match": {"keywords": "x"}}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]
+    })
+    assert aggregate["collection"] == "tweets"
+    assert aggregate["stages"] == ["$match", "$group"]
+    
+    assert normalize_command("ping", {"ping": 1}) is None
+
+def test_index_advisor_recommendations_are_defined():
+    """تست اینکه پیشنهادهای ESR مشاور ایندکس در تعریف ایندکس‌ها وجود دارند"""
+    from app.core.index_advisor import query_catalogue, recommend_index, _covering_index
+    from app.core.indexes import INDEX_SPECS
+    
+    samples = {"keyword": "test1", "user_screen_name": "testuser1", "tweet_id": "12345", "search_token": "test"}
+    
+    for shape in query_catalogue(samples):
+        recommendation = recommend_index(shape)
+        if recommendation is None:
+            continue
+        
+        existing = {
+            index.document["name"]: {"key": list(index.document["key"].items())}
+            for index in INDEX_SPECS[shape["collection"]]
+        }
+        covered_by = _covering_index(recommendation["keys"], recommendation["exact"], existing)
+        assert covered_by is not None, shape["name"]
+
+def test_index_advisor_esr_order():
+    """تست ترتیب برابری، مرتب‌سازی و بازه در ایندکس پیشنهادی"""
+    from app.core.index_advisor import recommend_index
+    
+    recommendation = recommend_index({
+        "filter": {"importance_score": {"$gte": 10}, "keywords": "x"},
+        "sort": [("created_at", -1)]
+    })
+    
+    assert recommendation["keys"] == [("keywords", 1), ("created_at", -1), ("importance_score", 1)]
+
+def test_mongo_client_profiles():
+    """تست تبدیل پروفایل‌های کلاینت MongoDB به پول اتصال، فشرده‌سازی و read preference"""
+    from app.core.config import settings
+    from app.core.db import client_options
+    
+    analytics = client_options(settings.MONGODB_CLIENT_PROFILES["analytics"])
+    assert analytics["read_preference"].mongos_mode == "secondaryPreferred"
+    assert analytics["read_preference"].max_staleness == 120
+    assert analytics["maxPoolSize"] == 20
+    assert analytics["compressors"] == settings.MONGODB_COMPRESSORS
+    
+    # نوشتن‌های ذخیره توییت روی primary می‌مانند
+    default = client_options(settings.MONGODB_CLIENT_PROFILES["default"])
+    assert default["read_preference"].mongos_mode == "primary"
+    
+    with pytest.raises(ValueError):
+        client_options({"read_preference": "secondary", "max_staleness_seconds": 30})
+
+def test_compaction_plan():
+    """تست انتخاب کالکشن‌های دارای فضای قابل بازپس‌گیری و پنجره نگهداری"""
+    from app.core.config import settings
+    from app.services.compaction import MB, REUSABLE_BYTES, in_maintenance_window, plan_compaction, reclaimable_space
+    
+    def stats(name, storage_mb, reusable_mb, index_reusable_mb=0):
+        return {
+            "ns": f"hooshyar.{name}",
+            "storageSize": storage_mb * MB,
+            "totalIndexSize": 0,
+            "wiredTiger": {"block-manager": {REUSABLE_BYTES: reusable_mb * MB}},
+            "indexDetails": {"_id_": {"block-manager": {REUSABLE_BYTES: index_reusable_mb * MB}}}
+        }
+    
+    threshold = settings.COMPACTION_MIN_RECLAIMABLE_MB
+    space = reclaimable_space(stats("tweets", threshold * 4, threshold, threshold))
+    assert space["collection"] == "tweets"
+    assert space["reclaimable_bytes"] == 2 * threshold * MB
+    assert space["reclaimable_ratio"] == 0.5
+    
+    spaces = [
+        space,
+        reclaimable_space(stats("keywords", 1, 1)),  # کوچک‌تر از آستانه حجم
+        reclaimable_space(stats("users", threshold * 100, threshold * 2)),  # کمتر از آستانه نسبت
+        reclaimable_space(stats("migrations", threshold * 4, threshold * 3)),  # مستثنی
+        reclaimable_space(stats("entity_counts", threshold * 10, threshold * 5)),
+    ]
+    assert [space["collection"] for space in plan_compaction(spaces)] == ["entity_counts", "tweets"]
+    
+    assert in_maintenance_window(datetime(2024, 1, 1, 3), 2, 5)
+    assert not in_maintenance_window(datetime(2024, 1, 1, 5), 2, 5)
+    assert in_maintenance_window(datetime(2024, 1, 1, 1), 22, 4)
+    assert not in_maintenance_window(datetime(2024, 1, 1, 12), 22, 4)
+
+def test_system_sampler_ring_buffer():
+    """تست بافر حلقوی نمونه‌های آمار سیستم و متریک‌های پروسه بدون انتظار"""
+    import psutil
+    from app.services.system_sampler import SystemSampler, host_metrics
+    
+    sampler = SystemSampler(interval=30, history_size=3)
+    assert sampler.latest() is None
+    
+    for i in range(5):
+        sampler.record({"tweets": {"total": i}, "timestamp": datetime(2024, 1, 1, 0, i)})
+    
+    assert sampler.latest()["tweets"]["total"] == 4
+    assert [sample["tweets"]["total"] for sample in sampler.recent()] == [4, 3, 2]
+    assert len(sampler.recent(2)) == 2
+    
+    metrics = host_metrics(psutil.Process())
+    assert metrics["memory_mb"] > 0
+    assert "cpu_percent" in metrics
+
+def test_stats_series_rollup():
+    """تست تبدیل نمونه آمار سیستم به نقطه سری زمانی و تجمیع min/max/avg ساعتی و روزانه"""
+    from app.services.stats_series import flatten_sample, merge_summaries, summarize
+    
+    point = flatten_sample({
+        "tweets": {"total": 10, "today": 2},
+        "system": {"cpu_percent": 12.5, "load_average": None},
+        "database": {"collections": 5}
+    })
+    assert point == {"tweets_total": 10, "tweets_today": 2, "cpu_percent": 12.5}
+    
+    first_hour = summarize([{"cpu_percent": 10.0}, {"cpu_percent": 30.0}, {"cpu_percent": 20.0, "memory_mb": 100.0}])
+    assert first_hour["count"] == 3
+    assert first_hour["metrics"]["cpu_percent"] == {"min": 10.0, "max": 30.0, "avg": 20.0, "count": 3}
+    assert first_hour["metrics"]["memory_mb"]["count"] == 1
+    
+    # میانگین روزانه با تعداد نقاط هر ساعت وزن‌دهی می‌شود
+    second_hour = summarize([{"cpu_percent": 60.0}])
+    day = merge_summaries([first_hour, second_hour])
+    assert day["count"] == 4
+    assert day["metrics"]["cpu_percent"] == {"min": 10.0, "max": 60.0, "avg": 30.0, "count": 4}
+
+@pytest.mark.asyncio
+async def test_stats_series_rollup_resumes(monkeypatch):
+    """تست ادامه rollup از نقطه اوج ذخیره شده پس از چند ساعت توقف"""
+    from app.services import stats_series as module
+    
+    class Cursor:
+        def __init__(self, documents):
+            self.documents = documents
+        
+        def __aiter__(self):
+            return self._iterate()
+        
+        async def _iterate(self):
+            for document in self.documents:
+                yield document
+        
+        async def to_list(self, length=None):
+            return self.documents
+    
+    class Collection:
+        def __init__(self):
+            self.documents = {}
+        
+        def find(self, query):
+            since = query.get("start", {}).get("$gte", datetime.min)
+            return Cursor([document for document in self.documents.values() if document["start"] >= since])
+        
+        async def find_one(self, query):
+            return self.documents.get(query["_id"])
+        
+        async def update_one(self, query, update, upsert=False):
+            self.documents.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+        
+        async def bulk_write(self, operations, ordered=False):
+            for operation in operations:
+                start = operation._filter["start"]
+                self.documents[start] = {"start": start, **operation._doc["$set"]}
+    
+    collections = {}
+    monkeypatch.setattr(module, "get_collection", lambda name: collections.setdefault(name, Collection()))
+    
+    def add_hour(start):
+        collections.setdefault("system_stats_raw", Collection()).documents[start] = {
+            "start": start, "samples": [{"timestamp": start, "cpu_percent": 10.0}]
+        }
+    
+    series = module.StatsSeries()
+    add_hour(datetime(2024, 1, 1, 10))
+    assert (await series.rollup(datetime(2024, 1, 1, 10, 30)))["hours"] == 1
+    
+    # job پنج ساعت متوقف بوده است؛ همه ساعت‌های از دست رفته تجمیع می‌شوند
+    for hour in range(10, 16):
+        add_hour(datetime(2024, 1, 1, hour))
+    result = await series.rollup(datetime(2024, 1, 1, 15, 30), lookback_hours=2)
+    assert result == {"hours": 6, "days": 1}
+    assert len(collections["system_stats_1h"].documents) == 6
+    assert collections["system_stats_1d"].documents[datetime(2024, 1, 1)]["count"] == 6
+    assert collections["stats_rollup_state"].documents["rollup"]["next_hour"] == datetime(2024, 1, 1, 15)
+
+def test_index_diff_creates_only_missing():
+    """تست مقایسه تعریف ایندکس‌ها با ایندکس‌های موجود"""
+    from pymongo import IndexModel
+    from app.core.db import diff_indexes
+    
+    specs = [
+        IndexModel([("tweet_id", 1)], name="tweet_id_1", unique=True),
+        IndexModel([("start", 1)], name="start_1", expireAfterSeconds=3600),
+        IndexModel([("keywords", 1), ("created_at", -1)], name="keywords_1_created_at_-1"),
+    ]
+    existing = {
+        "_id_": {"key": [("_id", 1)]},
+        "tweet_id_1": {"key": [("tweet_id", 1.0)], "unique": True},
+        "start_1": {"key": [("start", 1)], "expireAfterSeconds": 60},
+    }
+    
+    missing, changed = diff_indexes(specs, existing)
+    assert [index.document["name"] for index in missing] == ["keywords_1_created_at_-1"]
+    assert changed == ["start_1"]
+
+@pytest.mark.asyncio
+async def test_openapi_schema_is_cached(app_client: TestClient):
+    """تست ساخت یک باره مستندات OpenAPI"""
+    from app.main import app
+    
+    first = app_client.get("/openapi.json")
+    assert first.status_code == 200
+    schema = app.openapi_schema
+    assert schema is not None
+    
+    assert app_client.get("/openapi.json").json() == first.json()
+    assert app.openapi_schema is schema
+
+def test_log_sampler_and_queue_handler():
+    """تست محدودسازی پیام‌های تکراری و صف لاگ بدون مسدود شدن"""
+    import json
+    import logging
+    import queue
+    from app.core.logging import JsonFormatter, LogSampler, QueueLogHandler
+    
+    sampler = LogSampler(interval=60)
+    assert sampler.allow("save_tweet") == 0
+    assert sampler.allow("save_tweet") is None
+    assert sampler.allow("save_tweet") is None
+    assert sampler.allow("other") == 0
+    
+    # پس از پایان بازه تعداد پیام‌های حذف شده گزارش می‌شود
+    sampler.interval = 0
+    assert sampler.allow("save_tweet") == 2
+    
+    handler = QueueLogHandler(queue.Queue(1))
+    record = logging.LogRecord("app.test", logging.INFO, "test_system.py", 1, "Found %d tweets", (3,), None)
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.dropped == 1
+    
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "Found 3 tweets" and queued.args is None
+    assert json.loads(JsonFormatter().format(queued))["message"] == "Found 3 tweets"
@@ -173,6 +173,7 @@ async def test_tweet_stats(app_client: TestClient, sample_tweets: Dict[str, Any]
     assert "tweets_last_24h" in data
     assert "tweets_by_keyword" in data
     assert "tweets_by_language" in data
+    assert "unique_authors" in data
     
     # بررسی تعداد کل توییت‌ها
     assert data["total_tweets"] == len(sample_tweets)
@@ -201,3 +202,498 @@ async def test_extract_tweets(app_client: TestClient, sample_keywords: Dict[str,
     assert data["status"] == "success"
     assert keyword_name in data["results"]
     assert data["results"][keyword_name]["inserted"] == 1
+
+def test_search_text_normalization():
+    """تست نرمال‌سازی فارسی متن در ساخت توکن‌ها و فیلتر جستجو"""
+    from app.services.text_processing import build_search_tokens, build_search_query
+    
+    # ی و ک عربی، نیم‌فاصله، اعراب و ارقام فارسی
+    tokens = build_search_tokens("كتابِ جديد مي‌خوانم در سال ۱۴۰۳ https://t.co/x @user #ایران")
+    assert tokens == ["کتاب", "جدید", "میخوانم", "سال", "1403", "ایران"]
+    
+    # عبارت جستجو با همان نرمال‌سازی به توکن‌ها تبدیل می‌شود
+    assert build_search_query("کتاب") == {"search_tokens": "کتاب"}
+    assert build_search_query("كتاب جديد") == {"search_tokens": {"$all": ["کتاب", "جدید"]}}
+    
+    # عبارتی که فقط کلمات توقف دارد هیچ نتیجه‌ای برنمی‌گرداند
+    assert build_search_query("از در") == {"search_tokens": {"$in": []}}
+
+def test_near_duplicate_index():
+    """تست تشخیص نسخه‌های تقریباً تکراری با MinHash و LSH"""
+    from app.services.dedup import MinHasher, NearDuplicateIndex
+    
+    hasher = MinHasher(64)
+    index = NearDuplicateIndex(num_perm=64, bands=16, threshold=0.7)
+    
+    original = "امروز در تهران تجمع بزرگی برگزار شد و مردم خواستار پاسخگویی مسئولان درباره گرانی و تورم شدند".split()
+    edited = original[:3] + ["تجمعی"] + original[4:] + ["فوری"]
+    unrelated = "قیمت دلار امروز در بازار آزاد افزایش یافت و معامله گران منتظر تصمیم بانک مرکزی هستند".split()
+    
+    signature = hasher.signature(original)
+    assert hasher.unpack(hasher.pack(signature)) == signature
+    index.add("1", signature, "1")
+    
+    match = index.find(hasher.signature(edited))
+    assert match is not None
+    assert match[1] == "1"
+    
+    assert index.find(hasher.signature(unrelated)) is None
+
+def test_trending_engine_window():
+    """تست شمارش موارد داغ پنجره لغزان و حذف کلمات خود کلمه کلیدی"""
+    from app.services.trending import TrendingEngine
+    
+    engine = TrendingEngine()
+    for _ in range(5):
+        engine.record("انتخابات", "terms", ["انتخابات", "مناظره", "نامزد"])
+    engine.record("انتخابات", "terms", ["نامزد"])
+    
+    items = engine.top("انتخابات", "terms", window_minutes=60)
+    counts = {item["item"]: item["count"] for item in items}
+    
+    assert "انتخابات" not in counts
+    assert counts["نامزد"] >= 6
+    assert counts["مناظره"] >= 5
+    assert items[0]["item"] == "نامزد"
+    
+    # کلمه کلیدی دیگر در نتایج این کلمه کلیدی نیست
+    engine.record("اقتصاد", "terms", ["دلار"])
+    assert all(item["item"] != "دلار" for item in engine.top("انتخابات", "terms"))
+    
+    # شمارش بازیابی شده سایر پروسه‌ها با شمارش محلی جمع می‌شود
+    other = TrendingEngine()
+    other.record("انتخابات", "terms", ["مناظره"] * 10)
+    for bucket in engine._series[("انتخابات", "terms")].values():
+        other_bucket = other._series[("انتخابات", "terms")][bucket.start]
+        bucket.base = other_bucket.cms
+        bucket.base_items = set(other_bucket.top.items())
+    engine._version += 1
+    counts = {item["item"]: item["count"] for item in engine.top("انتخابات", "terms", window_minutes=60)}
+    assert counts["مناظره"] >= 15
+
+def test_hyperloglog_merge():
+    """تست تخمین و ادغام HyperLogLog نویسندگان یکتا"""
+    from app.services.unique_authors import HyperLogLog
+    
+    first = HyperLogLog(12)
+    second = HyperLogLog(12)
+    for i in range(10000):
+        first.add(f"user{i}")
+    for i in range(5000, 15000):
+        second.add(f"user{i}")
+    
+    assert abs(first.count() - 10000) < 10000 * 4 * first.relative_error
+    
+    # ادغام از روی نسخه ذخیره شده، کاربران مشترک را دوباره نمی‌شمارد
+    merged = HyperLogLog(12, first.to_bytes())
+    merged.merge(second)
+    assert abs(merged.count() - 15000) < 15000 * 4 * merged.relative_error
+
+def test_velocity_fields():
+    """تست محاسبه سرعت تعامل اولیه و هموار شده"""
+    from datetime import timedelta
+    from app.services.engagement import initial_velocity_fields, updated_velocity_fields, velocity_score
+    
+    now = datetime.utcnow()
+    tweet = {
+        "created_at": now - timedelta(hours=2),
+        "retweet_count": 10,
+        "favorite_count": 30,
+        "reply_count": 0,
+        "quote_count": 0
+    }
+    
+    # 40 تعامل در 2 ساعت
+    fields = initial_velocity_fields(tweet, now)
+    assert fields["velocity"] == 20.0
+    assert 0 < fields["velocity_score"] < 100
+    
+    # 60 تعامل جدید در یک ساعت، میانگین نمایی با سرعت قبلی
+    tweet.update(fields)
+    later = now + timedelta(hours=1)
+    counts = {"retweet_count": 30, "favorite_count": 70, "reply_count": 0, "quote_count": 0}
+    updated = updated_velocity_fields(tweet, counts, later)
+    assert 20.0 < updated["velocity"] < 60.0
+    assert updated["engagement_observed_at"] == later
+    
+    assert velocity_score(0) == 0.0
+    assert velocity_score(10 ** 9) == 100.0
+
+def test_scoring_formula():
+    """تست فرمول اعلانی امتیاز اهمیت"""
+    import numpy as np
+    from app.core.config import settings
+    from app.services.scoring import ScoringFormula
+    
+    # فرمول پیش‌فرض همان امتیاز قبلی است: فالوئر/1000 (سقف 50)، لایک/10 (سقف 30)، ریتوییت/5 (سقف 20)
+    formula = ScoringFormula(settings.SCORING_FORMULA)
+    columns = {
+        "user_followers_count": np.array([1000.0, 10 ** 6]),
+        "favorite_count": np.array([20.0, 10 ** 6]),
+        "retweet_count": np.array([10.0, 10 ** 6])
+    }
+    assert list(formula.compute(columns)) == [5.0, 100.0]
+    
+    # کاهش با زمان و نسخه متفاوت برای فرمول متفاوت
+    decayed = ScoringFormula({
+        "terms": [{"field": "favorite_count", "weight": 1, "scale": "log"}],
+        "decay_half_life_hours": 24
+    })
+    assert decayed.version != formula.version
+    scores = decayed.compute({"favorite_count": np.array([np.e - 1, np.e - 1])}, np.array([0.0, 24.0]))
+    assert list(scores) == [1.0, 0.5]
+    
+    with pytest.raises(ValueError):
+        ScoringFormula({"terms": [{"field": "favorite_count", "scale": "sqrt"}]})
+
+def test_refresh_priority():
+    """تست اولویت به‌روزرسانی: توییت جوان و سریع بر توییت قدیمی و کند مقدم است"""
+    from datetime import timedelta
+    from app.core.config import settings
+    from app.services.refresh_planner import refresh_priority
+    
+    now = datetime.utcnow()
+    young_fast = {
+        "created_at": now - timedelta(hours=1),
+        "engagement_observed_at": now - timedelta(minutes=30),
+        "velocity": 500.0,
+        "importance_score": 10.0
+    }
+    old_slow = {
+        "created_at": now - timedelta(days=2),
+        "engagement_observed_at": now - timedelta(hours=24),
+        "velocity": 2.0,
+        "importance_score": 80.0
+    }
+    just_refreshed = dict(young_fast, engagement_observed_at=now)
+    
+    assert refresh_priority(young_fast, now) > refresh_priority(old_slow, now)
+    assert refresh_priority(just_refreshed, now) == 0.0
+    
+    # بدون سرعت ثبت شده، میانگین تعامل از زمان انتشار استفاده می‌شود
+    unseen = {"created_at": now - timedelta(hours=2), "updated_in_db": now - timedelta(hours=1), "favorite_count": 100}
+    assert refresh_priority(unseen, now) > 0
+    
+    # توییت جوان بدون تعامل با کف اکتشاف دوباره بررسی می‌شود؛ توییت قدیمی بدون تعامل نه
+    young_quiet = {"created_at": now - timedelta(hours=2), "engagement_observed_at": now - timedelta(hours=1), "velocity": 0.0}
+    old_quiet = dict(young_quiet, created_at=now - timedelta(days=2))
+    assert refresh_priority(young_quiet, now) >= settings.REFRESH_MIN_PRIORITY
+    assert refresh_priority(old_quiet, now) == 0.0
+
+def test_sentiment_lexicon():
+    """تست امتیاز احساسات با واژگان فارسی، نفی و تشدید"""
+    from app.services.sentiment import score_text, score_texts
+    
+    # نفی پس از واژه قطبیت آن را برعکس می‌کند
+    positive, _ = score_text("امروز روز خیلی خوب بود")
+    negated, label = score_text("امروز روز خیلی خوب نبود")
+    assert positive > 0 and label == "negative"
+    assert negated == -positive
+    assert score_text("نتیجه عالی نبود")[1] == "negative"
+    assert score_text("امروز روز خیلی خوب نبود ولی نتیجه عالی بود")[1] == "positive"
+    assert score_text("این فیلم عالی بود 😍")[1] == "positive"
+    assert score_text("وضعیت اقتصادی افتضاح است و تورم بیداد می‌کند")[1] == "negative"
+    assert score_text("اصلا خوب نیست")[1] == "negative"
+    assert score_text("جلسه ساعت ۱۰ برگزار می‌شود") == (0.0, "neutral")
+    assert score_text(None) == (0.0, "neutral")
+    
+    # تشدید امتیاز را افزایش می‌دهد
+    assert score_text("خیلی خوب")[0] > score_text("خوب")[0] > 0
+    assert [label for _, label in score_texts(["عالی", "بد"])] == ["positive", "negative"]
+
+def test_topic_model_clusters(monkeypatch):
+    """تست خوشه‌بندی مینی‌بچ TF-IDF: توییت‌های دو موضوع متفاوت در خوشه‌های جدا قرار می‌گیرند"""
+    import numpy as np
+    from app.core.config import settings
+    from app.services.topics import TopicModel
+    
+    monkeypatch.setattr(settings, "TOPIC_CLUSTERS", 2)
+    economy = [["دلار", "بازار", "قیمت", "ارز"], ["قیمت", "دلار", "بورس"], ["بازار", "ارز", "بورس", "قیمت"]]
+    sport = [["فوتبال", "استقلال", "گل", "بازی"], ["پرسپولیس", "بازی", "فوتبال"], ["گل", "لیگ", "فوتبال", "بازی"]]
+    
+    model = TopicModel("تست", datetime(2024, 1, 1))
+    rows = model.vectorize(economy + sport + [[]])
+    assert rows.positions == [0, 1, 2, 3, 4, 5]
+    
+    similarities = model.partial_fit(rows)
+    assigned = np.argmax(similarities, axis=1)
+    assert len(set(assigned[:3])) == 1
+    assert len(set(assigned[3:])) == 1
+    assert assigned[0] != assigned[3]
+    
+    # ذخیره و بازیابی مدل و رشد واژگان با دسته بعدی
+    restored = TopicModel.from_document(model.to_document())
+    assert np.allclose(restored.centroids, model.centroids)
+    restored.vectorize([["تورم", "دلار"]])
+    assert restored.centroids.shape[1] == len(restored.vocabulary)
+    
+    labels = {descriptor["label"] for descriptor in restored.descriptors()}
+    assert any("فوتبال" in label for label in labels)
+    
+    # دسته اول کوچک تعداد موضوعات بازه را محدود نمی‌کند
+    late = TopicModel("تست", datetime(2024, 1, 2))
+    late.partial_fit(late.vectorize(economy[:1]))
+    assert len(late.counts) == 1
+    late.partial_fit(late.vectorize(economy[1:] + sport))
+    assert len(late.counts) == 2
+
+def test_enrichment_results(monkeypatch):
+    """تست نوشتن نتیجه مراحل غنی‌سازی: موفقیت، تلاش مجدد و بستن مرحله پس از حداکثر تلاش"""
+    from pymongo import UpdateOne
+    from app.services import enrichment
+    from app.services.enrichment import EnrichmentRunner, SentimentStage
+    from app.services.sentiment import sentiment_updates
+    
+    now = datetime(2024, 1, 1, 12, 0)
+    
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+    
+    monkeypatch.setattr(enrichment, "datetime", FrozenDatetime)
+    
+    stage = SentimentStage()
+    runner = EnrichmentRunner([stage])
+    assert runner.stage_names() == ["sentiment"]
+    
+    lease = {"sentiment": {"owner": "worker-1"}}
+    tweets = [
+        {"_id": 1, "text": "عالی بود", "enrichment_leases": lease},
+        {"_id": 2, "text": "", "enrichment_leases": lease},
+        {"_id": 3, "text": "", "enrichment_leases": lease, "enrichment_attempts": {"sentiment": stage.max_attempts - 1}},
+    ]
+    updates = sentiment_updates(tweets[:1]) + [None, None]
+    assert updates[0]["sentiment_label"] == "positive"
+    
+    operations = runner._results(stage, tweets, updates, "boom")
+    lease_filter = {"enrichment_leases.sentiment.owner": "worker-1"}
+    unset_lease = {"enrichment_leases.sentiment": ""}
+    
+    assert operations[0] == UpdateOne({"_id": 1, **lease_filter}, {
+        "$set": {**updates[0], "enriched.sentiment": {"version": stage.version, "at": now}},
+        "$pull": {"pending_enrichment": "sentiment"},
+        "$unset": unset_lease
+    })
+    
+    # خطای اول: فقط شمارنده تلاش افزایش می‌یابد و توییت در صف می‌ماند
+    assert operations[1] == UpdateOne({"_id": 2, **lease_filter}, {
+        "$set": {"enrichment_attempts.sentiment": 1},
+        "$unset": unset_lease
+    })
+    
+    # آخرین تلاش: مرحله با خطا بسته می‌شود
+    assert operations[2] == UpdateOne({"_id": 3, **lease_filter}, {
+        "$set": {
+            "enrichment_attempts.sentiment": stage.max_attempts,
+            "enriched.sentiment": {"version": stage.version, "at": now, "error": "boom"}
+        },
+        "$unset": unset_lease,
+        "$pull": {"pending_enrichment": "sentiment"}
+    })
+
+@pytest.mark.asyncio
+async def test_author_cache(monkeypatch):
+    """تست ساخت پروفایل نویسنده و رد upsert پروفایل تکراری با کش LRU"""
+    from app.services import users
+    from app.services.users import AuthorCache, UserStore, user_profile
+    
+    user = {"id": 42, "screen_name": "SampleUser", "name": "Sample", "followers_count": 10,
+            "created_at": "Wed Oct 10 20:19:24 +0000 2018"}
+    profile = user_profile(user)
+    assert profile["user_id"] == "42"
+    assert profile["screen_name_lower"] == "sampleuser"
+    assert profile["created_at"] == datetime(2018, 10, 10, 20, 19, 24)
+    assert user_profile({}) is None
+    
+    store = UserStore()
+    store.cache = AuthorCache(max_size=2)
+    store.observe(user)
+    assert len(store._pending) == 1
+    
+    # پس از نوشتن، همان پروفایل دوباره در صف قرار نمی‌گیرد ولی تغییر آن قرار می‌گیرد
+    store.cache.remember(store._pending.pop("42"))
+    store.observe(user)
+    assert not store._pending
+    store.observe({**user, "followers_count": 11})
+    assert store._pending["42"]["followers_count"] == 11
+    
+    # قدیمی‌ترین نویسنده از کش بیرون می‌رود
+    store.cache.remember(user_profile({"id": 1, "screen_name": "a"}))
+    store.cache.remember(user_profile({"id": 2, "screen_name": "b"}))
+    assert len(store.cache) == 2
+    assert not store.cache.is_fresh(profile)
+    
+    # شکست نوشتن پروفایل‌ها را به صف برمی‌گرداند بدون بازنویسی نسخه جدیدتر
+    class FailingUsers:
+        async def bulk_write(self, operations, ordered=False):
+            store.observe({**user, "followers_count": 12})
+            raise RuntimeError("write failed")
+    
+    monkeypatch.setattr(users, "get_collection", lambda name: FailingUsers())
+    store.observe({**user, "id": 43, "screen_name": "Other"})
+    with pytest.raises(RuntimeError):
+        await store.flush()
+    assert set(store._pending) == {"42", "43"}
+    assert store._pending["42"]["followers_count"] == 12
+
+def test_entity_extraction():
+    """تست استخراج و نرمال‌سازی هشتگ‌ها، منشن‌ها و لینک‌ها و شمارنده‌های روزانه"""
+    from app.services.entities import ALL_KEYWORDS, EntityCounter, entity_key, entity_keys, extract_entities
+    
+    raw = {
+        "entities": {
+            "hashtags": [{"text": "ایران"}, {"text": "ايران"}],
+            "user_mentions": [{"screen_name": "SampleUser", "id_str": "42"}],
+            "urls": [{"url": "https://t.co/a", "expanded_url": "https://www.Example.com/news/"}],
+            "media": [{"type": "photo", "url": "https://t.co/m", "media_url_https": "https://pbs.twimg.com/1.jpg", "id_str": "7"}]
+        }
+    }
+    entities = extract_entities(raw, "متن")
+    assert entities["mentions"] == [{"screen_name": "SampleUser", "user_id": "42"}]
+    assert entities["urls"] == ["https://www.Example.com/news/"]
+    assert entities["media"][0]["media_id"] == "7"
+    
+    # ی عربی و فارسی یک هشتگ هستند
+    keys = entity_keys(entities)
+    assert keys == ["hashtag:ایران", "mention:sampleuser", "url:example.com/news"]
+    assert entity_key("hashtag", "#ايران") == keys[0]
+    
+    # بدون entities از متن استخراج می‌شود
+    fallback = extract_entities({}, "سلام @user1 #تست https://example.com/a.")
+    assert fallback["hashtags"] == ["تست"]
+    assert fallback["mentions"][0]["screen_name"] == "user1"
+    assert fallback["urls"] == ["https://example.com/a"]
+    
+    counter = EntityCounter()
+    tweet = {"entity_keys": keys, "keywords": ["k1"], "created_at": datetime(2024, 1, 1, 15, 30)}
+    counter.record(tweet)
+    counter.record(tweet)
+    day = datetime(2024, 1, 1)
+    assert counter._pending[("hashtag", "ایران", day, "k1")] == 2
+    assert counter._pending[("url", "example.com/news", day, ALL_KEYWORDS)] == 2
+    assert len(counter._pending) == 6
+
+@pytest.mark.asyncio
+async def test_search_tweets_facets(app_client: TestClient, sample_tweets: Dict[str, Any]):
+    """تست جستجوی توییت‌ها با برش‌ها در یک درخواست"""
+    response = app_client.post("/api/v1/tweets/search", json={"facets": ["lang", "verified", "date"], "page_size": 5})
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["total"] == len(sample_tweets)
+    assert set(data["facets"]) == {"lang", "verified", "date"}
+    assert sum(item["count"] for item in data["facets"]["verified"]) == len(sample_tweets)
+    assert data["facets_approximate"] is False
+    
+    response = app_client.post("/api/v1/tweets/search", json={"facets": ["unknown"]})
+    assert response.status_code == 422
+
+def test_search_query_and_facets():
+    """تست ساخت کوئری مشترک فیلترها و تبدیل خروجی $facet"""
+    from app.services.search import build_tweet_query, facet_stages, parse_facets
+    
+    query = build_tweet_query(keyword="k1", start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2),
+                              is_verified=False, exclude_duplicates=True)
+    assert query == {
+        "keywords": "k1",
+        "created_at": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 1, 2)},
+        "user_verified": False,
+        "is_duplicate": {"$ne": True}
+    }
+    
+    stages = facet_stages(["keywords", "date"], limit=5, interval="hour")
+    assert stages["keywords"][0] == {"$unwind": "$keywords"}
+    assert stages["date"][0]["$group"]["_id"]["$dateToString"]["format"] == "%Y-%m-%dT%H:00:00"
+    with pytest.raises(ValueError):
+        facet_stages(["unknown"], limit=5, interval="day")
+    
+    # برش‌های نمونه با ضریب کل نتایج به نمونه تعمیم داده می‌شوند
+    facets = parse_facets({"lang": [{"_id": "fa", "count": 3}], "date": [{"_id": "2024-01-01T05:00:00", "count": 2}]}, scale=10)
+    assert facets["lang"] == [{"value": "fa", "count": 30}]
+    assert facets["date"] == [{"value": datetime(2024, 1, 1, 5), "count": 20}]
+
+def test_retention_policies():
+    """تست سیاست‌های نگهداری کلمات کلیدی و تنظیم اندازه دسته براساس تاخیر"""
+    from app.core.config import settings
+    from app.services.retention import RetentionEngine, is_expired, keyword_policy
+    
+    now = datetime(2024, 6, 1)
+    default = {"max_age_days": 90, "min_importance": 10.0}
+    policies = {
+        "archive": keyword_policy({"retention_days": 0}, default),
+        "short": keyword_policy({"retention_days": 7, "retention_min_importance": 50.0}, default),
+    }
+    assert policies["archive"] == {"max_age_days": None, "min_importance": 10.0}
+    
+    old = {"created_at": now - timedelta(days=100), "importance_score": 5, "keywords": ["k1"]}
+    assert is_expired(old, policies, default, now)
+    assert not is_expired({**old, "importance_score": 10}, policies, default, now)
+    assert not is_expired({**old, "created_at": now - timedelta(days=30)}, policies, default, now)
+    
+    # سیاست اختصاصی؛ تا زمانی که یکی از کلمات کلیدی نگهداری را بخواهد توییت حذف نمی‌شود
+    recent = {"created_at": now - timedelta(days=10), "importance_score": 20, "keywords": ["short"]}
+    assert is_expired(recent, policies, default, now)
+    assert not is_expired({**recent, "keywords": ["short", "k1"]}, policies, default, now)
+    assert not is_expired({**old, "keywords": ["archive"]}, policies, default, now)
+    assert is_expired({**old, "keywords": []}, policies, default, now)
+    
+    engine = RetentionEngine()
+    assert engine._observe(settings.RETENTION_TARGET_LATENCY_MS * 3 / 1000) > 0
+    assert engine.batch_size == settings.RETENTION_BATCH_SIZE // 2
+    engine.latency_ms = None
+    assert engine._observe(0.001) == 0.0
+    assert engine.batch_size > settings.RETENTION_BATCH_SIZE // 2
+
+def test_cold_archive_read_through(tmp_path, monkeypatch):
+    """تست نوشتن توییت‌های منقضی در سگمنت‌های فشرده و خواندن با ایندکس پراکنده"""
+    from bson import ObjectId
+    from app.core.config import settings
+    from app.services.archive import ColdArchive, snowflake_day
+    
+    archive = ColdArchive(str(tmp_path))
+    created_at = datetime(2024, 1, 1, 12, 0)
+    tweets = [
+        {
+            "_id": ObjectId(),
+            "tweet_id": str(1000 + i),
+            "text": f"توییت آرشیو شده شماره {i} درباره موضوع {i % 7}",
+            "created_at": created_at + timedelta(days=i % 2),
+            "keywords": ["k1"],
+            "importance_score": float(i % 10)
+        }
+        for i in range(400)
+    ]
+    assert archive.write(tweets) == 400
+    
+    # یک سگمنت برای هر روز با دیکشنری آموزش داده شده
+    status = archive.status()
+    assert status["days"] == 2
+    assert status["tweets"] == 400
+    assert status["compression_ratio"] > 1
+    
+    found = archive.lookup("1357")
+    assert found["_id"] == tweets[357]["_id"]
+    assert found["created_at"] == tweets[357]["created_at"]
+    assert found["text"] == tweets[357]["text"]
+    assert archive.lookup("1000")["tweet_id"] == "1000"
+    assert archive.lookup("99999") is None
+    
+    # سگمنت دوم همان روز بدون بازنویسی سگمنت اول اضافه می‌شود
+    archive.write([{**tweets[0], "tweet_id": "5000", "_id": ObjectId()}])
+    assert archive.lookup("5000")["text"] == tweets[0]["text"]
+    assert archive.status()["segments"] == 3
+    
+    # با رسیدن سگمنت‌های کوچک روز به سقف، نوشتن بعدی آن‌ها را در یک سگمنت ادغام می‌کند
+    monkeypatch.setattr(settings, "ARCHIVE_MAX_SMALL_SEGMENTS", 2)
+    other = ColdArchive(str(tmp_path))
+    other.write([{**tweets[0], "tweet_id": "6000", "_id": ObjectId()}])
+    status = other.status()
+    assert status["segments"] == 2
+    assert status["tweets"] == 402
+    assert len(list(tmp_path.joinpath("2024-01-01").glob("*.idx"))) == 1
+    for tweet_id in ("1000", "1356", "5000", "6000"):
+        assert archive.lookup(tweet_id)["tweet_id"] == tweet_id
+    
+    assert snowflake_day("1742001002312818688") == "2024-01-02"
+    assert snowflake_day("12345") is None
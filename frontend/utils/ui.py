@@ -179,7 +179,8 @@ def render_tweet_card(tweet: Dict[str, Any]) -> str:
     tweet_id = tweet.get("tweet_id")
     text = tweet.get("text", "")
     created_at = format_datetime(tweet.get("created_at"))
-    user_name = tweet.get("user_name", "")
+    # نام نویسنده از پروفایل کالکشن users (توییت‌های قدیمی‌تر user_name دارند)
+    user_name = (tweet.get("user") or {}).get("name") or tweet.get("user_name", "")
     user_screen_name = tweet.get("user_screen_name", "")
     user_verified = tweet.get("user_verified", False)
     retweet_count = tweet.get("retweet_count", 0)
@@ -34,8 +34,22 @@ const collections = [
     'system_settings',
     'migrations',
     'execution_logs',
-    'system_stats',
-    'scheduler_jobs'
+    'system_stats_raw',
+    'system_stats_1h',
+    'system_stats_1d',
+    'stats_rollup_state',
+    'scheduler_jobs',
+    'trending_snapshots',
+    'author_rollups',
+    'engagement_history',
+    'scoring_state',
+    'topic_models',
+    'topics',
+    'topic_state',
+    'users',
+    'entity_counts',
+    'retention_state',
+    'compaction_history'
 ];
 
 collections.forEach(collection => {
@@ -47,19 +61,71 @@ collections.forEach(collection => {
     }
 });
 
-// ایجاد ایندکس‌های کالکشن tweets
+// ایجاد ایندکس‌های کالکشن tweets (هماهنگ با backend/app/core/indexes.py)
 db.tweets.createIndex({ "tweet_id": 1 }, { unique: true });
-db.tweets.createIndex({ "created_at": -1 });
-db.tweets.createIndex({ "keywords": 1 });
 db.tweets.createIndex({ "user_id": 1 });
-db.tweets.createIndex({ "importance_score": -1 });
-db.tweets.createIndex({ "text": "text" }, { default_language: "none" });
+db.tweets.createIndex({ "search_tokens": 1, "created_at": -1 });
+db.tweets.createIndex({ "keywords": 1, "created_at": -1, "importance_score": -1 });
+db.tweets.createIndex({ "created_at": -1, "importance_score": -1 });
+db.tweets.createIndex({ "user_screen_name": 1, "created_at": -1 });
+db.tweets.createIndex({ "sentiment_label": 1, "created_at": -1 });
+db.tweets.createIndex({ "topics": 1, "created_at": -1 });
+db.tweets.createIndex({ "keywords": 1, "_id": 1 });
+db.tweets.createIndex({ "entity_keys": 1, "created_at": -1 });
+db.tweets.createIndex({ "pending_enrichment": 1, "_id": 1 });
+db.tweets.createIndex({ "cluster_id": 1, "created_at": -1 });
+db.tweets.createIndex(
+    { "duplicate_count": -1, "created_at": -1 },
+    { name: "duplicate_clusters", partialFilterExpression: { "duplicate_count": { $gt: 0 } } }
+);
+db.tweets.createIndex({ "velocity_score": -1, "updated_in_db": 1 });
+db.tweets.createIndex({ "created_at": -1, "updated_in_db": 1 });
+db.tweets.createIndex({ "velocity_score": -1, "created_at": -1, "updated_in_db": 1 });
 
 // ایجاد ایندکس‌های کالکشن keywords
 db.keywords.createIndex({ "keyword": 1 }, { unique: true });
-db.keywords.createIndex({ "is_active": 1 });
 db.keywords.createIndex({ "priority": 1 });
 db.keywords.createIndex({ "last_extracted_at": 1 });
+db.keywords.createIndex({ "is_active": 1, "priority": 1 });
+db.keywords.createIndex({ "tags": 1, "is_active": 1 });
+
+// ایجاد ایندکس‌های کالکشن execution_logs (حذف خودکار پس از 30 روز)
+db.execution_logs.createIndex({ "start_time": 1 }, { expireAfterSeconds: 2592000 });
+db.execution_logs.createIndex({ "task_name": 1, "start_time": -1 });
+
+// ایجاد ایندکس‌های کالکشن trending_snapshots (حذف خودکار پس از 3 ساعت)
+db.trending_snapshots.createIndex({ "keyword": 1, "kind": 1, "bucket_start": 1, "node": 1 }, { unique: true });
+db.trending_snapshots.createIndex({ "bucket_start": 1 }, { expireAfterSeconds: 10800 });
+
+// ایجاد ایندکس‌های کالکشن author_rollups (حذف خودکار پس از 90 روز)
+db.author_rollups.createIndex({ "keyword": 1, "hour": 1 }, { unique: true });
+db.author_rollups.createIndex({ "hour": 1 }, { expireAfterSeconds: 7776000 });
+
+// ایجاد ایندکس‌های کالکشن engagement_history (حذف خودکار پس از 30 روز)
+db.engagement_history.createIndex({ "tweet_id": 1, "day": 1 });
+db.engagement_history.createIndex({ "day": 1 }, { expireAfterSeconds: 2592000 });
+
+// ایجاد ایندکس‌های کالکشن‌های topic_models و topics (حذف خودکار پس از 30 روز)
+db.topic_models.createIndex({ "keyword": 1, "window_start": 1 }, { unique: true });
+db.topic_models.createIndex({ "window_start": 1 }, { expireAfterSeconds: 2592000 });
+db.topics.createIndex({ "keyword": 1, "window_start": -1, "size": -1 });
+db.topics.createIndex({ "window_start": 1 }, { expireAfterSeconds: 2592000 });
+
+// ایجاد ایندکس‌های کالکشن users
+db.users.createIndex({ "user_id": 1 }, { unique: true });
+db.users.createIndex({ "screen_name_lower": 1 });
+
+// ایجاد ایندکس‌های کالکشن entity_counts (حذف خودکار پس از 90 روز)
+db.entity_counts.createIndex({ "type": 1, "keyword": 1, "day": 1, "value": 1 }, { unique: true });
+db.entity_counts.createIndex({ "day": 1 }, { expireAfterSeconds: 7776000 });
+
+// ایجاد ایندکس‌های کالکشن compaction_history (حذف خودکار پس از 180 روز)
+db.compaction_history.createIndex({ "started_at": 1 }, { expireAfterSeconds: 15552000 });
+
+// ایجاد ایندکس‌های سری زمانی آمار سیستم (حذف خودکار پس از 3، 90 و 730 روز)
+db.system_stats_raw.createIndex({ "start": 1 }, { unique: true, expireAfterSeconds: 259200 });
+db.system_stats_1h.createIndex({ "start": 1 }, { unique: true, expireAfterSeconds: 7776000 });
+db.system_stats_1d.createIndex({ "start": 1 }, { unique: true, expireAfterSeconds: 63072000 });
 
 print('ایندکس‌های مورد نیاز با موفقیت ایجاد شدند.');
 